@@ -1,19 +1,53 @@
-import yfinance as yf
 import streamlit as st
-from streamlit_searchbox import st_searchbox
 import time
+from functools import partial
 import pandas as pd
-from streamlit_option_menu import option_menu
 import numpy as np
 from datetime import date, datetime, timedelta
 from plotly import graph_objs as go
 from babel.numbers import format_currency
-import pyodbc
-from cryptography.fernet import Fernet
-import streamlit.components.v1 as components
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from portfolio.alerts import ALERT_KINDS
+from portfolio.fetch import YAHOO_HOST
+from portfolio.holdings_cache import HoldingsCache
+from portfolio.importer import import_holdings
+from portfolio.lots import cash_flows
+from portfolio.market import is_market_open
+from portfolio.metadata import allocation, treemap_nodes
+from portfolio import perf
+from portfolio.perf import timed
+from portfolio.performance import PerformanceCache, holding_xirr, portfolio_xirr
+from portfolio.quotes import Quote
+from portfolio.resources import (
+    init_alert_engine,
+    init_cache,
+    init_connection,
+    init_fetcher,
+    init_history_store,
+    init_index_strip,
+    init_metadata_store,
+    init_poller,
+    init_quote_engine,
+    init_repository,
+    init_symbol_master,
+    market_indices,
+)
+from portfolio.risk import RiskCache
+from portfolio.settings import section
+from portfolio.symbol_master import merge_results, normalize
+from portfolio.table import HoldingsTable
+from portfolio.valuation import value_holdings
 
 st.set_page_config(page_title="My Portfolio", page_icon=":moneybag:", layout="wide")
 
+if section("perf").get("enabled"):
+    perf.enable()
+# ?perf=1 times this session's reruns only; recording for every session, the
+# exports and the process-wide stats stay behind the config switch.
+if st.query_params.get("perf") == "1":
+    st.session_state["show_perf"] = True
+perf.begin_rerun(st.session_state.get("show_perf", False))
+
 if "show_login" not in st.session_state:
     st.session_state["show_login"] = True
 if "login_success" not in st.session_state:
@@ -40,57 +74,58 @@ if "is_refresh_from_db" not in st.session_state:
     st.session_state["is_refresh_from_db"] = True
 
 
-@st.cache_resource(show_spinner="Initialising...Please wait!!!")
-def init_connection():
+def execute_query(operation, *args):
+    # operation is a Repository method, e.g. init_repository().lots.
     try:
-        return pyodbc.connect(
-            "DRIVER={ODBC Driver 17 for SQL Server};SERVER="
-            + st.secrets["DB_SERVER"]
-            + ";DATABASE="
-            + st.secrets["DB"]
-            + ";UID="
-            + st.secrets["DB_USER"]
-            + ";PWD="
-            + st.secrets["DB_PASSWORD"],
-            timeout=60,
-        )
+        return operation(*args)
     except Exception as e:
-        st.error("Internal Error occurred!!! Try again...")
+        st.error("Internal Error occurred!!!")
 
 
-@st.cache_data(ttl=600)
-def execute_query_cached(query, *params):
-    conn = init_connection()
-    with conn.cursor() as cur:
-        try:
-            cur.execute(query, params)
-            return cur.fetchall()
-        except Exception as e:
-            st.error("Internal Error occurred!!!")
+def execute_update(operation, *args):
+    try:
+        operation(*args)
+        return True
+    except Exception as e:
+        st.error("Internal Error occurred!!!")
 
 
-def execute_query(query, *params):
-    conn = init_connection()
-    with conn.cursor() as cur:
-        try:
-            cur.execute(query, params)
-            return cur.fetchall()
-        except Exception as e:
-            st.error("Internal Error occurred!!!")
+def format_age(ts: float):
+    minutes = int((time.time() - ts) // 60)
+    if minutes < 1:
+        return "just now"
+    if minutes < 60:
+        return f"{minutes} min ago"
+    if minutes < 24 * 60:
+        return f"{minutes // 60} h ago"
+    return f"{minutes // (24 * 60)} d ago"
+
+
+def show_data_age():
+    snapshot = init_poller().snapshot
+    stale_after = 2 * section("market").get("poll_interval", 60)
+    if init_fetcher().breaker(YAHOO_HOST).state != "closed":
+        st.warning(
+            "Market data is unreachable, showing the last saved prices"
+            + (f" ({format_age(snapshot.ts)})." if snapshot.ts else ".")
+        )
+    elif snapshot.ts and time.time() - snapshot.ts > stale_after:
+        st.caption(f"Prices as of {format_age(snapshot.ts)}")
 
 
-def execute_update(query, *params):
-    conn = init_connection()
-    with conn.cursor() as cur:
-        try:
-            cur.execute(query, params)
-            cur.commit()
-        except Exception as e:
-            st.error("Internal Error occurred!!!")
+def session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else ""
+
+
+def alerts_enabled():
+    return section("alerts").get("enabled", True)
 
 
 @st.cache_resource
 def init_fernet():
+    from cryptography.fernet import Fernet
+
     return Fernet(st.secrets["SECRET_KEY"])
 
 
@@ -102,26 +137,61 @@ def encrypt_password(decrypted_password: str):
     return init_fernet().encrypt(decrypted_password.encode()).decode()
 
 
+def load_search(query: str):
+    import yfinance as yf
+
+    quotes = init_fetcher().call(
+        YAHOO_HOST, lambda: yf.Search(query, include_cb=False).quotes
+    )
+    return tuple(
+        f"{quote['shortname']}:::{quote['exchange']}:::{quote['symbol']}"
+        for quote in quotes
+    )
+
+
+def search_remote(query: str):
+    return init_cache().get_or_load(
+        f"search:{query}",
+        partial(load_search, query),
+        ttl=section("cache").get("search_ttl", 24 * 3600),
+    )
+
+
 def find_stock(search_term: str):
     if search_term and len(search_term) < 3:
         return []
-    else:
-        return [
-            f"{quote['shortname']}:::{quote['exchange']}:::{quote['symbol']}"
-            for quote in yf.Search(search_term, include_cb=False).quotes
-        ]
+    limit = section("search").get("limit", 10)
+    matches = init_symbol_master().search(search_term, limit)
+    # Yahoo is asked only when the local index has fewer than remote_below
+    # matches: by default, none at all.
+    if len(matches) >= section("search").get("remote_below", 1):
+        return matches
+    try:
+        remote = search_remote(normalize(search_term))
+    except Exception:
+        remote = ()
+    return merge_results(matches, remote, limit)
 
 
 def find_stock_price(symbol: str):
-    return yf.Ticker(symbol)
+    # Only the price is needed here; the symbol's metadata is fetched in the
+    # background so it is ready once the stock is in the portfolio.
+    try:
+        init_metadata_store().prefetch([symbol])
+    except Exception:
+        # Metadata is optional: the stock shows under "Unknown" until it loads.
+        pass
+    try:
+        return init_quote_engine().fetch([symbol]).get(symbol)
+    except Exception:
+        return None
 
 
-def find_prices(symbol: str):
-    nifty = yf.Ticker(symbol)
-    # current = nifty.history(period="5d")["Close"].iloc[-1]
-    # last = nifty.history(period="5d")["Close"].iloc[-2]
-    current = nifty.history_metadata["regularMarketPrice"]
-    last = nifty.history_metadata["previousClose"]
+def find_prices(quote: Quote | None):
+    if not quote or not quote.prev_close:
+        return "—", "0.00", "0.000%"
+    current = quote.price
+    last = quote.prev_close
     change = current - last
     percentage_change = (change / last) * 100
     current_formatted = f"₹{current:.2f}"
@@ -130,98 +200,111 @@ def find_prices(symbol: str):
     return current_formatted, change_formatted, percentage_change_formatted
 
 
+@timed("get_prices")
 def get_prices(df):
-    symbols = df["symbol"]
-    prices = yf.Tickers(" ".join(symbols))
-    # st.write(prices.tickers)
-    return prices.tickers
+    poller = init_poller()
+    poller.register(session_id(), df["symbol"])
+    snapshot = poller.ensure(df["symbol"])
+    st.session_state["quotes_ts"] = snapshot.ts
+    return snapshot.table(df["symbol"])
 
 
-def fetch_stocks(user_id: str):
-    df = pd.read_sql(
-        con=init_connection(),
-        sql="select symbol, stock_name, buy_date, buy_price, quantity from stocks where user_id = ?;",
-        params=user_id,
-    )
-    if len(df) > 0:
-        df["buy_date"] = pd.to_datetime(df["buy_date"], yearfirst=True).dt.date
+def get_quote(symbol: str):
+    return init_poller().ensure([symbol]).table([symbol])
+
+
+@timed("fetch_stocks")
+def fetch_stocks(user_id: str, symbol: str = None):
+    return init_repository().lots(user_id, symbol)
+
+
+@timed("fetch_sells")
+def fetch_sells(user_id: str):
+    return init_repository().sells(user_id)
+
+
+@timed("calculate_prices")
+def calculate_prices(holdings: HoldingsCache):
+    holdings.revalue(get_prices(holdings.frame))
+    publish_holdings(holdings)
+
+
+def publish_holdings(holdings: HoldingsCache):
+    st.session_state["holdings"] = holdings
+    st.session_state["df"] = holdings.frame
+    st.session_state["table"] = HoldingsTable(holdings.frame)
+    st.session_state.update(holdings.totals)
+    init_metadata_store().prefetch(holdings.frame["symbol"])
+
+
+def sync_holdings(holdings: HoldingsCache):
+    totals = execute_query(init_repository().lot_totals, holdings.user_id)
+    if totals and holdings.matches(*totals):
+        publish_holdings(holdings)
+        st.rerun()
     else:
-        df = pd.DataFrame(
-            columns=[
-                "symbol",
-                "stock_name",
-                "buy_date",
-                "buy_price",
-                "quantity",
-                "price",
-                "investment",
-                "current_value",
-                "profit",
-                "profit_percentage",
-                "profit_today",
-                "profit_percentage_today",
-                "link",
-            ]
-        )
+        refresh_data(True)
 
-    return df
 
+def load_holdings():
+    lots = fetch_stocks(st.session_state.user_id)
+    sells = fetch_sells(st.session_state.user_id)
+    quotes = get_prices(lots)
+    with perf.span("valuation"):
+        holdings = HoldingsCache(st.session_state.user_id, lots, sells, quotes)
+    publish_holdings(holdings)
+    return holdings
 
-def color_profit_loss(val):
-    color = "green" if val >= 0 else "red"
-    return f"color: {color}"
 
+def current_holdings():
+    # Lots are only read once something needs them: the table or a dialog.
+    if "holdings" not in st.session_state:
+        return load_holdings()
+    return st.session_state["holdings"]
 
-def calculate_prices(df):
-    previous_investment = float(0)
-    tickers = get_prices(df)
-    for index, symbol in df["symbol"].items():
-        info = tickers[symbol].info
-        price = info.get("currentPrice")
-        previous_close = info.get("previousClose")
-        buy_price = df.at[index, "buy_price"]
-        quantity = df.at[index, "quantity"]
-        investment = buy_price * quantity
-        current_value = price * quantity
-        previous_investment = previous_investment + (previous_close * quantity)
-        profit = current_value - investment
-        profit_percentage = profit * 100 / investment
-        profit_today = (price - previous_close) * quantity
-        profit_percentage_today = (price - previous_close) * 100 / previous_close
 
-        df.at[index, "price"] = price
-        df.at[index, "investment"] = investment
-        df.at[index, "current_value"] = current_value
-        df.at[index, "profit"] = profit
-        df.at[index, "profit_percentage"] = profit_percentage
-        df.at[index, "profit_today"] = profit_today
-        df.at[index, "profit_percentage_today"] = profit_percentage_today
-        df.at[index, "link"] = f"https://finance.yahoo.com/chart/{symbol}/"
+def value_summary(summary: pd.DataFrame):
+    summary, totals = value_holdings(summary, get_prices(summary))
+    st.session_state["summary"] = summary
+    st.session_state.update(totals)
 
-    if len(df["symbol"]) > 0:
-        st.session_state["investment"] = df["investment"].sum()
-        st.session_state["current_value"] = df["current_value"].sum()
-        st.session_state["profit"] = df["profit"].sum()
-        st.session_state["profit_percentage"] = (
-            st.session_state["profit"] * 100 / st.session_state["investment"]
-        )
-        st.session_state["profit_today"] = df["profit_today"].sum()
-        st.session_state["profit_percentage_today"] = (
-            st.session_state["profit_today"] * 100 / previous_investment
-        )
 
-    return df
+@timed("load_summary")
+def load_summary():
+    value_summary(init_repository().summary(st.session_state.user_id))
+
+
+def revalue():
+    if "holdings" in st.session_state:
+        calculate_prices(st.session_state["holdings"])
+    else:
+        value_summary(st.session_state["summary"])
+
+
+def holdings_visible():
+    return st.session_state.get(
+        "show_table", section("table").get("show_holdings", True)
+    )
 
 
 if st.session_state.login_success and st.session_state.is_refresh_from_db:
-    df = fetch_stocks(st.session_state.user_id)
     st.session_state.is_refresh_from_db = False
     st.session_state.is_refresh = False
-    st.session_state["df"] = calculate_prices(df)
+    for key in ("holdings", "df", "table"):
+        st.session_state.pop(key, None)
+    if holdings_visible():
+        load_holdings()
+    else:
+        # The header only needs one summary row per symbol.
+        load_summary()
 elif st.session_state.login_success and st.session_state.is_refresh:
     st.session_state.is_refresh_from_db = False
     st.session_state.is_refresh = False
-    st.session_state["df"] = calculate_prices(st.session_state["df"])
+    revalue()
+elif st.session_state.login_success and "df" in st.session_state:
+    init_poller().register(session_id(), st.session_state["df"]["symbol"])
+elif st.session_state.login_success and "summary" in st.session_state:
+    init_poller().register(session_id(), st.session_state["summary"]["symbol"])
 
 if "selected_stock_name" not in st.session_state:
     st.session_state["selected_stock_name"] = None
@@ -235,42 +318,78 @@ def save_stock(
     buy_date: date = None,
     buy_price: float = None,
     quantity: int = None,
+    lot_id: int = None,
 ):
     user_id = st.session_state.user_id
+    holdings = current_holdings()
     try:
-        if not stock_name and not buy_date:
-            execute_update(
-                "delete from stocks where symbol = ? and user_id = ?;",
-                symbol,
-                user_id,
-            )
+        if lot_id is not None and not buy_date:
+            if execute_update(init_repository().delete_lot, user_id, lot_id, symbol):
+                holdings.delete_lot(lot_id, get_quote(symbol))
             st.write(f"'{symbol}' deleted successfully!!!")
-        elif not stock_name and buy_date:
-            execute_update(
-                """update stocks 
-                    set buy_date = ?, buy_price = ?, quantity = ? 
-                    where symbol = ? and user_id = ?;""",
+        elif lot_id is not None and buy_date:
+            if execute_update(
+                init_repository().update_lot,
+                user_id,
+                lot_id,
+                symbol,
                 buy_date,
                 buy_price,
                 quantity,
-                symbol,
-                user_id,
-            )
+            ):
+                changes = dict(
+                    buy_date=buy_date, buy_price=buy_price, quantity=quantity
+                )
+                holdings.update_lot(lot_id, changes, get_quote(symbol))
             st.write(f"'{symbol}' updated successfully!!!")
         else:
-            execute_update(
-                """insert into stocks
-                        (user_id, symbol, stock_name, buy_date, buy_price, quantity) 
-                        values(?, ?, ?, ?, ?, ?);""",
+            if execute_update(
+                init_repository().add_lot,
                 user_id,
                 symbol,
                 stock_name,
                 buy_date,
                 buy_price,
                 quantity,
-            )
+            ):
+                # Re-read the symbol's lots to learn the id of the new one.
+                holdings.replace_lots(
+                    symbol, fetch_stocks(user_id, symbol), get_quote(symbol)
+                )
             st.write(f"'{stock_name}' added successfully!!!")
-        refresh_data(True)
+        if alerts_enabled():
+            # Profit/Loss alerts follow the holding's new quantity and cost.
+            init_alert_engine().load(user_id)
+        sync_holdings(holdings)
+
+    except Exception as e:
+        st.error("Internal Error occurred!!!")
+
+
+def sell_stock(symbol: str, sell_date: date, sell_price: float, quantity: int):
+    user_id = st.session_state.user_id
+    holdings = current_holdings()
+    try:
+        if execute_update(
+            init_repository().add_sell,
+            user_id,
+            symbol,
+            sell_date,
+            sell_price,
+            quantity,
+        ):
+            sell = dict(
+                symbol=symbol,
+                sell_date=sell_date,
+                sell_price=sell_price,
+                quantity=quantity,
+            )
+            holdings.add_sell(sell, get_quote(symbol))
+        st.write(f"'{symbol}' sold successfully!!!")
+        if alerts_enabled():
+            init_alert_engine().load(user_id)
+        publish_holdings(holdings)
+        st.rerun()
 
     except Exception as e:
         st.error("Internal Error occurred!!!")
@@ -282,8 +401,32 @@ def refresh_data(is_refresh_from_db: bool = False):
     st.rerun()
 
 
+def live_interval():
+    # Fragments tick only while NSE is open; None turns run_every off.
+    interval = section("market").get("live_refresh", 0)
+    return interval if interval and is_market_open() else None
+
+
+def revalue_live():
+    # A tick revalues from the shared snapshot only when the poller has
+    # published a newer one since this session last valued its holdings.
+    if st.session_state.get("quotes_ts") != init_poller().snapshot.ts:
+        revalue()
+
+
+def pause_after_close():
+    # run_every is fixed when the fragment is defined, so a full rerun after
+    # the close redefines the fragments without it.
+    if st.session_state.get("live") and not live_interval():
+        st.session_state["live"] = False
+        st.rerun()
+    st.session_state["live"] = bool(live_interval())
+
+
 @st.dialog("Search and add stock")
 def open_add_stock():
+    from streamlit_searchbox import st_searchbox
+
     st.session_state["selected_stock_name"] = st_searchbox(
         find_stock,
         "\n\nSearch for a stock",
@@ -297,35 +440,52 @@ def open_add_stock():
         quote_name = selected_stock_name.split(":::")[0]
         st.session_state["selected_stock"] = find_stock_price(symbol)
         selected_stock = st.session_state["selected_stock"]
-        if selected_stock:
-            st.write(f"Name: {selected_stock.info.get('shortName', 'N/A')}")
-            st.write(f"Price: {selected_stock.info.get('currentPrice')}")
-            # st.write(
-            # "{:.2f}".format(selected_stock.history(period="1d", interval="1m")["Close"][0])
-            # )
-
-            stocks_form = st.form(key="Add stocks")
-            stock_name = stocks_form.text_input(
-                "Stock Name", value=quote_name, disabled=True
-            )
-            buy_date = stocks_form.date_input(
-                "Stock buy date",
-                value="today",
-                help="When did you buy this?",
-                min_value="2000-01-01",
-                max_value=date.today(),
-                format="YYYY-MM-DD",
-            )
-            buy_price = stocks_form.number_input(
-                "Stock buy price",
-                step=0.01,
-                min_value=0.01,
-                format="%.2f",
-            )
-            quantity = stocks_form.number_input("Quantity", step=1, min_value=1)
-            if stocks_form.form_submit_button("Add"):
-                st.session_state.pop("selected_stock_name", None)
-                save_stock(symbol, stock_name, buy_date, buy_price, quantity)
+        st.write(f"Name: {quote_name}")
+        if selected_stock is not None:
+            st.write(f"Price: {find_prices(selected_stock)[0]}")
+        else:
+            # The stock can still be added; it is valued once quotes are back.
+            st.warning("Price unavailable right now, enter your buy price below.")
+        # st.write(
+        # "{:.2f}".format(selected_stock.history(period="1d", interval="1m")["Close"][0])
+        # )
+
+        stocks_form = st.form(key="Add stocks")
+        stock_name = stocks_form.text_input(
+            "Stock Name", value=quote_name, disabled=True
+        )
+        buy_date = stocks_form.date_input(
+            "Stock buy date",
+            value="today",
+            help="When did you buy this?",
+            min_value="2000-01-01",
+            max_value=date.today(),
+            format="YYYY-MM-DD",
+        )
+        buy_price = stocks_form.number_input(
+            "Stock buy price",
+            step=0.01,
+            min_value=0.01,
+            format="%.2f",
+        )
+        quantity = stocks_form.number_input("Quantity", step=1, min_value=1)
+        if stocks_form.form_submit_button("Add"):
+            st.session_state.pop("selected_stock_name", None)
+            save_stock(symbol, stock_name, buy_date, buy_price, quantity)
+
+
+def select_lot(symbol: str):
+    lots = st.session_state["holdings"].lots_of(symbol)
+    if lots.empty:
+        return None
+    labels = [
+        f"{lot.buy_date} · {int(lot.quantity)} @ {lot.buy_price:.2f}"
+        for lot in lots.itertuples()
+    ]
+    position = st.selectbox(
+        "Lot", range(len(lots)), format_func=lambda i: labels[i], key="lot"
+    )
+    return lots.iloc[position]
 
 
 @st.dialog("Edit a stock")
@@ -335,11 +495,14 @@ def open_edit_stock(row_num: int):
     if not selected_row.empty:
         symbol = selected_row["symbol"]
         quote_name = selected_row["stock_name"]
+        lot = select_lot(symbol)
+        if lot is None:
+            return
         stocks_edit_form = st.form(key="Edit stock")
         stocks_edit_form.text_input("Stock Name", value=quote_name, disabled=True)
         buy_date = stocks_edit_form.date_input(
             "Stock buy date",
-            value=selected_row["buy_date"],
+            value=lot["buy_date"],
             help="When did you buy this?",
             min_value="2000-01-01",
             max_value=date.today(),
@@ -350,13 +513,13 @@ def open_edit_stock(row_num: int):
             step=0.01,
             min_value=0.01,
             format="%.2f",
-            value=selected_row["buy_price"],
+            value=float(lot["buy_price"]),
         )
         quantity = stocks_edit_form.number_input(
-            "Quantity", step=1, min_value=1, value=selected_row["quantity"]
+            "Quantity", step=1, min_value=1, value=int(lot["quantity"])
         )
         if stocks_edit_form.form_submit_button("Save"):
-            save_stock(symbol, None, buy_date, buy_price, quantity)
+            save_stock(symbol, None, buy_date, buy_price, quantity, int(lot["id"]))
 
 
 @st.dialog("Delete a stock")
@@ -366,11 +529,14 @@ def open_delete_stock(row_num: int):
     if not selected_row.empty:
         symbol = selected_row["symbol"]
         quote_name = selected_row["stock_name"]
+        lot = select_lot(symbol)
+        if lot is None:
+            return
         stocks_delete_form = st.form(key="Delete stock")
         stocks_delete_form.text_input("Stock Name", value=quote_name, disabled=True)
         stocks_delete_form.date_input(
             "Stock buy date",
-            value=selected_row["buy_date"],
+            value=lot["buy_date"],
             help="When did you buy this?",
             min_value="2000-01-01",
             max_value=date.today(),
@@ -382,18 +548,135 @@ def open_delete_stock(row_num: int):
             step=0.01,
             min_value=0.01,
             format="%.2f",
-            value=selected_row["buy_price"],
+            value=float(lot["buy_price"]),
             disabled=True,
         )
         stocks_delete_form.number_input(
             "Quantity",
             step=1,
             min_value=1,
-            value=selected_row["quantity"],
+            value=int(lot["quantity"]),
             disabled=True,
         )
         if stocks_delete_form.form_submit_button("Delete"):
-            save_stock(symbol)
+            save_stock(symbol, lot_id=int(lot["id"]))
+
+
+@st.dialog("Sell a stock")
+def open_sell_stock(row_num: int):
+    selected_row = st.session_state["df"].iloc[row_num]
+    if not selected_row.empty:
+        symbol = selected_row["symbol"]
+        quote_name = selected_row["stock_name"]
+        held = int(selected_row["quantity"])
+        if held < 1:
+            st.write(f"No open quantity left in '{quote_name}'")
+            return
+        stocks_sell_form = st.form(key="Sell stock")
+        stocks_sell_form.text_input("Stock Name", value=quote_name, disabled=True)
+        sell_date = stocks_sell_form.date_input(
+            "Stock sell date",
+            value="today",
+            help="When did you sell this?",
+            min_value="2000-01-01",
+            max_value=date.today(),
+            format="YYYY-MM-DD",
+        )
+        sell_price = stocks_sell_form.number_input(
+            "Stock sell price",
+            step=0.01,
+            min_value=0.01,
+            format="%.2f",
+            value=float(np.nan_to_num(selected_row["price"], nan=0.01)),
+        )
+        quantity = stocks_sell_form.number_input(
+            "Quantity", step=1, min_value=1, max_value=held, value=held
+        )
+        if stocks_sell_form.form_submit_button("Sell"):
+            sell_stock(symbol, sell_date, sell_price, quantity)
+
+
+def save_alert(symbol: str, kind: str = None, threshold: float = None, alert_id=None):
+    user_id = st.session_state.user_id
+    if alert_id is not None:
+        saved = execute_update(init_repository().delete_alert, user_id, alert_id)
+    else:
+        saved = execute_update(
+            init_repository().add_alert, user_id, symbol, kind, threshold, time.time()
+        )
+    if saved:
+        init_alert_engine().load(user_id)
+        st.rerun(scope="fragment")
+
+
+def show_alert_toasts():
+    user_id = st.session_state.user_id
+    # This worker evaluates alerts too, but the toasts come from the outbox,
+    # whichever worker fired them.
+    init_alert_engine()
+    pending = execute_query(init_repository().undelivered_alerts, user_id) or []
+    for _, message in pending:
+        st.toast(message, icon="🔔")
+    if pending:
+        execute_update(
+            init_repository().mark_alerts_delivered,
+            user_id,
+            [alert_id for alert_id, _ in pending],
+        )
+
+
+@st.dialog("Price alerts")
+def open_alerts(row_num: int):
+    selected_row = st.session_state["df"].iloc[row_num]
+    symbol = selected_row["symbol"]
+    st.write(
+        f"Alerts for '{selected_row['stock_name']}' are checked on every price "
+        "update, even with this page closed, and fire once."
+    )
+    alerts = execute_query(
+        init_repository().active_alerts, st.session_state.user_id, symbol
+    )
+    for alert in alerts or []:
+        col1, col2 = st.columns([4, 1])
+        col1.write(f"{ALERT_KINDS[alert.kind][2]} {alert.threshold:,.2f}")
+        if col2.button("Remove", key=f"alert_remove_{alert.id}"):
+            save_alert(symbol, alert_id=alert.id)
+    alerts_form = st.form(key="Add alert")
+    kind = alerts_form.selectbox(
+        "Alert when",
+        list(ALERT_KINDS),
+        format_func=lambda kind: ALERT_KINDS[kind][2],
+    )
+    threshold = alerts_form.number_input(
+        "Level",
+        step=0.01,
+        format="%.2f",
+        value=float(np.nan_to_num(selected_row["price"], nan=0.0)),
+        help="A price, a % move or a Profit/Loss amount, depending on the alert",
+    )
+    if alerts_form.form_submit_button("Add"):
+        save_alert(symbol, kind, threshold)
+
+
+@st.dialog("Import stocks")
+def open_import_stocks():
+    st.write(
+        "Upload a CSV with the columns symbol, stock_name, buy_date (YYYY-MM-DD), buy_price and quantity."
+    )
+    uploaded = st.file_uploader("Holdings CSV", type="csv")
+    if uploaded and st.button("Import", key="import_submit", type="primary"):
+        try:
+            result = import_holdings(
+                init_repository(),
+                st.session_state.user_id,
+                uploaded,
+            )
+            st.session_state["import_report"] = result
+            refresh_data(True)
+        except ValueError as e:
+            st.error(str(e))
+        except Exception as e:
+            st.error("Internal Error occurred!!!")
 
 
 @st.dialog("Stock information", width="large")
@@ -403,7 +686,216 @@ def open_stock_info(row_num: int):
     if not selected_row.empty:
         symbol = selected_row["symbol"]
         quote_name = selected_row["stock_name"]
-        components.iframe("", height=500)
+        history = init_history_store().read(
+            symbol, start=date.today() - timedelta(days=365)
+        )
+        if history.empty:
+            st.write(f"No price history available for '{quote_name}'")
+            return
+        fig = go.Figure(
+            go.Candlestick(
+                x=history.index,
+                open=history["open"],
+                high=history["high"],
+                low=history["low"],
+                close=history["close"],
+                name=symbol,
+            )
+        )
+        fig.update_layout(
+            title=quote_name,
+            height=500,
+            xaxis_rangeslider_visible=False,
+            margin=dict(l=0, r=0, t=40, b=0),
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+
+@st.dialog("Portfolio performance", width="large")
+def open_performance():
+    holdings = current_holdings().frame
+    events = cash_flows(
+        st.session_state["holdings"].lots, st.session_state["holdings"].sells
+    )
+    current_value = holdings.set_index("symbol")["current_value"]
+    benchmark = section("performance").get("benchmark", "^NSEI")
+    if "performance" not in st.session_state:
+        st.session_state["performance"] = PerformanceCache()
+    curve = st.session_state["performance"].curve_for(
+        events, init_history_store(), benchmark
+    )
+    col1, col2 = st.columns(2)
+    col1.metric(
+        label="Portfolio XIRR",
+        value="{:,.2f} %".format(
+            np.nan_to_num(portfolio_xirr(events, np.nansum(current_value)))
+        ),
+    )
+    if len(curve) > 0:
+        col2.metric(
+            label=f"Same cash flows in {benchmark}",
+            value=format_currency(
+                curve["benchmark"].iloc[-1], "INR", locale="en_IN"
+            ).replace("\xa0", " "),
+        )
+        fig = go.Figure()
+        for column, name in [
+            ("value", "Portfolio"),
+            ("benchmark", benchmark),
+            ("invested", "Invested"),
+        ]:
+            fig.add_trace(go.Scatter(x=curve.index, y=curve[column], name=name))
+        fig.update_layout(height=400, margin=dict(l=0, r=0, t=20, b=0))
+        st.plotly_chart(fig, use_container_width=True)
+    st.dataframe(
+        holdings[["stock_name", "buy_date", "investment", "current_value"]].assign(
+            xirr=holding_xirr(events, current_value)
+            .reindex(holdings["symbol"])
+            .to_numpy()
+        ),
+        column_config={
+            "stock_name": "Stock Name",
+            "buy_date": "Buy Date",
+            "investment": st.column_config.NumberColumn("Investment", format="%.2f"),
+            "current_value": st.column_config.NumberColumn(
+                "Market Value", format="%.2f"
+            ),
+            "xirr": st.column_config.NumberColumn("XIRR %", format="%.2f"),
+        },
+        hide_index=True,
+        use_container_width=True,
+    )
+
+
+@st.dialog("Portfolio risk", width="large")
+def open_risk():
+    holdings = current_holdings()
+    settings = section("risk")
+    benchmark = section("performance").get("benchmark", "^NSEI")
+    confidence = settings.get("confidence", 0.95)
+    if "risk" not in st.session_state:
+        st.session_state["risk"] = RiskCache()
+    report = st.session_state["risk"].report_for(
+        (holdings.user_id, id(holdings), holdings.version),
+        holdings.frame.set_index("symbol")["current_value"],
+        init_history_store(),
+        benchmark,
+        lookback_years=settings.get("lookback_years", 5),
+        confidence=confidence,
+    )
+    summary = report.portfolio
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric(
+        label="Volatility (annualized)",
+        value="{:,.2f} %".format(np.nan_to_num(summary["volatility"])),
+    )
+    col2.metric(
+        label=f"Beta vs {benchmark}",
+        value="{:,.2f}".format(np.nan_to_num(summary["beta"])),
+    )
+    col3.metric(
+        label="Max Drawdown",
+        value="{:,.2f} %".format(summary["max_drawdown"]),
+    )
+    col4.metric(
+        label=f"1-day VaR ({confidence:.0%})",
+        value=format_currency(
+            np.nan_to_num(summary["var_historical"]), "INR", locale="en_IN"
+        ).replace("\xa0", " "),
+        help="Historical; parametric: "
+        + format_currency(
+            np.nan_to_num(summary["var_parametric"]), "INR", locale="en_IN"
+        ).replace("\xa0", " "),
+    )
+    st.caption(f"{summary['days']} trading days, weighted by today's market value")
+    top = (
+        report.holdings["weight"]
+        .nlargest(settings.get("max_heatmap", 30))
+        .index.tolist()
+    )
+    if len(top) > 1:
+        fig = go.Figure(
+            go.Heatmap(
+                z=report.correlation.loc[top, top].to_numpy(),
+                x=top,
+                y=top,
+                zmin=-1,
+                zmax=1,
+                colorscale="RdBu",
+                reversescale=True,
+            )
+        )
+        fig.update_layout(height=500, margin=dict(l=0, r=0, t=20, b=0))
+        st.plotly_chart(fig, use_container_width=True)
+    st.dataframe(
+        report.holdings.reset_index(),
+        column_config={
+            "symbol": "Symbol",
+            "weight": st.column_config.NumberColumn("Weight %", format="%.2f"),
+            "volatility": st.column_config.NumberColumn("Volatility %", format="%.2f"),
+            "beta": st.column_config.NumberColumn("Beta", format="%.2f"),
+            "max_drawdown": st.column_config.NumberColumn(
+                "Max Drawdown %", format="%.2f"
+            ),
+            "var_historical": st.column_config.NumberColumn(
+                "VaR (historical)", format="%.2f"
+            ),
+            "var_parametric": st.column_config.NumberColumn(
+                "VaR (parametric)", format="%.2f"
+            ),
+        },
+        hide_index=True,
+        use_container_width=True,
+    )
+
+
+ALLOCATION_LEVELS = {
+    "Sector / Industry": ["sector", "industry"],
+    "Market cap / Sector": ["market_cap_bucket", "sector"],
+}
+
+
+@st.dialog("Portfolio allocation", width="large")
+def open_allocation():
+    holdings = current_holdings().frame
+    store = init_metadata_store()
+    metadata = store.get(holdings["symbol"])
+    grouping = st.radio(
+        "Group by", list(ALLOCATION_LEVELS), horizontal=True, key="allocation_by"
+    )
+    levels = ALLOCATION_LEVELS[grouping]
+    rollup = allocation(holdings, metadata, levels)
+    nodes = treemap_nodes(rollup, levels)
+    fig = go.Figure(
+        go.Treemap(
+            ids=nodes["id"],
+            parents=nodes["parent"],
+            labels=nodes["label"],
+            values=nodes["value"],
+            branchvalues="total",
+            texttemplate="%{label}<br>%{percentRoot:.1%}",
+        )
+    )
+    fig.update_layout(height=500, margin=dict(l=0, r=0, t=20, b=0))
+    st.plotly_chart(fig, use_container_width=True)
+    missing = int(metadata["sector"].isna().sum())
+    if missing:
+        st.caption(f"Sector details are still loading for {missing} holding(s).")
+    st.dataframe(
+        rollup,
+        column_config={
+            "sector": "Sector",
+            "industry": "Industry",
+            "market_cap_bucket": "Market Cap",
+            "current_value": st.column_config.NumberColumn(
+                "Market Value", format="%.2f"
+            ),
+            "holdings": "Holdings",
+            "weight": st.column_config.NumberColumn("Weight %", format="%.2f"),
+        },
+        hide_index=True,
+        use_container_width=True,
+    )
 
 
 def show_login_form(is_login: bool):
@@ -413,9 +905,8 @@ def show_login_form(is_login: bool):
 def login(user_id_param, password_param):
     user_id_lower = user_id_param.lower().replace(" ", "")
     try:
-        rows = execute_query("select * from users where user_id = ?;", user_id_lower)
-        # Print results.
-        for user in rows:
+        user = init_repository().find_user(user_id_lower)
+        if user is not None:
             decrypted_password = decrypt_password(user.user_pass)
             if decrypted_password == password_param:
                 st.session_state.name = user.name
@@ -435,18 +926,12 @@ def login(user_id_param, password_param):
 def register(name_param, user_id_param, password_param):
     user_id_lower = user_id_param.lower()
     try:
-        rows = execute_query("select * from users where user_id = ?;", user_id_lower)
-        if len(rows) > 0:
+        if init_repository().find_user(user_id_lower) is not None:
             st.write(f"User Id '{user_id_param}' already registered!!!")
             show_login_form(True)
         else:
             encrypted_password = encrypt_password(password_param)
-            execute_update(
-                "insert into users (name, user_id, user_pass) values(?,?,?);",
-                name_param,
-                user_id_lower,
-                encrypted_password,
-            )
+            init_repository().add_user(name_param, user_id_lower, encrypted_password)
             st.write("Registered successfully!!!")
             show_login_form(True)
 
@@ -510,58 +995,93 @@ def open_login_form():
             show_login_form(True)
 
 
+@st.fragment(run_every=live_interval())
+def show_market():
+    indices = market_indices()
+    with perf.span("index_strip"):
+        index_quotes = init_index_strip().get()
+    *index_cols, col5 = st.columns(len(indices) + 1)
+    for col, index in zip(index_cols, indices):
+        current, change, percentage_change = find_prices(
+            index_quotes.get(index["symbol"])
+        )
+        col.metric(
+            label="[%s](%s)"
+            % (
+                index["label"],
+                f"https://finance.yahoo.com/chart/{index['symbol']}/",
+            ),
+            value=current,
+            delta=f"{change} ({percentage_change})",
+        )
+    with col5:
+        if st.button(
+            "View Portfolio",
+            key="show_login_key",
+            help="Login to view your portfolio",
+            use_container_width=True,
+            type="primary",
+            disabled=st.session_state.login_success,
+        ):
+            init_repository()
+            open_login_form()
+    show_data_age()
+    pause_after_close()
+
+
 st.subheader("Market", divider="rainbow")
-current_nifty, change_nifty, percentage_change_nifty = find_prices("^NSEI")
-current_mid, change_mid, percentage_change_mid = find_prices("NIFTY_MIDCAP_100.NS")
-current_small, change_small, percentage_change_small = find_prices("^CNXSC")
-current_bank, change_bank, percentage_change_bank = find_prices("^NSEBANK")
-col1, col2, col3, col4, col5 = st.columns(5)
-with col2:
-    st.metric(
-        label="[Nifty](%s)" % "https://finance.yahoo.com/chart/^NSEI/",
-        value=current_nifty,
-        delta=f"{change_nifty} ({percentage_change_nifty})",
-    )
-with col3:
-    st.metric(
-        label="[Midcap 100](%s)"
-        % "https://finance.yahoo.com/chart/NIFTY_MIDCAP_100.NS/",
-        value=current_mid,
-        delta=f"{change_mid} ({percentage_change_mid})",
-    )
-with col4:
-    st.metric(
-        label="[Smallcap 100](%s)" % "https://finance.yahoo.com/chart/^CNXSC/",
-        value=current_small,
-        delta=f"{change_small} ({percentage_change_small})",
-    )
-with col1:
-    st.metric(
-        label="[Bank Nifty](%s)" % "https://finance.yahoo.com/chart/^NSEBANK/",
-        value=current_bank,
-        delta=f"{change_bank} ({percentage_change_bank})",
-    )
-with col5:
-    if st.button(
-        "View Portfolio",
-        key="show_login_key",
-        help="Login to view your portfolio",
-        use_container_width=True,
-        type="primary",
-        disabled=st.session_state.login_success,
-    ):
-        init_connection()
-        open_login_form()
+show_market()
+
+
+SORT_LABELS = {
+    "stock_name": "Stock Name",
+    "buy_date": "Buy Date",
+    "investment": "Investment",
+    "current_value": "Market Value",
+    "profit": "Profit/Loss",
+    "profit_percentage": "Profit/Loss %",
+    "profit_today": "Today's Profit/Loss",
+    "profit_percentage_today": "Today's Profit/Loss %",
+    "realized": "Realized Profit/Loss",
+}
+
+
+def selected_rows(table_key: str, positions: np.ndarray, selection: list) -> list:
+    # The table reports the rows picked as they were on screen at the click,
+    # and a live tick may since have revalued and re-sorted the view. The pick
+    # is pinned to the stock it was made on and followed to its row in df.
+    symbols = st.session_state.df["symbol"].to_numpy()
+    shown = st.session_state.get("table_shown")
+    pinned = st.session_state.get("table_pinned")
+    if not selection:
+        pinned = None
+    elif pinned is None or pinned[:2] != (table_key, tuple(selection)):
+        if shown is not None and shown[0] == table_key:
+            on_screen = shown[1]
+        else:
+            on_screen = symbols[positions]
+        row = selection[0]
+        pinned = None
+        if row < len(on_screen):
+            pinned = (table_key, tuple(selection), on_screen[row])
+    st.session_state["table_pinned"] = pinned
+    st.session_state["table_shown"] = (table_key, symbols[positions])
+    if pinned is None:
+        return []
+    return np.flatnonzero(symbols == pinned[2])[:1].tolist()
 
 
-if st.session_state.login_success and "df" in st.session_state:
-    st.subheader(
-        f"My Portfolio: {st.session_state.user_name if st.session_state.user_name else ''}",
-        divider="rainbow",
-    )
+@st.fragment(run_every=live_interval())
+def show_holdings():
+    if live_interval():
+        revalue_live()
+
+    if alerts_enabled():
+        show_alert_toasts()
 
-    if len(st.session_state.df) > 0:
-        col1, col2, col3, col4, col5 = st.columns(5)
+    rows = st.session_state.get("df", st.session_state.get("summary"))
+    if len(rows) > 0:
+        col1, col2, col3, col4, col5, col6, col7 = st.columns(7)
         col1.metric(
             label="Total Investment",
             value=format_currency(
@@ -584,7 +1104,31 @@ if st.session_state.login_success and "df" in st.session_state:
             delta=f"{format_currency(st.session_state['profit_today'], 'INR', locale='en_IN').replace(u'\xa0', u' ')} ({
             '{:,.3f} %'.format(st.session_state['profit_percentage_today'])})",
         )
+        if col4.button(
+            "Performance",
+            key="performance_key",
+            help="Portfolio value over time and XIRR",
+            use_container_width=True,
+            type="primary",
+        ):
+            open_performance()
         if col5.button(
+            "Risk",
+            key="risk_key",
+            help="Volatility, beta, drawdown and VaR of the holdings",
+            use_container_width=True,
+            type="primary",
+        ):
+            open_risk()
+        if col6.button(
+            "Allocation",
+            key="allocation_key",
+            help="Market value by sector, industry and market cap",
+            use_container_width=True,
+            type="primary",
+        ):
+            open_allocation()
+        if col7.button(
             "Refresh",
             key="refresh_key",
             help="Click to refresh the prices",
@@ -593,106 +1137,157 @@ if st.session_state.login_success and "df" in st.session_state:
         ):
             refresh_data()
 
-    event = st.dataframe(
-        st.session_state.df.style.map(
-            color_profit_loss,
-            subset=[
+    if not st.toggle("Show holdings", value=holdings_visible(), key="show_table"):
+        pause_after_close()
+        return
+    current_holdings()
+    table = st.session_state["table"]
+    page_size = section("table").get("page_size", 200)
+    if len(table.frame) > page_size:
+        col1, col2, col3, col4 = st.columns([3, 2, 1, 1])
+        query = col1.text_input(
+            "Filter", key="table_query", placeholder="Symbol or stock name"
+        )
+        sort_by = col2.selectbox(
+            "Sort by",
+            list(SORT_LABELS),
+            format_func=SORT_LABELS.get,
+            key="table_sort",
+        )
+        ascending = col3.toggle("Ascending", key="table_ascending")
+        page = col4.number_input("Page", min_value=1, step=1, key="table_page")
+        view = table.view(query, sort_by, ascending, page - 1, page_size)
+        st.caption(
+            f"{view.rows} of {len(table.frame)} stocks, page "
+            f"{min(page, view.pages)} of {view.pages}"
+        )
+        # A new slice starts with no selection (see selected_rows).
+        table_key = f"data-{query}-{sort_by}-{ascending}-{page}"
+    else:
+        view = table.view()
+        table_key = "data"
+
+    with perf.span("render_table"):
+        event = st.dataframe(
+            view.styled,
+            key=table_key,
+            on_select="rerun",
+            selection_mode=["single-row"],
+            column_order=[
+                "link",
+                "stock_name",
+                "buy_date",
+                "buy_price",
+                "quantity",
+                "lots",
+                "price",
+                "investment",
+                "current_value",
                 "profit",
                 "profit_percentage",
                 "profit_today",
                 "profit_percentage_today",
+                "realized",
             ],
-        ),
-        # st.session_state.df,
-        key="data",
-        on_select="rerun",
-        selection_mode=["single-row"],
-        column_order=[
-            "link",
-            "stock_name",
-            "buy_date",
-            "buy_price",
-            "quantity",
-            "price",
-            "investment",
-            "current_value",
-            "profit",
-            "profit_percentage",
-            "profit_today",
-            "profit_percentage_today",
-        ],
-        column_config={
-            "link": st.column_config.LinkColumn(
-                "Symbol",
-                help="Stock information",
-                display_text=r"https://finance\.yahoo\.com/chart/(.*?)/",
-            ),
-            "stock_name": "Stock Name",
-            "buy_date": st.column_config.DateColumn(
-                "Buy Date",
-                help="When did you buy this?",
-                min_value=date(2000, 1, 1),
-                max_value=date.today(),
-                format="YYYY-MM-DD",
-                step=1,
-            ),
-            "buy_price": st.column_config.NumberColumn(
-                "Buy Price",
-                help="Stock buy price",
-                format="%.2f",
-            ),
-            "quantity": st.column_config.NumberColumn(
-                "Quantity",
-                help="Quantity?",
-            ),
-            "price": st.column_config.NumberColumn(
-                "Price",
-                help="Stock price",
-                format="%.2f",
-            ),
-            "investment": st.column_config.NumberColumn(
-                "Investment",
-                help="Investment",
-                format="%.2f",
-            ),
-            "current_value": st.column_config.NumberColumn(
-                "Market Value",
-                help="Market Value",
-                format="%.2f",
-            ),
-            "profit": st.column_config.NumberColumn(
-                "Profit/Loss",
-                help="Profit/Loss",
-                format="%.2f",
-            ),
-            "profit_percentage": st.column_config.NumberColumn(
-                "Profit/Loss %",
-                help="Profit/Loss %",
-                format="%.3f",
-            ),
-            "profit_today": st.column_config.NumberColumn(
-                "Today's Profit/Loss",
-                help="Today's Profit/Loss",
-                format="%.2f",
-            ),
-            "profit_percentage_today": st.column_config.NumberColumn(
-                "Today's Profit/Loss %",
-                help="Today's Profit/Loss %",
-                format="%.3f",
-            ),
-        },
-        hide_index=True,
-        use_container_width=True,
-    )
+            column_config={
+                "link": st.column_config.LinkColumn(
+                    "Symbol",
+                    help="Stock information",
+                    display_text=r"https://finance\.yahoo\.com/chart/(.*?)/",
+                ),
+                "stock_name": "Stock Name",
+                "buy_date": st.column_config.DateColumn(
+                    "Buy Date",
+                    help="When did you buy this?",
+                    min_value=date(2000, 1, 1),
+                    max_value=date.today(),
+                    format="YYYY-MM-DD",
+                    step=1,
+                ),
+                "buy_price": st.column_config.NumberColumn(
+                    "Avg Buy Price",
+                    help="Weighted average buy price of the open lots",
+                    format="%.2f",
+                ),
+                "quantity": st.column_config.NumberColumn(
+                    "Quantity",
+                    help="Quantity?",
+                ),
+                "lots": st.column_config.NumberColumn(
+                    "Lots",
+                    help="Number of buys",
+                ),
+                "price": st.column_config.NumberColumn(
+                    "Price",
+                    help="Stock price",
+                    format="%.2f",
+                ),
+                "investment": st.column_config.NumberColumn(
+                    "Investment",
+                    help="Investment",
+                    format="%.2f",
+                ),
+                "current_value": st.column_config.NumberColumn(
+                    "Market Value",
+                    help="Market Value",
+                    format="%.2f",
+                ),
+                "profit": st.column_config.NumberColumn(
+                    "Profit/Loss",
+                    help="Profit/Loss",
+                    format="%.2f",
+                ),
+                "profit_percentage": st.column_config.NumberColumn(
+                    "Profit/Loss %",
+                    help="Profit/Loss %",
+                    format="%.3f",
+                ),
+                "profit_today": st.column_config.NumberColumn(
+                    "Today's Profit/Loss",
+                    help="Today's Profit/Loss",
+                    format="%.2f",
+                ),
+                "profit_percentage_today": st.column_config.NumberColumn(
+                    "Today's Profit/Loss %",
+                    help="Today's Profit/Loss %",
+                    format="%.3f",
+                ),
+                "realized": st.column_config.NumberColumn(
+                    "Realized Profit/Loss",
+                    help="Profit/Loss booked on sells (FIFO)",
+                    format="%.2f",
+                ),
+            },
+            hide_index=True,
+            use_container_width=True,
+        )
 
     st.html(
         """
         <hr color="linear-gradient(to right, #ff6c6c, #ffbd45, #3dd56d, #3d9df3, #9a5dff)">
         """
     )
-    is_disabled = len(event.selection.rows) == 0
-    col1, col2, col3, col4, col5 = st.columns(5)
-    if col5.button(
+    rows = selected_rows(table_key, view.positions, event.selection.rows)
+    is_disabled = len(rows) == 0
+    if not is_disabled:
+        selected_symbol = st.session_state.df.iloc[rows[0]]["symbol"]
+        with st.expander(f"Lots of {selected_symbol}"):
+            st.dataframe(
+                st.session_state["holdings"].lots_of(selected_symbol),
+                column_order=["buy_date", "buy_price", "quantity", "remaining"],
+                column_config={
+                    "buy_date": "Buy Date",
+                    "buy_price": st.column_config.NumberColumn(
+                        "Buy Price", format="%.2f"
+                    ),
+                    "quantity": "Quantity",
+                    "remaining": "Open Quantity",
+                },
+                hide_index=True,
+                use_container_width=True,
+            )
+    col1, col2, col3, col4, col5, col6, col7 = st.columns(7)
+    if col7.button(
         "Add",
         key="add",
         icon="➕",
@@ -711,7 +1306,7 @@ if st.session_state.login_success and "df" in st.session_state:
         help="Select a row to edit",
         type="primary",
     ):
-        open_edit_stock(event.selection.rows[0])
+        open_edit_stock(rows[0])
 
     if col2.button(
         "Delete",
@@ -722,4 +1317,111 @@ if st.session_state.login_success and "df" in st.session_state:
         help="Select a row to delete",
         type="primary",
     ):
-        open_delete_stock(event.selection.rows[0])
+        open_delete_stock(rows[0])
+
+    if col3.button(
+        "Sell",
+        key="sell",
+        disabled=is_disabled,
+        icon="💰",
+        use_container_width=True,
+        help="Select a row to sell",
+        type="primary",
+    ):
+        open_sell_stock(rows[0])
+
+    if col4.button(
+        "Chart",
+        key="chart",
+        disabled=is_disabled,
+        icon="📈",
+        use_container_width=True,
+        help="Select a row to view its price chart",
+        type="primary",
+    ):
+        open_stock_info(rows[0])
+
+    if col5.button(
+        "Alerts",
+        key="alerts",
+        disabled=is_disabled or not alerts_enabled(),
+        icon="🔔",
+        use_container_width=True,
+        help="Select a row to set price alerts",
+        type="primary",
+    ):
+        open_alerts(rows[0])
+
+    if col6.button(
+        "Import",
+        key="import",
+        icon="📥",
+        use_container_width=True,
+        help="Import stocks from a CSV file",
+        type="primary",
+    ):
+        open_import_stocks()
+    pause_after_close()
+
+
+if st.session_state.login_success and (
+    "df" in st.session_state or "summary" in st.session_state
+):
+    st.subheader(
+        f"My Portfolio: {st.session_state.user_name if st.session_state.user_name else ''}",
+        divider="rainbow",
+    )
+
+    show_holdings()
+
+    if "import_report" in st.session_state:
+        report = st.session_state["import_report"]
+        st.write(f"{report.inserted} stock(s) imported successfully!!!")
+        if len(report.errors) > 0:
+            st.write(f"{len(report.errors)} row(s) skipped:")
+            st.dataframe(report.errors, hide_index=True, use_container_width=True)
+            st.download_button(
+                "Download error report",
+                report.errors.to_csv(index=False),
+                file_name="import_errors.csv",
+                mime="text/csv",
+            )
+        if st.button("Dismiss", key="import_dismiss"):
+            st.session_state.pop("import_report", None)
+            st.rerun()
+
+
+if perf.is_enabled():
+    perf_settings = section("perf")
+    if perf_settings.get("prometheus_file"):
+        perf.write_prometheus(perf_settings["prometheus_file"])
+    if perf_settings.get("log"):
+        perf.log_rerun(session_id())
+# The panel shows pool and cache internals, so only to a signed-in user.
+if st.session_state.login_success and (
+    perf.is_enabled() or st.session_state.get("show_perf")
+):
+    with st.sidebar:
+        st.subheader("Performance", divider="rainbow")
+        st.caption("This rerun")
+        st.dataframe(
+            pd.DataFrame.from_dict(perf.rerun_stats(), orient="index"),
+            use_container_width=True,
+        )
+        if perf.is_enabled():
+            st.caption("Process since start")
+            st.dataframe(
+                pd.DataFrame.from_dict(perf.process_stats(), orient="index"),
+                use_container_width=True,
+            )
+        st.caption("Database pool")
+        st.json(init_connection().stats())
+        st.caption("Shared cache")
+        st.json(init_cache().stats())
+        if perf.is_enabled():
+            st.download_button(
+                "Download metrics",
+                perf.prometheus_text(),
+                file_name="portfolio_metrics.prom",
+                mime="text/plain",
+            )
@@ -0,0 +1,109 @@
+"""Fetch-layer benchmarks against a local fake of Yahoo's quote endpoints.
+
+Measures how long a portfolio's quotes take through the Fetcher (worker pool,
+token bucket, retries, circuit breaker) when the host is healthy, slow,
+throttling, or down, and how many symbols are still answered:
+
+    python benchmarks/bench_fetch.py --symbols 200 --output bench_fetch.json
+
+--provider chart times the per-symbol chart requests instead of the batched
+spark ones.
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.fakes import FakeChartServer  # noqa: E402
+from portfolio.fetch import Fetcher  # noqa: E402
+from portfolio.quotes import (  # noqa: E402
+    QuoteEngine,
+    YahooChartProvider,
+    YahooSparkProvider,
+)
+
+PROVIDERS = {"spark": YahooSparkProvider, "chart": YahooChartProvider}
+
+SCENARIOS = {
+    "healthy": {},
+    "slow": {"delay": 0.2},
+    "throttled": {"failures": [429] * 5, "retry_after": 0},
+    "down": {"failures": [503] * 100000},
+}
+
+
+def run_scenario(name: str, symbols: list[str], args) -> dict:
+    server = FakeChartServer(**SCENARIOS[name]).start()
+    fetcher = Fetcher(
+        max_workers=args.workers,
+        rate=args.rate,
+        burst=args.rate,
+        retries=2,
+        backoff_base=0.05,
+        backoff_cap=0.5,
+        failure_threshold=10,
+        reset_after=60,
+    )
+    provider = PROVIDERS[args.provider]
+    engine = QuoteEngine(provider(server.url, timeout=5), fetcher=fetcher)
+    # Warm the last-known quotes from a healthy pass, as a running app would.
+    healthy = FakeChartServer().start()
+    previous = QuoteEngine(provider(healthy.url)).fetch(symbols)
+    healthy.shutdown()
+    engine.last_known.update(previous)
+    started = time.perf_counter()
+    quotes = engine.fetch(symbols)
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+    return {
+        "scenario": name,
+        "symbols": len(symbols),
+        "answered": len(quotes),
+        "fresh": sum(quotes[s] is not previous.get(s) for s in quotes),
+        "requests": server.requests,
+        "elapsed_s": elapsed,
+        "breaker": fetcher.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--symbols", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=200)
+    parser.add_argument("--provider", choices=sorted(PROVIDERS), default="spark")
+    parser.add_argument("--output", default="bench_fetch.json")
+    args = parser.parse_args()
+
+    symbols = [f"SYM{i:05d}.NS" for i in range(args.symbols)]
+    results = []
+    for name in SCENARIOS:
+        result = run_scenario(name, symbols, args)
+        results.append(result)
+        print(
+            f"{name:>10}: {result['answered']}/{result['symbols']} answered "
+            f"({result['fresh']} fresh), "
+            f"{result['requests']} requests, {result['elapsed_s']:.3f}s"
+        )
+
+    with open(args.output, "w") as f:
+        json.dump(
+            {
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "provider": args.provider,
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Import-time breakdown of app.py's startup.
+
+Runs app.py's module-level imports in fresh interpreters under
+`python -X importtime` and reports their total and the cost per top-level
+package, then times each module the app only imports on first use on top of
+them, and checks that none of those is already loaded at start:
+
+    python benchmarks/bench_imports.py --repeat 5 --output bench_imports.json
+"""
+
+import argparse
+import ast
+import json
+import platform
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Imported inside the functions that need them, not when app.py starts.
+DEFERRED = ["yfinance", "streamlit_searchbox", "cryptography.fernet", "pyodbc"]
+
+
+def startup_imports(path: Path) -> str:
+    source = path.read_text()
+    return "\n".join(
+        ast.get_source_segment(source, node)
+        for node in ast.parse(source).body
+        if isinstance(node, (ast.Import, ast.ImportFrom))
+    )
+
+
+def run(code: str) -> tuple[str, str]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return result.stdout, result.stderr
+
+
+def packages(importtime: str) -> dict[str, float]:
+    # Cumulative seconds per top-level package, from the outermost imports.
+    totals = defaultdict(float)
+    for line in importtime.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if name.startswith("  "):
+            continue
+        totals[name.strip().split(".")[0]] += int(cumulative) / 1e6
+    return dict(totals)
+
+
+def measure_startup(imports: str, repeat: int) -> dict:
+    runs = [packages(run(imports)[1]) for _ in range(repeat)]
+    names = {name for totals in runs for name in totals}
+    by_package = {
+        name: statistics.median(totals.get(name, 0.0) for totals in runs)
+        for name in names
+    }
+    check = f"import sys\nprint(*[m for m in {DEFERRED!r} if m in sys.modules])"
+    return {
+        "total_s": statistics.median(sum(totals.values()) for totals in runs),
+        "packages": dict(sorted(by_package.items(), key=lambda item: -item[1])),
+        "deferred_loaded": run(f"{imports}\n{check}")[0].split(),
+    }
+
+
+def measure_deferred(imports: str, module: str, repeat: int) -> float | None:
+    # Seconds to import `module` once the startup imports are in place.
+    code = (
+        f"{imports}\nimport time\nstarted = time.perf_counter()\n"
+        f"import {module}\nprint(time.perf_counter() - started)"
+    )
+    try:
+        return statistics.median(float(run(code)[0]) for _ in range(repeat))
+    except RuntimeError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--output", default="bench_imports.json")
+    args = parser.parse_args()
+
+    imports = startup_imports(ROOT / "app.py")
+    startup = measure_startup(imports, args.repeat)
+    print(f"app.py startup imports: {startup['total_s']:.3f}s")
+    for name, seconds in list(startup["packages"].items())[: args.top]:
+        print(f"  {name:<28} {seconds:7.3f}s")
+    if startup["deferred_loaded"]:
+        print(f"  loaded at start anyway: {', '.join(startup['deferred_loaded'])}")
+
+    deferred = {
+        module: measure_deferred(imports, module, args.repeat) for module in DEFERRED
+    }
+    print("on first use:")
+    for module, seconds in deferred.items():
+        shown = "not installed" if seconds is None else f"{seconds:7.3f}s"
+        print(f"  {module:<28} {shown}")
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "startup": startup,
+        "deferred": deferred,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
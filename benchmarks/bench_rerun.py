@@ -0,0 +1,167 @@
+"""Rerun-path benchmarks for app.py.
+
+Runs the real script through Streamlit's AppTest against an in-process fake
+yfinance and the SQLite database backend, and writes the results as JSON:
+
+    python benchmarks/bench_rerun.py --sizes 10 100 1000 --output bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+
+from benchmarks.fakes import install_fake_yfinance, seed_database  # noqa: E402
+from portfolio.settings import override  # noqa: E402
+
+SECRETS = {"SECRET_KEY": "CxPZB5cq1Z6hRuXSzY2JFPNyyyysZmtyf2PO3kiVJTk="}
+
+
+def new_session(user_id: int):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(ROOT / "app.py"), default_timeout=600)
+    for key, value in SECRETS.items():
+        at.secrets[key] = value
+    at.session_state["login_success"] = True
+    at.session_state["user_id"] = user_id
+    at.session_state["user_name"] = f"bench-{user_id}"
+    return at
+
+
+def timed_run(at):
+    started = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - started
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    # A run that never drew the portfolio (the script did not even compile,
+    # say) or left holdings unpriced is fast for the wrong reason.
+    if not at.dataframe or "df" not in at.session_state:
+        raise RuntimeError("the portfolio was not rendered")
+    unpriced = int(at.session_state["df"]["price"].isna().sum())
+    if unpriced:
+        raise RuntimeError(f"{unpriced} holding(s) were left without a price")
+    return elapsed
+
+
+def bench_valuation(user_id: int, repeat: int):
+    import pandas as pd
+
+    from benchmarks.fakes import fake_price
+    from portfolio.holdings_cache import HoldingsCache
+    from portfolio.lots import empty_sells
+    from portfolio.quotes import Quote, to_quote_table
+    from portfolio.db import sqlite_connect
+
+    conn = sqlite_connect(os.environ["BENCH_DB"])
+    lots = pd.read_sql(
+        "select id, symbol, stock_name, buy_date, buy_price, quantity from stocks where user_id = ?",
+        conn,
+        params=(user_id,),
+    )
+    conn.close()
+    quotes = to_quote_table(
+        {s: Quote(*fake_price(s), time.time()) for s in lots["symbol"]}
+    )
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        HoldingsCache(user_id, lots, empty_sells(), quotes)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def summarize(samples):
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "max": max(samples),
+        "runs": len(samples),
+    }
+
+
+def bench_size(size: int, user_id: int, repeat: int):
+    at = new_session(user_id)
+    tracemalloc.start()
+    cold = timed_run(at)
+    _, cold_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    warm = [timed_run(at) for _ in range(repeat)]
+
+    # Refresh: revalue every holding from the shared quote snapshot.
+    refresh = []
+    for _ in range(repeat):
+        at.session_state["is_refresh"] = True
+        refresh.append(timed_run(at))
+
+    return {
+        "holdings": size,
+        "cold_rerun_s": cold,
+        "cold_peak_bytes": cold_peak,
+        "warm_rerun_s": summarize(warm),
+        "refresh_rerun_s": summarize(refresh),
+        "valuation_s": summarize(bench_valuation(user_id, repeat)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+    output = Path(args.output).resolve()
+
+    workdir = tempfile.mkdtemp(prefix="portfolio-bench-")
+    os.environ["BENCH_DB"] = os.path.join(workdir, "bench.db")
+    users = {user_id: size for user_id, size in enumerate(args.sizes, start=1)}
+    seed_database(os.environ["BENCH_DB"], users)
+    install_fake_yfinance()
+    # Quotes come from the fake yfinance, not over HTTP.
+    override("fetch", provider="download")
+    # Keep the database, saved quote snapshot, price history and metadata out
+    # of the checkout so every cold run really starts cold.
+    override("database", backend="sqlite", sqlite_path=os.environ["BENCH_DB"])
+    override("market", snapshot_path=os.path.join(workdir, "quotes.db"))
+    override("history", path=os.path.join(workdir, "history"))
+    override("metadata", path=os.path.join(workdir, "metadata.db"))
+    os.chdir(ROOT)
+
+    results = []
+    for user_id, size in users.items():
+        result = bench_size(size, user_id, args.repeat)
+        results.append(result)
+        print(
+            f"{size:>6} holdings: cold {result['cold_rerun_s']:.3f}s, "
+            f"warm {result['warm_rerun_s']['median']:.3f}s, "
+            f"refresh {result['refresh_rerun_s']['median']:.3f}s, "
+            f"valuation {result['valuation_s']['median'] * 1000:.2f}ms"
+        )
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+import json
+import sqlite3
+import sys
+import threading
+import time
+import types
+import zlib
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+import numpy as np
+import pandas as pd
+
+from portfolio.migrations import migrate
+
+
+def _seed(symbol: str) -> int:
+    return zlib.crc32(symbol.encode())
+
+
+FAKE_SECTORS = ["Technology", "Financial Services", "Energy", "Healthcare"]
+
+
+def fake_price(symbol: str) -> tuple[float, float]:
+    price = 100 + (_seed(symbol) % 90000) / 100
+    return price, price * (1 - ((_seed(symbol) % 7) - 3) / 100)
+
+
+class FakeTicker:
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+
+    @property
+    def info(self) -> dict:
+        seed = _seed(self.symbol)
+        return {
+            "shortName": self.symbol.split(".")[0],
+            "sector": FAKE_SECTORS[seed % len(FAKE_SECTORS)],
+            "industry": f"Industry {seed % 20:02d}",
+            "marketCap": 10 ** (9 + seed % 4) * (1 + seed % 9),
+            "currency": "INR",
+            "currentPrice": fake_price(self.symbol)[0],
+        }
+
+    def history(self, period=None, start=None, interval="1d", **kwargs):
+        end = date.today()
+        start = start or end - timedelta(days=365 * 5)
+        dates = pd.bdate_range(start, end)
+        rng = np.random.default_rng(_seed(self.symbol))
+        close = fake_price(self.symbol)[0] * np.exp(
+            np.cumsum(rng.normal(0, 0.01, len(dates)))
+        )
+        return pd.DataFrame(
+            {
+                "Open": close,
+                "High": close * 1.01,
+                "Low": close * 0.99,
+                "Close": close,
+                "Volume": 1e6,
+            },
+            index=dates,
+        )
+
+
+class FakeSearch:
+    def __init__(self, query, **kwargs):
+        self.quotes = []
+
+
+def fake_download(tickers, **kwargs):
+    symbols = tickers.split() if isinstance(tickers, str) else list(tickers)
+    dates = pd.bdate_range(end=date.today(), periods=2)
+    closes = pd.DataFrame(
+        {s: list(reversed(fake_price(s))) for s in symbols}, index=dates
+    )
+    return pd.concat({"Close": closes}, axis=1)
+
+
+def install_fake_yfinance():
+    module = types.ModuleType("yfinance")
+    module.download = fake_download
+    module.Ticker = FakeTicker
+    module.Search = FakeSearch
+    module.exceptions = types.ModuleType("yfinance.exceptions")
+    module.exceptions.YFRateLimitError = type("YFRateLimitError", (Exception,), {})
+    sys.modules["yfinance"] = module
+    sys.modules["yfinance.exceptions"] = module.exceptions
+    return module
+
+
+class FakeChartServer(ThreadingHTTPServer):
+    # Local stand-in for Yahoo's v8 chart and v7 spark endpoints. `failures` is
+    # a list of status codes served (in order) before healthy responses
+    # resume, and `delay` adds latency to every response.
+    daemon_threads = True
+
+    def __init__(self, delay: float = 0.0, failures=(), retry_after: int = None):
+        super().__init__(("127.0.0.1", 0), _ChartHandler)
+        self.delay = delay
+        self.failures = list(failures)
+        self.retry_after = retry_after
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def _chart_meta(symbol: str) -> dict:
+    price, prev_close = fake_price(symbol)
+    return {
+        "symbol": symbol,
+        "regularMarketPrice": price,
+        "chartPreviousClose": prev_close,
+        "previousClose": prev_close,
+        "regularMarketTime": int(time.time()),
+    }
+
+
+class _ChartHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            status = server.failures.pop(0) if server.failures else 200
+        time.sleep(server.delay)
+        if status != 200:
+            self.send_response(status)
+            if server.retry_after is not None:
+                self.send_header("Retry-After", str(server.retry_after))
+            self.end_headers()
+            return
+        url = urlparse(self.path)
+        if url.path.endswith("/spark"):
+            symbols = parse_qs(url.query)["symbols"][0].split(",")
+            payload = {
+                "spark": {
+                    "result": [
+                        {"symbol": symbol, "response": [{"meta": _chart_meta(symbol)}]}
+                        for symbol in symbols
+                    ],
+                    "error": None,
+                }
+            }
+        else:
+            symbol = unquote(url.path.rsplit("/", 1)[-1])
+            payload = {
+                "chart": {"result": [{"meta": _chart_meta(symbol)}], "error": None}
+            }
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeRedis:
+    # The slice of the redis-py client RedisBackend uses, in memory, so the
+    # backend runs without a server. Expiry is checked on read.
+    def __init__(self):
+        self._data: dict[str, tuple[bytes, float]] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key: str):
+        entry = self._data.get(key)
+        if entry is None or entry[1] <= time.time():
+            self._data.pop(key, None)
+            return None
+        return entry[0]
+
+    def get(self, key: str):
+        with self._lock:
+            return self._get(key)
+
+    def mget(self, keys: list[str]) -> list:
+        with self._lock:
+            return [self._get(key) for key in keys]
+
+    def set(self, key: str, value: bytes, nx: bool = False, px: int = None):
+        with self._lock:
+            if nx and self._get(key) is not None:
+                return None
+            expires_at = time.time() + px / 1000 if px else float("inf")
+            self._data[key] = (value, expires_at)
+            return True
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            return sum(self._data.pop(key, None) is not None for key in keys)
+
+    def scan_iter(self, match: str = "*"):
+        prefix = match.rstrip("*")
+        with self._lock:
+            return [key for key in self._data if key.startswith(prefix)]
+
+    def pipeline(self):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, client: FakeRedis):
+        self.client = client
+        self.commands = []
+
+    def set(self, *args, **kwargs):
+        self.commands.append((args, kwargs))
+        return self
+
+    def execute(self) -> list:
+        return [self.client.set(*args, **kwargs) for args, kwargs in self.commands]
+
+
+def seed_users(path: str, users: dict[int, tuple[str, str]], secret_key: str):
+    # users maps id -> (login, password); passwords are stored the way the
+    # app's register() stores them.
+    from cryptography.fernet import Fernet
+
+    fernet = Fernet(secret_key)
+    conn = sqlite3.connect(path)
+    migrate(conn, "sqlite")
+    conn.executemany(
+        "insert or replace into users (id, name, user_id, user_pass) "
+        "values (?, ?, ?, ?)",
+        [
+            (user_id, login, login, fernet.encrypt(password.encode()).decode())
+            for user_id, (login, password) in users.items()
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+
+def seed_database(path: str, holdings: dict[int, int]):
+    # holdings maps user id -> number of lots; symbols are synthetic NSE tickers.
+    conn = sqlite3.connect(path)
+    migrate(conn, "sqlite")
+    for user_id, count in holdings.items():
+        conn.execute("delete from stocks where user_id = ?", (user_id,))
+        rng = np.random.default_rng(user_id)
+        days = rng.integers(30, 3000, count)
+        conn.executemany(
+            "insert into stocks (user_id, symbol, stock_name, buy_date, buy_price, quantity) values (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    user_id,
+                    f"SYM{i:05d}.NS",
+                    f"SYMBOL {i:05d} LTD",
+                    (date.today() - timedelta(days=int(days[i]))).isoformat(),
+                    float(rng.uniform(10, 2000)),
+                    int(rng.integers(1, 500)),
+                )
+                for i in range(count)
+            ],
+        )
+    conn.commit()
+    conn.close()
@@ -0,0 +1,303 @@
+"""Concurrent-session load test for app.py.
+
+Simulated users each drive their own AppTest session on a thread of this one
+process, so they share its connection pool, poller and caches the way browser
+sessions share a Streamlit server. Every user repeats the flow open page ->
+log in -> view portfolio -> refresh -> add, edit and delete a stock against
+the fake yfinance and the SQLite database backend. The number of sessions
+ramps up and each step reports throughput and p50/p95/p99 rerun latency per
+flow:
+
+    python benchmarks/load_test.py --sessions 1 5 10 25 --output load_test.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import warnings
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+
+from benchmarks.bench_rerun import SECRETS  # noqa: E402
+from benchmarks.fakes import (  # noqa: E402
+    install_fake_yfinance,
+    seed_database,
+    seed_users,
+)
+from portfolio.settings import override  # noqa: E402
+
+FLOWS = ["open", "login", "view", "refresh", "add", "edit", "delete"]
+PASSWORD = "load-test"
+NEW_SYMBOL = "LOADTEST.NS"
+
+
+def allow_concurrent_sessions():
+    # AppTest expects one run at a time per process: every run installs a mock
+    # Runtime and the app-test config flag, and removes both when it ends,
+    # pulling them from under any session still running. Keep the flag on for
+    # the whole test and let a run that finds no Runtime use the last one seen
+    # (the untimed warm-up pass sees one before any sessions overlap).
+    from streamlit import config
+    from streamlit.runtime import Runtime
+
+    config.set_option("global.appTest", True)
+    last = []
+
+    def instance(cls):
+        if cls._instance is not None:
+            last[:] = [cls._instance]
+            return cls._instance
+        if last:
+            return last[0]
+        raise RuntimeError("Runtime hasn't been created!")
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or bool(last))
+
+
+class Session:
+    # One simulated browser tab. Each step's reruns are timed and tagged with
+    # the flow they belong to. AppTest forgets an open dialog on the next
+    # rerun, so every step inside a dialog clicks its opener again, which is
+    # what the browser's still-open dialog amounts to.
+    def __init__(self, user_id: int, samples: list):
+        from streamlit.testing.v1 import AppTest
+
+        self.user_id = user_id
+        self.samples = samples
+        self.selected = None
+        self.at = AppTest.from_file(str(ROOT / "app.py"), default_timeout=600)
+        for key, value in SECRETS.items():
+            self.at.secrets[key] = value
+
+    def run(self, flow: str):
+        if self.selected is not None:
+            # AppTest does not carry a table selection from one run to the
+            # next the way the browser does, so it is sent with every run.
+            frame = self.at.session_state["df"]
+            rows = np.flatnonzero(frame["symbol"].to_numpy() == self.selected)
+            self.at.session_state["data"] = {
+                "selection": {"rows": rows[:1].tolist(), "columns": []}
+            }
+        started = time.perf_counter()
+        self.at.run()
+        elapsed = time.perf_counter() - started
+        error = self.at.exception[0].message if self.at.exception else None
+        self.samples.append((flow, elapsed, error))
+        if error:
+            raise RuntimeError(f"{flow}: {error}")
+
+    def lots(self):
+        return self.at.session_state["holdings"].lots_of(NEW_SYMBOL)
+
+    def expect(self, flow: str, ok: bool):
+        # The app reports a failed write and then reruns, which hides it.
+        if not ok:
+            raise RuntimeError(f"{flow}: the change did not reach the portfolio")
+
+    def button(self, key: str):
+        return self.at.button(key=key)
+
+    def submit(self, form: str, label: str):
+        return self.at.button(key=f"FormSubmitter:{form}-{label}")
+
+    def select_row(self, flow: str, symbol: str):
+        # Selecting a table row is a rerun of its own in the browser too.
+        self.selected = symbol
+        self.run(flow)
+
+    def open(self):
+        self.run("open")
+
+    def login(self):
+        self.button("show_login_key").click()
+        self.run("login")
+        self.at.text_input(key="userid_login").input(f"load{self.user_id}")
+        self.at.text_input(key="pass_login").input(PASSWORD)
+        self.button("show_login_key").click()
+        self.run("login")
+        self.button("show_login_key").click()
+        self.button("login").click()
+        self.run("login")
+        if not self.at.session_state["login_success"]:
+            raise RuntimeError("login: not logged in")
+
+    def view(self):
+        self.run("view")
+
+    def refresh(self):
+        self.button("refresh_key").click()
+        self.run("refresh")
+
+    def add(self):
+        self.button("add").click()
+        self.run("add")
+        searchbox = self.at.session_state["searchbox"]
+        searchbox["result"] = f"Load Test:::NSI:::{NEW_SYMBOL}"
+        self.at.session_state["searchbox"] = searchbox
+        self.button("add").click()
+        self.run("add")
+        self.at.number_input[0].set_value(100.0)
+        self.button("add").click()
+        self.submit("Add stocks", "Add").click()
+        self.run("add")
+        self.expect("add", len(self.lots()) == 1)
+
+    def edit(self):
+        self.select_row("edit", NEW_SYMBOL)
+        self.button("edit").click()
+        self.run("edit")
+        self.at.number_input[0].set_value(101.0)
+        self.button("edit").click()
+        self.submit("Edit stock", "Save").click()
+        self.run("edit")
+        self.expect("edit", self.lots()["buy_price"].tolist() == [101.0])
+
+    def delete(self):
+        self.select_row("delete", NEW_SYMBOL)
+        self.button("delete").click()
+        self.run("delete")
+        self.button("delete").click()
+        self.submit("Delete stock", "Delete").click()
+        self.run("delete")
+        self.selected = None
+        self.expect("delete", self.lots().empty)
+
+
+def simulate(
+    user_id: int, iterations: int, samples: list, done: list, errors: list, start
+):
+    start.wait()
+    for _ in range(iterations):
+        session = Session(user_id, samples)
+        try:
+            for flow in FLOWS:
+                getattr(session, flow)()
+                done.append(flow)
+        except Exception as e:
+            errors.append(f"user {user_id}: {e!r}")
+
+
+def percentiles(values: list[float]) -> dict:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": p50, "p95": p95, "p99": p99, "max": max(values)}
+
+
+def ramp_step(sessions: int, iterations: int) -> dict:
+    samples, done, errors = [], [], []
+    start = threading.Barrier(sessions + 1)
+    threads = [
+        threading.Thread(
+            target=simulate,
+            args=(user_id, iterations, samples, done, errors, start),
+            name=f"load-user-{user_id}",
+        )
+        for user_id in range(1, sessions + 1)
+    ]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    by_flow = defaultdict(list)
+    for flow, elapsed, _ in samples:
+        by_flow[flow].append(elapsed)
+    return {
+        "sessions": sessions,
+        "iterations": iterations,
+        "wall_s": wall,
+        "reruns": len(samples),
+        "reruns_per_s": len(samples) / wall if wall else None,
+        "flows_per_s": len(done) / wall,
+        "errors": errors,
+        "flows": {
+            flow: {"reruns": len(by_flow[flow]), **percentiles(by_flow[flow])}
+            for flow in FLOWS
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 5, 10, 25])
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--holdings", type=int, default=50)
+    parser.add_argument("--output", default="load_test.json")
+    args = parser.parse_args()
+    output = Path(args.output).resolve()
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    workdir = tempfile.mkdtemp(prefix="portfolio-load-")
+    os.environ["BENCH_DB"] = os.path.join(workdir, "bench.db")
+    users = range(1, max(args.sessions) + 1)
+    seed_database(os.environ["BENCH_DB"], {user_id: args.holdings for user_id in users})
+    seed_users(
+        os.environ["BENCH_DB"],
+        {user_id: (f"load{user_id}", PASSWORD) for user_id in users},
+        SECRETS["SECRET_KEY"],
+    )
+    install_fake_yfinance()
+    # Quotes come from the fake yfinance, not over HTTP.
+    override("fetch", provider="download")
+    override("database", backend="sqlite", sqlite_path=os.environ["BENCH_DB"])
+    override("market", snapshot_path=os.path.join(workdir, "quotes.db"))
+    override("history", path=os.path.join(workdir, "history"))
+    override("metadata", path=os.path.join(workdir, "metadata.db"))
+    override("cache", path=os.path.join(workdir, "cache.db"))
+    os.chdir(ROOT)
+    allow_concurrent_sessions()
+
+    # One untimed pass builds the process-wide resources (pool, poller, ...)
+    # so the first ramp step is not just the cold start.
+    warmup = ramp_step(1, 1)
+    if warmup["errors"]:
+        raise SystemExit(f"Warm-up failed: {warmup['errors'][0]}")
+
+    results = []
+    for sessions in args.sessions:
+        result = ramp_step(sessions, args.iterations)
+        results.append(result)
+        print(
+            f"{sessions:>4} sessions: {result['reruns_per_s']:.1f} reruns/s, "
+            f"{result['flows_per_s']:.2f} flows/s, {len(result['errors'])} errors"
+        )
+        for flow, stat in result["flows"].items():
+            if stat["reruns"]:
+                print(
+                    f"       {flow:<8} p50 {stat['p50'] * 1000:7.0f}ms  "
+                    f"p95 {stat['p95'] * 1000:7.0f}ms  "
+                    f"p99 {stat['p99'] * 1000:7.0f}ms"
+                )
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "holdings": args.holdings,
+        "flows": FLOWS,
+        "results": results,
+    }
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
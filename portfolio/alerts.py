@@ -0,0 +1,258 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Mapping, NamedTuple
+
+from portfolio.quotes import Quote
+from portfolio.summary import refresh_summary
+
+logger = logging.getLogger(__name__)
+
+# kind -> (metric, side, label). P&L alerts are turned into price levels from
+# the holding's open quantity and average cost when they are indexed.
+ALERT_KINDS = {
+    "price_above": ("price", "above", "Price at or above"),
+    "price_below": ("price", "below", "Price at or below"),
+    "move": ("move", "above", "Day's move (±%) at least"),
+    "pnl_above": ("price", "above", "Profit/Loss at or above"),
+    "pnl_below": ("price", "below", "Profit/Loss at or below"),
+}
+
+
+class Alert(NamedTuple):
+    id: int
+    user_id: int
+    symbol: str
+    kind: str
+    threshold: float
+
+
+class Fired(NamedTuple):
+    alert: Alert
+    value: float
+    ts: float
+    level: float = None
+
+    @property
+    def message(self) -> str:
+        label = ALERT_KINDS[self.alert.kind][2]
+        return (
+            f"{self.alert.symbol}: {label} {self.alert.threshold:,.2f} "
+            f"(price {self.value:,.2f})"
+        )
+
+
+def price_level(alert: Alert, quantity: float, buy_price: float):
+    # profit = quantity * (price - buy_price) is increasing in price, so a P&L
+    # threshold is a price threshold for the open quantity.
+    if alert.kind not in ("pnl_above", "pnl_below"):
+        return alert.threshold
+    if not quantity or quantity <= 0:
+        return None
+    return buy_price + alert.threshold / quantity
+
+
+class ThresholdIndex:
+    # Per (symbol, metric, side), alerts sorted so the ones a value crosses are
+    # always a suffix: "above" keys are stored negated. Firing is a bisect plus
+    # popping that suffix, so an update costs O(log n + fired).
+    def __init__(self):
+        self._keys: dict[tuple, list] = defaultdict(list)
+        self._alerts: dict[tuple, list] = defaultdict(list)
+        self._by_id: dict[int, tuple] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def add(self, alert: Alert, level: float):
+        metric, side, _ = ALERT_KINDS[alert.kind]
+        slot = (alert.symbol, metric, side)
+        key = -level if side == "above" else level
+        keys = self._keys[slot]
+        position = bisect_left(keys, key)
+        keys.insert(position, key)
+        self._alerts[slot].insert(position, alert)
+        self._by_id[alert.id] = slot
+
+    def remove(self, alert_id: int):
+        slot = self._by_id.pop(alert_id, None)
+        if slot is None:
+            return
+        alerts = self._alerts[slot]
+        for position, alert in enumerate(alerts):
+            if alert.id == alert_id:
+                del alerts[position]
+                del self._keys[slot][position]
+                break
+
+    def remove_user(self, user_id):
+        for alert_id in [a.id for a in self.alerts() if a.user_id == user_id]:
+            self.remove(alert_id)
+
+    def alerts(self) -> list[Alert]:
+        return [alert for alerts in self._alerts.values() for alert in alerts]
+
+    def symbols(self) -> set[str]:
+        return {slot[0] for slot, alerts in self._alerts.items() if alerts}
+
+    def fire(self, symbol: str, metric: str, value: float) -> list[tuple]:
+        # (alert, level) pairs, so an alert can be put back with add().
+        fired = []
+        for side, key in (("above", -value), ("below", value)):
+            slot = (symbol, metric, side)
+            keys = self._keys.get(slot)
+            if not keys:
+                continue
+            start = bisect_left(keys, key)
+            if start < len(keys):
+                sign = -1 if side == "above" else 1
+                fired.extend(
+                    (alert, sign * stored)
+                    for alert, stored in zip(self._alerts[slot][start:], keys[start:])
+                )
+                del keys[start:]
+                del self._alerts[slot][start:]
+        for alert, _ in fired:
+            self._by_id.pop(alert.id, None)
+        return fired
+
+
+class AlertEngine:
+    # Server-side alerts for every user. Subscribed to the poller, it only
+    # looks at the symbols that changed in a refresh; fired alerts are one-shot:
+    # deactivated and written to alert_outbox, which the user's sessions read
+    # their toasts from on whichever worker they run. Every worker process
+    # runs one; the database decides which of them fires an alert, so it is
+    # recorded once.
+    def __init__(self, pool):
+        self.pool = pool
+        self.poller = None
+        self.index = ThresholdIndex()
+        # Ids fired here; a load() racing a firing must not index them again.
+        self._fired: set[int] = set()
+        self._lock = threading.Lock()
+
+    def _select(self, cur, where: str, params: tuple) -> list:
+        cur.execute(
+            "select a.id, a.user_id, a.symbol, a.kind, a.threshold, "
+            "s.quantity, s.buy_price from stock_alerts a "
+            "left join stock_summary s "
+            "on s.user_id = a.user_id and s.symbol = a.symbol "
+            f"where {where};",
+            params,
+        )
+        return cur.fetchall()
+
+    def load(self, user_id=None):
+        where, params = "a.active = 1", ()
+        if user_id is not None:
+            where += " and a.user_id = ?"
+            params = (user_id,)
+        with self.pool.connection() as conn:
+            cur = conn.cursor()
+            rows = self._select(cur, where, params)
+            # P&L alerts need the holding's summary row; build any missing ones.
+            missing = defaultdict(set)
+            for row in rows:
+                if row[3] in ("pnl_above", "pnl_below") and row[5] is None:
+                    missing[row[1]].add(row[2])
+            if missing:
+                for owner, symbols in missing.items():
+                    refresh_summary(conn, owner, sorted(symbols))
+                conn.commit()
+                rows = self._select(cur, where, params)
+        with self._lock:
+            if user_id is None:
+                self.index = ThresholdIndex()
+            else:
+                self.index.remove_user(user_id)
+            for row in rows:
+                alert = Alert(*tuple(row)[:5])
+                if alert.id in self._fired:
+                    continue
+                level = price_level(alert, row[5], row[6] or 0)
+                if level is not None:
+                    self.index.add(alert, level)
+        self._pin()
+        return self
+
+    def attach(self, poller):
+        # The poller keeps every alerted symbol fresh even with no session
+        # open, and hands each refresh's new quotes to on_snapshot.
+        self.poller = poller
+        poller.subscribe(self.on_snapshot)
+        self._pin()
+        return self
+
+    def _pin(self):
+        if self.poller is not None:
+            self.poller.pin("alerts", self.symbols())
+
+    def symbols(self) -> set[str]:
+        with self._lock:
+            return self.index.symbols()
+
+    def evaluate(self, quotes: Mapping[str, Quote]) -> list[Fired]:
+        now = time.time()
+        fired = []
+        with self._lock:
+            for symbol, quote in quotes.items():
+                if not quote or not quote.price:
+                    continue
+                for alert, level in self.index.fire(symbol, "price", quote.price):
+                    fired.append(Fired(alert, quote.price, now, level))
+                if quote.prev_close:
+                    move = abs(quote.price / quote.prev_close - 1) * 100
+                    for alert, level in self.index.fire(symbol, "move", move):
+                        fired.append(Fired(alert, quote.price, now, level))
+            self._fired.update(f.alert.id for f in fired)
+        return fired
+
+    def on_snapshot(self, snapshot, fetched: Mapping[str, Quote]):
+        fired = self.evaluate(fetched)
+        if fired:
+            self._deliver(fired)
+            self._pin()
+
+    def _deliver(self, fired: list[Fired]):
+        try:
+            with self.pool.connection() as conn:
+                cur = conn.cursor()
+                claimed = []
+                for f in fired:
+                    # Only the process whose update deactivates the alert
+                    # fires it; the others saw it already fired.
+                    cur.execute(
+                        "update stock_alerts set active = 0, fired_at = ? "
+                        "where id = ? and active = 1;",
+                        (f.ts, f.alert.id),
+                    )
+                    if cur.rowcount == 1:
+                        claimed.append(f)
+                if claimed:
+                    cur.executemany(
+                        "insert into alert_outbox "
+                        "(user_id, alert_id, symbol, message, fired_at) "
+                        "values (?, ?, ?, ?, ?);",
+                        [
+                            (
+                                f.alert.user_id,
+                                f.alert.id,
+                                f.alert.symbol,
+                                f.message,
+                                f.ts,
+                            )
+                            for f in claimed
+                        ],
+                    )
+                conn.commit()
+        except Exception:
+            logger.exception("Could not record %d fired alert(s)", len(fired))
+            # Still active in the database: fire again on the next quote.
+            with self._lock:
+                for f in fired:
+                    self._fired.discard(f.alert.id)
+                    self.index.add(f.alert, f.level)
+            return
@@ -0,0 +1,395 @@
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional, Protocol
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+
+
+class CacheBackend(Protocol):
+    # Raw bytes with a TTL in seconds. add() stores only when the key is
+    # absent (or expired) and reports whether it did; it backs the
+    # cross-process single-flight lease.
+    def get_many(self, keys: list[str]) -> dict[str, bytes]: ...
+
+    def set_many(self, items: dict[str, bytes], ttl: float): ...
+
+    def add(self, key: str, value: bytes, ttl: float) -> bool: ...
+
+    def delete(self, key: str): ...
+
+    def clear(self): ...
+
+
+class MemoryBackend:
+    # Per process. An LRU bounded to max_entries; expired entries are dropped
+    # when they are read or reach the cold end.
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries: OrderedDict[str, tuple[bytes, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _live(self, key: str, now: float) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= now:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def _put(self, key: str, value: bytes, expires_at: float):
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_many(self, keys: list[str]) -> dict[str, bytes]:
+        now = time.time()
+        with self._lock:
+            values = {key: self._live(key, now) for key in keys}
+        return {key: value for key, value in values.items() if value is not None}
+
+    def set_many(self, items: dict[str, bytes], ttl: float):
+        expires_at = time.time() + ttl
+        with self._lock:
+            for key, value in items.items():
+                self._put(key, value, expires_at)
+
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        now = time.time()
+        with self._lock:
+            if self._live(key, now) is not None:
+                return False
+            self._put(key, value, now + ttl)
+            return True
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+SQLITE_SCHEMA = """
+create table if not exists cache (
+    key text primary key,
+    value blob not null,
+    expires_at real not null
+);
+create index if not exists cache_expires_at on cache (expires_at);
+"""
+
+
+class SQLiteBackend:
+    # One file shared by every process on the host. Each thread has its own
+    # connection; WAL lets readers run alongside the single writer. Every
+    # `sweep_every` writes, expired rows are deleted and, above max_entries,
+    # the rows closest to expiry go first.
+    def __init__(self, path: str, max_entries: int = 100_000, sweep_every: int = 100):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.sweep_every = sweep_every
+        self.evictions = 0
+        self._writes = 0
+        self._local = threading.local()
+        self._conn().executescript(SQLITE_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("pragma journal_mode=wal")
+            conn.execute("pragma synchronous=normal")
+            self._local.conn = conn
+        return conn
+
+    def __len__(self) -> int:
+        return self._conn().execute("select count(*) from cache").fetchone()[0]
+
+    def get_many(self, keys: list[str]) -> dict[str, bytes]:
+        values = {}
+        # Stay well under SQLite's bound-parameter limit.
+        for start in range(0, len(keys), 500):
+            chunk = keys[start : start + 500]
+            rows = self._conn().execute(
+                "select key, value from cache where expires_at > ? "
+                f"and key in ({', '.join('?' for _ in chunk)})",
+                (time.time(), *chunk),
+            )
+            values.update(rows.fetchall())
+        return values
+
+    def set_many(self, items: dict[str, bytes], ttl: float):
+        if not items:
+            return
+        expires_at = time.time() + ttl
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                "insert or replace into cache (key, value, expires_at) "
+                "values (?, ?, ?)",
+                [(key, value, expires_at) for key, value in items.items()],
+            )
+        self._wrote(len(items))
+
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute(
+                "insert into cache (key, value, expires_at) values (?, ?, ?) "
+                "on conflict(key) do update set value = excluded.value, "
+                "expires_at = excluded.expires_at where cache.expires_at <= ?",
+                (key, value, now + ttl, now),
+            )
+        self._wrote(1)
+        return cursor.rowcount == 1
+
+    def _wrote(self, count: int):
+        self._writes += count
+        if self._writes >= self.sweep_every:
+            self._writes = 0
+            self.sweep()
+
+    def sweep(self):
+        conn = self._conn()
+        with conn:
+            conn.execute("delete from cache where expires_at <= ?", (time.time(),))
+            excess = len(self) - self.max_entries
+            if excess > 0:
+                conn.execute(
+                    "delete from cache where key in "
+                    "(select key from cache order by expires_at limit ?)",
+                    (excess,),
+                )
+                self.evictions += excess
+
+    def delete(self, key: str):
+        conn = self._conn()
+        with conn:
+            conn.execute("delete from cache where key = ?", (key,))
+
+    def clear(self):
+        conn = self._conn()
+        with conn:
+            conn.execute("delete from cache")
+
+
+class RedisBackend:
+    # Any client with the redis-py interface (redis.Redis, or a local
+    # stand-in). Entries expire through Redis TTLs; the size bound is the
+    # server's maxmemory with an LRU eviction policy.
+    def __init__(self, client, prefix: str = "portfolio:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, prefix: str = "portfolio:"):
+        import redis
+
+        return cls(redis.Redis.from_url(url), prefix)
+
+    def get_many(self, keys: list[str]) -> dict[str, bytes]:
+        if not keys:
+            return {}
+        values = self.client.mget([self.prefix + key for key in keys])
+        return {key: value for key, value in zip(keys, values) if value is not None}
+
+    def set_many(self, items: dict[str, bytes], ttl: float):
+        if not items:
+            return
+        pipe = self.client.pipeline()
+        for key, value in items.items():
+            pipe.set(self.prefix + key, value, px=max(1, int(ttl * 1000)))
+        pipe.execute()
+
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        return bool(
+            self.client.set(
+                self.prefix + key, value, nx=True, px=max(1, int(ttl * 1000))
+            )
+        )
+
+    def delete(self, key: str):
+        self.client.delete(self.prefix + key)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+class _Flight:
+    __slots__ = ("done", "value")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = MISSING
+
+
+class SharedCache:
+    # Pickled values on a pluggable backend, with hit/miss counters. Only put
+    # a backend shared with processes you trust behind it: values are pickles.
+    # get_or_load() is single-flight: concurrent misses for a key in this
+    # process wait for one loader, and a short lease in the backend makes
+    # other processes wait for it too instead of loading the same key.
+    def __init__(
+        self,
+        backend: CacheBackend,
+        default_ttl: float = 60,
+        lease_ttl: float = 10,
+        poll_interval: float = 0.05,
+    ):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.lease_ttl = lease_ttl
+        self.poll_interval = poll_interval
+        self._flights: dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(
+            ("hits", "misses", "loads", "coalesced", "errors"), 0
+        )
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self._counts[name] += n
+
+    def get_many(self, keys: Iterable[str]) -> dict:
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        try:
+            raw = self.backend.get_many(keys)
+        except Exception:
+            logger.warning("Cache read failed", exc_info=True)
+            self._count("errors")
+            raw = {}
+        values = {}
+        for key, value in raw.items():
+            try:
+                values[key] = pickle.loads(value)
+            except Exception:
+                self._count("errors")
+        self._count("hits", len(values))
+        self._count("misses", len(keys) - len(values))
+        return values
+
+    def get(self, key: str, default=None):
+        return self.get_many([key]).get(key, default)
+
+    def set_many(self, items: dict, ttl: float = None):
+        if not items:
+            return
+        try:
+            self.backend.set_many(
+                {key: pickle.dumps(value) for key, value in items.items()},
+                self.default_ttl if ttl is None else ttl,
+            )
+        except Exception:
+            logger.warning("Cache write failed", exc_info=True)
+            self._count("errors")
+
+    def set(self, key: str, value, ttl: float = None):
+        self.set_many({key: value}, ttl)
+
+    def delete(self, key: str):
+        self.backend.delete(key)
+
+    def clear(self):
+        self.backend.clear()
+
+    def get_or_load(self, key: str, loader: Callable, ttl: float = None):
+        # None results are returned but not cached.
+        values = self.get_many([key])
+        if key in values:
+            return values[key]
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            self._count("coalesced")
+            flight.done.wait(self.lease_ttl)
+            if flight.value is not MISSING:
+                return flight.value
+            return self._load(key, loader, ttl)
+        try:
+            flight.value = self._load_shared(key, loader, ttl)
+            return flight.value
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _load_shared(self, key: str, loader: Callable, ttl: float):
+        lease = "lease:" + key
+        try:
+            leased = self.backend.add(lease, b"1", self.lease_ttl)
+        except Exception:
+            leased = True
+        if not leased:
+            # Another process is loading this key; wait for its result.
+            self._count("coalesced")
+            deadline = time.monotonic() + self.lease_ttl
+            while time.monotonic() < deadline:
+                time.sleep(self.poll_interval)
+                values = self.get_many([key])
+                if key in values:
+                    return values[key]
+        try:
+            return self._load(key, loader, ttl)
+        finally:
+            if leased:
+                try:
+                    self.backend.delete(lease)
+                except Exception:
+                    pass
+
+    def _load(self, key: str, loader: Callable, ttl: float):
+        self._count("loads")
+        value = loader()
+        if value is not None:
+            self.set(key, value, ttl)
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counts)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["evictions"] = getattr(self.backend, "evictions", None)
+        stats["backend"] = type(self.backend).__name__
+        return stats
+
+
+def cache_backend(settings: dict) -> CacheBackend:
+    kind = settings.get("backend", "memory")
+    if kind == "sqlite":
+        return SQLiteBackend(
+            settings.get("path", "data/cache.db"),
+            max_entries=settings.get("max_entries", 100_000),
+        )
+    if kind == "redis":
+        return RedisBackend.from_url(
+            settings.get("url", "redis://localhost:6379/0"),
+            prefix=settings.get("prefix", "portfolio:"),
+        )
+    return MemoryBackend(max_entries=settings.get("max_entries", 10_000))
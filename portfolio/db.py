@@ -0,0 +1,272 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+def _row_factory(cursor, row):
+    # Attribute access on rows, like pyodbc.Row (user.user_pass, user.name).
+    fields = [column[0] for column in cursor.description]
+    return namedtuple("Row", fields, rename=True)(*row)
+
+
+def sqlite_connect(path: str, timeout: float = 60):
+    conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+    conn.row_factory = _row_factory
+    return conn
+
+
+def mssql_connect(server: str, database: str, user: str, password: str, timeout=60):
+    import pyodbc
+
+    conn = pyodbc.connect(
+        "DRIVER={ODBC Driver 17 for SQL Server};SERVER="
+        + server
+        + ";DATABASE="
+        + database
+        + ";UID="
+        + user
+        + ";PWD="
+        + password,
+        timeout=timeout,
+    )
+    return conn
+
+
+def duckdb_connect(path: str):
+    import duckdb
+
+    return DuckDBConnection(duckdb.connect(path))
+
+
+class DuckDBConnection:
+    # DB-API behaviour on top of one DuckDB connection. DuckDB's own cursor()
+    # is a separate connection with its own transaction, and every statement
+    # autocommits; here cursors share the connection and, as in sqlite3, a
+    # write opens a transaction that lasts until commit() or rollback().
+    def __init__(self, conn):
+        self._conn = conn
+        self._in_transaction = False
+
+    def _execute(self, method: str, sql: str, params):
+        if not self._in_transaction and not sql.lstrip().lower().startswith(
+            ("select", "with")
+        ):
+            self._conn.begin()
+            self._in_transaction = True
+        getattr(self._conn, method)(sql, params)
+
+    def cursor(self):
+        return _DuckDBCursor(self)
+
+    def commit(self):
+        if self._in_transaction:
+            self._in_transaction = False
+            self._conn.commit()
+
+    def rollback(self):
+        if self._in_transaction:
+            self._in_transaction = False
+            self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+
+class _DuckDBCursor:
+    def __init__(self, conn: DuckDBConnection):
+        self._conn = conn
+        self.rowcount = -1
+
+    @property
+    def description(self):
+        return self._conn._conn.description
+
+    def execute(self, sql: str, params=()):
+        self._conn._execute("execute", sql, params)
+        self.rowcount = -1
+        if sql.lstrip().lower().startswith(("insert", "update", "delete")):
+            # DuckDB answers a write with one row holding the affected count.
+            self.rowcount = self._conn._conn.fetchone()[0]
+        return self
+
+    def executemany(self, sql: str, rows):
+        self._conn._execute("executemany", sql, rows)
+        return self
+
+    def fetchone(self):
+        return self._conn._conn.fetchone()
+
+    def fetchall(self):
+        return self._conn._conn.fetchall()
+
+    def close(self):
+        pass
+
+
+class ConnectionPool:
+    # Bounded pool of DB-API connections. A connection that has been idle for
+    # longer than ping_interval is checked with a cheap query before it is handed
+    # out, and replaced when the check fails; connections that raised while in
+    # use are checked before they go back to the pool.
+    def __init__(
+        self,
+        connect: Callable[[], object],
+        size: int = 5,
+        timeout: float = 30,
+        ping_interval: float = 30,
+        ping_query: str = "select 1",
+    ):
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self.ping_query = ping_query
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._stats = {
+            "checkouts": 0,
+            "in_use": 0,
+            "wait_total": 0.0,
+            "wait_max": 0.0,
+            "exhausted": 0,
+            "timeouts": 0,
+            "reconnects": 0,
+        }
+
+    def _open(self):
+        with self._lock:
+            if self._created >= self.size:
+                return None
+            self._created += 1
+        try:
+            return self.connect()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            self._wake()
+            raise
+
+    def _wake(self):
+        # A slot was freed: an empty entry wakes a caller waiting for an idle
+        # connection so it can open a new one instead of timing out.
+        self._idle.put((None, time.monotonic()))
+
+    def _discard(self, conn):
+        with self._lock:
+            self._created -= 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._wake()
+
+    def _alive(self, conn) -> bool:
+        try:
+            cur = conn.cursor()
+            cur.execute(self.ping_query)
+            cur.fetchall()
+            cur.close()
+            return True
+        except Exception:
+            return False
+
+    def _checkout(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        while True:
+            try:
+                conn, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._open()
+                if conn is None:
+                    remaining = deadline - time.monotonic()
+                    with self._lock:
+                        self._stats["exhausted"] += 1
+                    try:
+                        conn, last_used = self._idle.get(timeout=max(remaining, 0))
+                    except queue.Empty:
+                        with self._lock:
+                            self._stats["timeouts"] += 1
+                        raise PoolTimeout(
+                            f"No database connection available after {self.timeout}s"
+                        )
+                else:
+                    last_used = time.monotonic()
+            if conn is None:
+                continue
+            idle_for = time.monotonic() - last_used
+            if idle_for > self.ping_interval and not self._alive(conn):
+                logger.warning("Dropping dead database connection")
+                self._discard(conn)
+                with self._lock:
+                    self._stats["reconnects"] += 1
+                continue
+            waited = time.monotonic() - started
+            with self._lock:
+                self._stats["checkouts"] += 1
+                self._stats["in_use"] += 1
+                self._stats["wait_total"] += waited
+                self._stats["wait_max"] = max(self._stats["wait_max"], waited)
+            return conn
+
+    def _checkin(self, conn, failed: bool):
+        with self._lock:
+            self._stats["in_use"] -= 1
+        if failed:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            if not self._alive(conn):
+                self._discard(conn)
+                return
+        self._idle.put((conn, time.monotonic()))
+
+    def prefill(self, count: int = None) -> int:
+        # Opens up to `count` (default: size) idle connections ahead of the
+        # first checkout.
+        opened = 0
+        for _ in range(self.size if count is None else count):
+            conn = self._open()
+            if conn is None:
+                break
+            self._idle.put((conn, time.monotonic()))
+            opened += 1
+        return opened
+
+    @contextmanager
+    def connection(self):
+        conn = self._checkout()
+        failed = False
+        try:
+            yield conn
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._checkin(conn, failed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "size": self.size, "open": self._created}
+
+    def close(self):
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            if conn is not None:
+                self._discard(conn)
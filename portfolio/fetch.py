@@ -0,0 +1,238 @@
+import logging
+import random
+import threading
+import time
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+YAHOO_HOST = "query1.finance.yahoo.com"
+RETRYABLE_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class RetryableError(Exception):
+    def __init__(self, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, urllib.error.HTTPError):
+        return exc.code in RETRYABLE_STATUS
+    return isinstance(
+        exc, (RetryableError, urllib.error.URLError, TimeoutError, ConnectionError)
+    )
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    if isinstance(exc, RetryableError):
+        return exc.retry_after
+    if isinstance(exc, urllib.error.HTTPError) and exc.headers:
+        try:
+            return float(exc.headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+def backoff(attempt: int, base: float, cap: float) -> float:
+    # "Full jitter": a random delay up to the exponential bound, so clients that
+    # failed together do not retry together.
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+class TokenBucket:
+    # Process-wide request rate limit: `rate` tokens per second, bursts of up to
+    # `capacity`. acquire() sleeps outside the lock until a token is due.
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self, tokens: float) -> float:
+        # A call costing more than `capacity` is charged a full bucket: any
+        # more would leave it so far in debt that the calls queued behind it
+        # wait past their timeout.
+        tokens = min(tokens, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, timeout: float = None, tokens: float = 1) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._take(tokens)
+            if not wait:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    # Opens after `threshold` consecutive failures; after `reset_after` seconds
+    # one trial call is let through (half-open) and its outcome decides.
+    def __init__(self, threshold: int = 5, reset_after: float = 30):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_after:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def release(self):
+        # The trial call never reached the host: let the next one try instead.
+        with self._lock:
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+
+class Fetcher:
+    # Shared by every outbound call to a quote host: a bounded worker pool, one
+    # token bucket for all hosts, jittered retries and a breaker per host.
+    def __init__(
+        self,
+        max_workers: int = 8,
+        rate: float = 5,
+        burst: float = 10,
+        retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 8,
+        failure_threshold: int = 5,
+        reset_after: float = 30,
+        acquire_timeout: float = 30,
+    ):
+        self.bucket = TokenBucket(rate, burst)
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.acquire_timeout = acquire_timeout
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="fetch"
+        )
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(
+                    self.failure_threshold, self.reset_after
+                )
+            return self._breakers[host]
+
+    def call(self, host: str, func: Callable, *args, cost: float = 1):
+        # `cost` is the number of requests func makes to the host.
+        breaker = self.breaker(host)
+        for attempt in range(self.retries + 1):
+            if not breaker.allow():
+                raise CircuitOpen(host)
+            if not self.bucket.acquire(self.acquire_timeout, cost):
+                breaker.release()
+                raise RetryableError(f"rate limit wait exceeded for {host}")
+            try:
+                result = func(*args)
+            except Exception as e:
+                if not is_retryable(e):
+                    # The host answered; a bad symbol is not a host failure.
+                    breaker.record_success()
+                    raise
+                breaker.record_failure()
+                if attempt == self.retries:
+                    raise
+                delay = backoff(attempt, self.backoff_base, self.backoff_cap)
+                time.sleep(max(delay, retry_after(e) or 0))
+            else:
+                breaker.record_success()
+                return result
+
+    def _call_safe(self, host: str, func: Callable, item, cost: float):
+        try:
+            return item, self.call(host, func, item, cost=cost), None
+        except Exception as e:
+            return item, None, e
+
+    def map(
+        self, host: str, func: Callable, items: Iterable, cost: Callable = None
+    ) -> dict:
+        # Results keyed by item; failed items are left out so the caller can
+        # fall back to what it already has. cost(item) prices each call.
+        results = {}
+        skipped = failed = 0
+        error = None
+        calls = [
+            self._executor.submit(
+                self._call_safe, host, func, item, cost(item) if cost else 1
+            )
+            for item in items
+        ]
+        for call in calls:
+            item, result, exc = call.result()
+            if exc is None:
+                results[item] = result
+            elif isinstance(exc, CircuitOpen):
+                skipped += 1
+            else:
+                failed += 1
+                error = exc
+        if skipped:
+            logger.warning("Circuit open for %s, skipped %d request(s)", host, skipped)
+        if failed:
+            logger.warning(
+                "%d request(s) to %s failed, last error: %s", failed, host, error
+            )
+        return results
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                host: {"state": breaker.state, "failures": breaker.failures}
+                for host, breaker in self._breakers.items()
+            }
@@ -0,0 +1,185 @@
+import logging
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, Iterable
+
+import numpy as np
+import pandas as pd
+
+from portfolio.market import is_market_open
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialised within a process.
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+OHLCV_DTYPE = np.dtype(
+    [
+        ("date", "<M8[D]"),
+        ("open", "<f8"),
+        ("high", "<f8"),
+        ("low", "<f8"),
+        ("close", "<f8"),
+        ("volume", "<f8"),
+    ]
+)
+OHLCV_COLUMNS = list(OHLCV_DTYPE.names[1:])
+
+
+def yahoo_history(symbol: str, start: date = None) -> pd.DataFrame:
+    import yfinance as yf
+
+    kwargs = {"start": start} if start else {"period": "max"}
+    df = yf.Ticker(symbol).history(interval="1d", auto_adjust=False, **kwargs)
+    df = df.rename(columns=str.lower)
+    df.index = df.index.tz_localize(None).normalize()
+    return df
+
+
+class HistoryStore:
+    # One append-only file of fixed-size OHLCV records per symbol, sorted by
+    # date. Reads memory-map the file and binary-search the date column, so a
+    # range query touches only the records it returns. update() downloads the
+    # full series once and afterwards only the days after the last record.
+    # Appends hold an exclusive lock on a .lock file next to the data, so
+    # worker processes do not append the same days twice; a record cut short
+    # by a crash is ignored by reads and dropped by the next update().
+    def __init__(
+        self,
+        root,
+        download: Callable[[str, date], pd.DataFrame] = yahoo_history,
+        refresh_after: float = 3600,
+    ):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.download = download
+        self.refresh_after = refresh_after
+        self._checked: dict[str, float] = {}
+        self._locks = defaultdict(threading.Lock)
+
+    def _path(self, symbol: str) -> Path:
+        return self.root / (re.sub(r"[^A-Za-z0-9._-]", "_", symbol) + ".ohlcv")
+
+    def _records(self, symbol: str) -> np.ndarray:
+        path = self._path(symbol)
+        count = path.stat().st_size // OHLCV_DTYPE.itemsize if path.exists() else 0
+        if not count:
+            return np.empty(0, dtype=OHLCV_DTYPE)
+        return np.memmap(path, dtype=OHLCV_DTYPE, mode="r", shape=(count,))
+
+    @contextmanager
+    def _file_lock(self, symbol: str):
+        path = self._path(symbol)
+        with open(path.with_name(path.name + ".lock"), "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def _repair(self, symbol: str):
+        # Called under the file lock before appending: drops a record cut
+        # short by a crash, and rewrites a file whose dates are not strictly
+        # increasing (days appended twice by unlocked writers) so reads can
+        # binary-search it again.
+        path = self._path(symbol)
+        if not path.exists():
+            return
+        size = path.stat().st_size
+        if size % OHLCV_DTYPE.itemsize:
+            logger.warning("Dropping a partly written record from %s", path)
+            os.truncate(path, size - size % OHLCV_DTYPE.itemsize)
+        records = self._records(symbol)
+        if (
+            len(records) < 2
+            or (np.diff(records["date"]) > np.timedelta64(0, "D")).all()
+        ):
+            return
+        logger.warning("Rewriting %s with its dates sorted and unique", path)
+        _, first = np.unique(records["date"], return_index=True)
+        repaired = path.with_name(path.name + ".tmp")
+        with open(repaired, "wb") as f:
+            f.write(np.array(records[first]).tobytes())
+        del records
+        os.replace(repaired, path)
+
+    def last_date(self, symbol: str):
+        records = self._records(symbol)
+        return records["date"][-1].astype(date) if len(records) else None
+
+    def update(self, symbol: str, force: bool = False) -> int:
+        with self._locks[symbol]:
+            checked = self._checked.get(symbol)
+            if (
+                not force
+                and checked is not None
+                and time.monotonic() - checked < self.refresh_after
+            ):
+                return 0
+            with self._file_lock(symbol):
+                return self._update(symbol)
+
+    def _update(self, symbol: str) -> int:
+        self._repair(symbol)
+        last = self.last_date(symbol)
+        start = last + timedelta(days=1) if last else None
+        if last and start > date.today():
+            self._checked[symbol] = time.monotonic()
+            return 0
+
+        df = self.download(symbol, start)
+        self._checked[symbol] = time.monotonic()
+        if df is None or df.empty:
+            return 0
+        dates = df.index.to_numpy(dtype="datetime64[D]")
+        keep = np.ones(len(df), dtype=bool)
+        if last:
+            keep &= dates > np.datetime64(last)
+        if is_market_open():
+            # Today's bar is still forming; it is appended after the close.
+            keep &= dates < np.datetime64(date.today())
+        df, dates = df[keep], dates[keep]
+        if df.empty:
+            return 0
+
+        # Sorted, one record per day.
+        dates, order = np.unique(dates, return_index=True)
+        records = np.empty(len(dates), dtype=OHLCV_DTYPE)
+        records["date"] = dates
+        for column in OHLCV_COLUMNS:
+            records[column] = df[column].to_numpy(dtype="float64")[order]
+        with open(self._path(symbol), "ab") as f:
+            f.write(records.tobytes())
+        return len(records)
+
+    def read(
+        self, symbol: str, start: date = None, end: date = None, update: bool = True
+    ) -> pd.DataFrame:
+        if update:
+            try:
+                self.update(symbol)
+            except Exception:
+                logger.exception("History update failed for %s", symbol)
+        records = self._records(symbol)
+        dates = records["date"]
+        lo = np.searchsorted(dates, np.datetime64(start, "D")) if start else 0
+        hi = np.searchsorted(dates, np.datetime64(end, "D"), "right") if end else None
+        window = np.array(records[lo:hi])
+        df = pd.DataFrame({column: window[column] for column in OHLCV_COLUMNS})
+        df.index = pd.DatetimeIndex(
+            window["date"].astype("datetime64[ns]"), name="date"
+        )
+        return df
+
+    def closes(
+        self, symbols: Iterable[str], start: date = None, end: date = None
+    ) -> pd.DataFrame:
+        return pd.DataFrame(
+            {s: self.read(s, start, end)["close"] for s in dict.fromkeys(symbols)}
+        ).sort_index()
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+from portfolio.lots import aggregate, empty_sells, match_fifo
+from portfolio.valuation import summarize, value_holdings
+
+
+class HoldingsCache:
+    # Lots, sells and valued per-symbol rows of one user. A change to a lot or
+    # a sell re-aggregates and revalues only that symbol's row; fingerprint()
+    # is compared with the database to detect drift (another tab or process).
+    def __init__(
+        self,
+        user_id: str,
+        lots: pd.DataFrame,
+        sells: pd.DataFrame,
+        quotes: pd.DataFrame,
+    ):
+        self.user_id = user_id
+        self.lots = lots.reset_index(drop=True)
+        self.sells = sells.reset_index(drop=True)
+        self.frame, self.totals = value_holdings(
+            aggregate(self.lots, self.sells), quotes
+        )
+        self.version = 0
+
+    def _refresh_symbol(self, symbol: str, quotes: pd.DataFrame):
+        lots = self.lots[self.lots["symbol"] == symbol]
+        sells = self.sells[self.sells["symbol"] == symbol]
+        row, _ = value_holdings(aggregate(lots, sells), quotes)
+        frame = self.frame[self.frame["symbol"] != symbol]
+        if symbol in self.frame["symbol"].values:
+            # Keep the symbol where it was so a selected row does not jump.
+            position = int(np.flatnonzero(self.frame["symbol"] == symbol)[0])
+            parts = [frame.iloc[:position], row, frame.iloc[position:]]
+        else:
+            parts = [frame, row]
+        parts = [part for part in parts if len(part)]
+        self.frame = (
+            pd.concat(parts, ignore_index=True) if parts else self.frame.iloc[0:0]
+        )
+        self.totals = summarize(self.frame)
+        self.version += 1
+
+    def replace_lots(self, symbol: str, lots: pd.DataFrame, quotes: pd.DataFrame):
+        others = self.lots[self.lots["symbol"] != symbol]
+        self.lots = (
+            pd.concat([others, lots], ignore_index=True) if len(others) else lots
+        )
+        self._refresh_symbol(symbol, quotes)
+
+    def update_lot(self, lot_id, changes: dict, quotes: pd.DataFrame):
+        mask = (self.lots["id"] == lot_id).to_numpy()
+        lots = self.lots.copy()
+        for column, value in changes.items():
+            lots.loc[mask, column] = value
+        self.lots = lots
+        for symbol in self.lots.loc[mask, "symbol"].unique():
+            self._refresh_symbol(symbol, quotes)
+
+    def delete_lot(self, lot_id, quotes: pd.DataFrame):
+        mask = (self.lots["id"] == lot_id).to_numpy()
+        symbols = self.lots.loc[mask, "symbol"].unique()
+        self.lots = self.lots[~mask].reset_index(drop=True)
+        for symbol in symbols:
+            self._refresh_symbol(symbol, quotes)
+
+    def add_sell(self, sell: dict, quotes: pd.DataFrame):
+        row = pd.DataFrame([sell])
+        if len(self.sells):
+            row = pd.concat([self.sells, row], ignore_index=True)
+        self.sells = row
+        self._refresh_symbol(sell["symbol"], quotes)
+
+    def revalue(self, quotes: pd.DataFrame):
+        self.frame, self.totals = value_holdings(self.frame, quotes)
+        self.version += 1
+
+    def lots_of(self, symbol: str) -> pd.DataFrame:
+        lots = self.lots[self.lots["symbol"] == symbol]
+        sells = self.sells[self.sells["symbol"] == symbol]
+        if lots.empty:
+            return lots.assign(remaining=[])
+        return match_fifo(lots, sells if len(sells) else empty_sells())[0]
+
+    def fingerprint(self) -> tuple[int, float]:
+        return len(self.lots), float(self.lots["quantity"].sum())
+
+    def matches(self, count, quantity) -> bool:
+        rows, held = self.fingerprint()
+        return rows == (count or 0) and np.isclose(held, float(quantity or 0))
@@ -0,0 +1,83 @@
+from datetime import date
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+IMPORT_COLUMNS = ["symbol", "stock_name", "buy_date", "buy_price", "quantity"]
+
+
+class ImportResult(NamedTuple):
+    inserted: int
+    errors: pd.DataFrame
+
+
+def _empty_errors() -> pd.DataFrame:
+    return pd.DataFrame({"line": pd.Series(dtype="int64"), "symbol": [], "error": []})
+
+
+def validate(chunk: pd.DataFrame):
+    missing = [c for c in IMPORT_COLUMNS if c not in chunk.columns]
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(missing)}")
+
+    # Line numbers in the report are 1-based and count the header line.
+    line = chunk.index.to_numpy() + 2
+    symbol = chunk["symbol"].fillna("").astype(str).str.strip().str.upper()
+    stock_name = chunk["stock_name"].fillna("").astype(str).str.strip()
+    buy_date = pd.to_datetime(chunk["buy_date"], errors="coerce", format="%Y-%m-%d")
+    buy_price = pd.to_numeric(chunk["buy_price"], errors="coerce")
+    quantity = pd.to_numeric(chunk["quantity"], errors="coerce")
+
+    checks = [
+        (symbol == "", "symbol is empty"),
+        (buy_date.isna(), "buy_date is not a YYYY-MM-DD date"),
+        (buy_date > pd.Timestamp(date.today()), "buy_date is in the future"),
+        (~(buy_price > 0), "buy_price must be a positive number"),
+        (~(quantity > 0), "quantity must be a positive number"),
+        (quantity.notna() & (quantity % 1 != 0), "quantity must be a whole number"),
+    ]
+    messages = pd.Series("", index=chunk.index)
+    for failed, message in checks:
+        failed = failed.fillna(False).to_numpy(dtype=bool)
+        messages = messages.where(~failed, messages + message + "; ")
+    bad = (messages != "").to_numpy()
+
+    errors = pd.DataFrame(
+        {
+            "line": line[bad],
+            "symbol": symbol[bad].to_numpy(),
+            "error": messages[bad].str.rstrip("; ").to_numpy(),
+        }
+    )
+    valid = pd.DataFrame(
+        {
+            "symbol": symbol[~bad].to_numpy(),
+            "stock_name": np.where(
+                stock_name[~bad] == "", symbol[~bad], stock_name[~bad]
+            ),
+            "buy_date": buy_date[~bad].dt.date.to_numpy(),
+            "buy_price": buy_price[~bad].to_numpy(dtype="float64"),
+            "quantity": quantity[~bad].to_numpy(dtype="int64"),
+        }
+    )
+    return valid, errors
+
+
+def read_holdings(file, chunksize: int = 1000):
+    return pd.read_csv(file, dtype=str, chunksize=chunksize, skipinitialspace=True)
+
+
+def import_holdings(
+    repository, user_id: str, file, batch_size: int = 500
+) -> ImportResult:
+    # Every valid row is written in one transaction; any database error rolls
+    # the whole import back so a retry does not create duplicates.
+    reports, valid = [_empty_errors()], []
+    for chunk in read_holdings(file, chunksize=batch_size):
+        rows, errors = validate(chunk)
+        reports.append(errors)
+        valid.append(rows)
+    lots = (lot for rows in valid for lot in rows.itertuples(index=False, name=None))
+    inserted = repository.add_lots(user_id, lots, batch_size)
+    return ImportResult(inserted, pd.concat(reports, ignore_index=True))
@@ -0,0 +1,81 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from portfolio.quotes import Quote
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDICES = [
+    {"symbol": "^NSEBANK", "label": "Bank Nifty"},
+    {"symbol": "^NSEI", "label": "Nifty"},
+    {"symbol": "NIFTY_MIDCAP_100.NS", "label": "Midcap 100"},
+    {"symbol": "^CNXSC", "label": "Smallcap 100"},
+]
+
+
+class IndexStrip:
+    # Stale-while-revalidate cache for the market indices. get() always returns
+    # immediately with whatever is cached; an expired entry only schedules a
+    # background refresh, which fetches every index concurrently.
+    def __init__(
+        self,
+        fetch_one: Callable[[str], Optional[Quote]],
+        symbols: list[str],
+        ttl: float = 30,
+        max_workers: int = 4,
+        initial: dict[str, Quote] = None,
+    ):
+        self.fetch_one = fetch_one
+        self.symbols = list(symbols)
+        self.ttl = ttl
+        # Seeded values are served until the first revalidation replaces them.
+        self._values: dict[str, Quote] = dict(initial or {})
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+        self._pending = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, min(max_workers, len(self.symbols))),
+            thread_name_prefix="index-strip",
+        )
+
+    def _fetch(self, symbol: str):
+        try:
+            return symbol, self.fetch_one(symbol)
+        except Exception:
+            logger.exception("Index fetch failed for %s", symbol)
+            return symbol, None
+
+    def refresh(self) -> dict[str, Quote]:
+        results = self._executor.map(self._fetch, self.symbols)
+        values = {symbol: quote for symbol, quote in results if quote}
+        with self._lock:
+            self._values = {**self._values, **values}
+            self._fetched_at = time.monotonic()
+            self._pending = None
+        return self._values
+
+    def revalidate(self):
+        with self._lock:
+            if self._pending is None:
+                self._pending = threading.Thread(
+                    target=self.refresh, name="index-strip-refresh", daemon=True
+                )
+                self._pending.start()
+
+    def wait(self, timeout: float = None) -> dict[str, Quote]:
+        # Blocks until a running revalidation is done (or timeout seconds).
+        pending = self._pending
+        if pending is not None:
+            pending.join(timeout)
+        return self._values
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self._fetched_at > self.ttl
+
+    def get(self) -> dict[str, Quote]:
+        if self.is_stale():
+            self.revalidate()
+        return self._values
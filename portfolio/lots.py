@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+LOT_COLUMNS = ["id", "symbol", "stock_name", "buy_date", "buy_price", "quantity"]
+SELL_COLUMNS = ["symbol", "sell_date", "sell_price", "quantity"]
+HOLDING_COLUMNS = [
+    "symbol",
+    "stock_name",
+    "buy_date",
+    "buy_price",
+    "quantity",
+    "lots",
+    "realized",
+]
+
+
+def empty_lots() -> pd.DataFrame:
+    return pd.DataFrame(columns=LOT_COLUMNS + ["remaining"])
+
+
+def empty_sells() -> pd.DataFrame:
+    return pd.DataFrame(columns=SELL_COLUMNS)
+
+
+def match_fifo(lots: pd.DataFrame, sells: pd.DataFrame):
+    # Sold quantity per symbol is consumed from the oldest lots first: a lot is
+    # used up to the part of the running total that overlaps it, which is one
+    # grouped cumsum instead of walking the sells one by one.
+    lots = lots.sort_values(["symbol", "buy_date", "id"], kind="stable")
+    quantity = lots["quantity"].to_numpy(dtype="float64")
+    running = pd.Series(quantity, index=lots.index).groupby(lots["symbol"]).cumsum()
+    before = running.to_numpy() - quantity
+    sold = sells["quantity"].astype("float64").groupby(sells["symbol"]).sum()
+    sold_total = sold.reindex(lots["symbol"]).fillna(0).to_numpy()
+    consumed = np.clip(sold_total - before, 0, quantity)
+
+    proceeds = (
+        (sells["quantity"].astype("float64") * sells["sell_price"].astype("float64"))
+        .groupby(sells["symbol"])
+        .sum()
+    )
+    buy_price = lots["buy_price"].to_numpy(dtype="float64")
+    cost_sold = pd.Series(consumed * buy_price, index=lots.index)
+    cost_sold = cost_sold.groupby(lots["symbol"]).sum()
+    realized = proceeds.reindex(cost_sold.index).fillna(0) - cost_sold
+    return lots.assign(remaining=quantity - consumed), realized
+
+
+def aggregate(lots: pd.DataFrame, sells: pd.DataFrame) -> pd.DataFrame:
+    if lots.empty:
+        return pd.DataFrame(columns=HOLDING_COLUMNS)
+    lots, realized = match_fifo(lots, sells)
+    remaining = lots["remaining"].to_numpy(dtype="float64")
+    buy_date = pd.to_datetime(lots["buy_date"])
+    grouped = lots.assign(
+        buy_date=buy_date,
+        open_cost=remaining * lots["buy_price"].to_numpy(dtype="float64"),
+        open_date=buy_date.where(remaining > 0),
+    ).groupby("symbol", sort=False)
+    holdings = grouped.agg(
+        stock_name=("stock_name", "first"),
+        buy_date=("open_date", "min"),
+        first_buy_date=("buy_date", "min"),
+        quantity=("remaining", "sum"),
+        open_cost=("open_cost", "sum"),
+        lots=("id", "size"),
+    )
+    quantity = holdings["quantity"].to_numpy(dtype="float64")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        average = np.where(quantity > 0, holdings["open_cost"] / quantity, 0.0)
+    holdings = holdings.assign(
+        buy_date=holdings["buy_date"].fillna(holdings["first_buy_date"]).dt.date,
+        buy_price=average,
+        quantity=quantity,
+        realized=realized.reindex(holdings.index).fillna(0),
+    )
+    return holdings.reset_index()[HOLDING_COLUMNS]
+
+
+def cash_flows(lots: pd.DataFrame, sells: pd.DataFrame) -> pd.DataFrame:
+    # Buys and sells as signed quantity events (symbol, buy_date, buy_price,
+    # quantity), the shape the performance curve works on.
+    return pd.concat(
+        [
+            lots[["symbol", "buy_date", "buy_price", "quantity"]],
+            pd.DataFrame(
+                {
+                    "symbol": sells["symbol"],
+                    "buy_date": sells["sell_date"],
+                    "buy_price": sells["sell_price"],
+                    "quantity": -sells["quantity"].astype("float64"),
+                }
+            ),
+        ],
+        ignore_index=True,
+    )
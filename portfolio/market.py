@@ -0,0 +1,19 @@
+from datetime import datetime, time
+from zoneinfo import ZoneInfo
+
+from portfolio.settings import section
+
+
+def _hours():
+    market = section("market")
+    return (
+        ZoneInfo(market.get("timezone", "Asia/Kolkata")),
+        time.fromisoformat(market.get("open", "09:15")),
+        time.fromisoformat(market.get("close", "15:30")),
+    )
+
+
+def is_market_open(now: datetime = None) -> bool:
+    tz, open_at, close_at = _hours()
+    now = now.astimezone(tz) if now else datetime.now(tz)
+    return now.weekday() < 5 and open_at <= now.time() <= close_at
@@ -0,0 +1,194 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+METADATA_COLUMNS = ["sector", "industry", "market_cap", "currency", "short_name"]
+UNKNOWN = "Unknown"
+
+# Market-cap buckets in INR: upper bound (exclusive) -> label.
+CAP_BUCKETS = [
+    (5_000e7, "Small cap"),
+    (20_000e7, "Mid cap"),
+    (np.inf, "Large cap"),
+]
+
+SCHEMA = """
+create table if not exists metadata (
+    symbol text primary key,
+    sector text,
+    industry text,
+    market_cap real,
+    currency text,
+    short_name text,
+    fetched_at real not null
+);
+"""
+
+
+def yahoo_metadata(symbol: str) -> dict:
+    # ticker.info is the heaviest Yahoo payload; it is only read here, off the
+    # price path, and only its slow-changing fields are kept.
+    import yfinance as yf
+
+    info = yf.Ticker(symbol).info or {}
+    return {
+        "sector": info.get("sector") or info.get("quoteType"),
+        "industry": info.get("industry"),
+        "market_cap": info.get("marketCap"),
+        "currency": info.get("currency"),
+        "short_name": info.get("shortName"),
+    }
+
+
+class MetadataStore:
+    # Long-TTL instrument metadata in a local SQLite file. get() answers from
+    # memory straight away; symbols that are missing or older than `ttl` are
+    # fetched on a small background pool and show up on a later call.
+    def __init__(
+        self,
+        path: str,
+        fetch_one: Callable[[str], Optional[dict]] = yahoo_metadata,
+        ttl: float = 7 * 24 * 3600,
+        retry_after: float = 300,
+        max_workers: int = 2,
+    ):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.fetch_one = fetch_one
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("pragma journal_mode=wal")
+        self._conn.executescript(SCHEMA)
+        rows = self._conn.execute(
+            f"select symbol, {', '.join(METADATA_COLUMNS)}, fetched_at from metadata"
+        ).fetchall()
+        self._values = {row[0]: dict(zip(METADATA_COLUMNS, row[1:-1])) for row in rows}
+        self._fetched_at = {row[0]: row[-1] for row in rows}
+        self._failed_at: dict[str, float] = {}
+        self._pending: set[str] = set()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="metadata"
+        )
+
+    def _refresh(self, symbol: str):
+        try:
+            values = self.fetch_one(symbol)
+        except Exception:
+            logger.warning("Metadata fetch failed for %s", symbol, exc_info=True)
+            values = None
+        with self._lock:
+            self._pending.discard(symbol)
+            if not values:
+                self._failed_at[symbol] = time.time()
+                return
+            values = {column: values.get(column) for column in METADATA_COLUMNS}
+            fetched_at = time.time()
+            self._values[symbol] = values
+            self._fetched_at[symbol] = fetched_at
+            with self._conn:
+                self._conn.execute(
+                    "insert or replace into metadata (symbol, "
+                    f"{', '.join(METADATA_COLUMNS)}, fetched_at) "
+                    "values (?, ?, ?, ?, ?, ?, ?)",
+                    (symbol, *values.values(), fetched_at),
+                )
+
+    def prefetch(self, symbols: Iterable[str]) -> int:
+        now = time.time()
+        with self._lock:
+            due = [
+                symbol
+                for symbol in dict.fromkeys(symbols)
+                if symbol not in self._pending
+                and now - self._fetched_at.get(symbol, 0) > self.ttl
+                and now - self._failed_at.get(symbol, 0) > self.retry_after
+            ]
+            self._pending.update(due)
+        for symbol in due:
+            self._executor.submit(self._refresh, symbol)
+        return len(due)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def get(self, symbols: Iterable[str]) -> pd.DataFrame:
+        symbols = list(dict.fromkeys(symbols))
+        self.prefetch(symbols)
+        with self._lock:
+            rows = [self._values.get(symbol, {}) for symbol in symbols]
+        frame = pd.DataFrame.from_records(rows, columns=METADATA_COLUMNS)
+        frame.index = pd.Index(symbols, name="symbol")
+        return frame
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            self._conn.close()
+
+
+def cap_bucket(market_cap: pd.Series) -> pd.Series:
+    bounds = [bound for bound, _ in CAP_BUCKETS]
+    labels = np.array([label for _, label in CAP_BUCKETS] + [UNKNOWN])
+    values = pd.to_numeric(market_cap, errors="coerce").to_numpy(dtype="float64")
+    positions = np.searchsorted(bounds, values, side="right")
+    positions[np.isnan(values)] = len(CAP_BUCKETS)
+    return pd.Series(labels[positions], index=market_cap.index)
+
+
+def allocation(
+    holdings: pd.DataFrame, metadata: pd.DataFrame, levels: list[str]
+) -> pd.DataFrame:
+    # current_value summed per group of `levels` (any of sector, industry,
+    # market_cap_bucket); holdings without metadata yet land in "Unknown".
+    frame = holdings[["symbol", "current_value"]].join(metadata, on="symbol")
+    frame["market_cap_bucket"] = cap_bucket(frame["market_cap"])
+    frame[levels] = frame[levels].fillna(UNKNOWN).replace("", UNKNOWN)
+    rollup = (
+        frame.groupby(levels, sort=False)["current_value"]
+        .agg(["sum", "count"])
+        .rename(columns={"sum": "current_value", "count": "holdings"})
+        .reset_index()
+        .sort_values("current_value", ascending=False, ignore_index=True)
+    )
+    total = rollup["current_value"].sum()
+    rollup["weight"] = rollup["current_value"] / total * 100 if total else 0.0
+    return rollup
+
+
+def treemap_nodes(rollup: pd.DataFrame, levels: list[str]) -> pd.DataFrame:
+    # ids/parents/values for go.Treemap: one node per group at every level,
+    # each the sum of the leaf rows under it.
+    nodes = []
+    for depth in range(1, len(levels) + 1):
+        path = levels[:depth]
+        grouped = rollup.groupby(path, sort=False)["current_value"].sum().reset_index()
+        keys = grouped[path].astype(str)
+        ids = keys.agg("/".join, axis=1)
+        parents = (
+            keys[path[:-1]].agg("/".join, axis=1)
+            if depth > 1
+            else pd.Series("", index=keys.index)
+        )
+        nodes.append(
+            pd.DataFrame(
+                {
+                    "id": ids,
+                    "parent": parents,
+                    "label": keys[path[-1]],
+                    "value": grouped["current_value"],
+                }
+            )
+        )
+    return pd.concat(nodes, ignore_index=True)
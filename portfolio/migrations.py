@@ -0,0 +1,294 @@
+import logging
+import time
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+DIALECTS = ("mssql", "sqlite", "duckdb")
+
+# Auto-numbered "id" primary key; DuckDB takes it from a per-table sequence.
+IDENTITY = {
+    "mssql": "int identity(1, 1) primary key",
+    "sqlite": "integer primary key autoincrement",
+    "duckdb": "integer primary key default nextval('{table}_id')",
+}
+
+
+class Table(NamedTuple):
+    name: str
+    columns: list[str]
+    identity: bool = True
+
+
+class Index(NamedTuple):
+    table: str
+    columns: list[str]
+    unique: bool = False
+
+    @property
+    def name(self) -> str:
+        return f"ix_{self.table}_{'_'.join(self.columns)}"
+
+
+class AddId(NamedTuple):
+    # Gives a table created before it had an "id" column one, numbering the
+    # existing rows in insertion order.
+    table: Table
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    steps: list
+
+
+# Only ever append: a database records the versions it has applied. Every
+# step creates its table or index only when it is missing, so a database
+# whose tables predate this list adopts them as they are; a later migration
+# brings such a table up to date.
+STOCKS = Table(
+    "stocks",
+    [
+        "user_id integer not null",
+        "symbol varchar(32) not null",
+        "stock_name varchar(255)",
+        "buy_date date",
+        "buy_price double precision",
+        "quantity integer",
+    ],
+)
+
+MIGRATIONS = [
+    Migration(
+        1,
+        "users, lots and sells",
+        [
+            Table(
+                "users",
+                [
+                    "name varchar(255)",
+                    "user_id varchar(64) not null",
+                    "user_pass varchar(512) not null",
+                ],
+            ),
+            Index("users", ["user_id"], unique=True),
+            STOCKS,
+            Index("stocks", ["user_id", "symbol"]),
+            Table(
+                "stock_sells",
+                [
+                    "user_id integer not null",
+                    "symbol varchar(32) not null",
+                    "sell_date date",
+                    "sell_price double precision",
+                    "quantity integer",
+                ],
+            ),
+            Index("stock_sells", ["user_id", "symbol"]),
+        ],
+    ),
+    # One row per (user, symbol), kept in step with stocks/stock_sells by
+    # portfolio.summary inside the transaction that changes them.
+    Migration(
+        2,
+        "holding summary",
+        [
+            Table(
+                "stock_summary",
+                [
+                    "user_id integer not null",
+                    "symbol varchar(32) not null",
+                    "stock_name varchar(255)",
+                    "buy_date date",
+                    "buy_price double precision",
+                    "quantity double precision",
+                    "lots integer",
+                    "realized double precision",
+                    "primary key (user_id, symbol)",
+                ],
+                identity=False,
+            ),
+        ],
+    ),
+    Migration(
+        3,
+        "price alerts",
+        [
+            Table(
+                "stock_alerts",
+                [
+                    "user_id integer not null",
+                    "symbol varchar(32) not null",
+                    "kind varchar(16) not null",
+                    "threshold double precision not null",
+                    "active integer not null default 1",
+                    "created_at double precision",
+                    "fired_at double precision",
+                ],
+            ),
+            Index("stock_alerts", ["user_id", "symbol"]),
+            Table(
+                "alert_outbox",
+                [
+                    "user_id integer not null",
+                    "alert_id integer not null",
+                    "symbol varchar(32) not null",
+                    "message varchar(255) not null",
+                    "fired_at double precision not null",
+                    "delivered integer not null default 0",
+                ],
+            ),
+            Index("alert_outbox", ["user_id", "delivered"]),
+        ],
+    ),
+    # Lots are edited and deleted by id; a stocks table from before lots had
+    # one gets it here. Rebuilding the table on SQLite drops its index.
+    Migration(
+        4,
+        "lot ids",
+        [AddId(STOCKS), Index("stocks", ["user_id", "symbol"])],
+    ),
+]
+
+VERSIONS = Table(
+    "schema_version",
+    [
+        "version integer primary key",
+        "description varchar(255)",
+        "applied_at double precision",
+    ],
+    identity=False,
+)
+
+
+def create_table(table: Table, dialect: str) -> list[str]:
+    statements, columns = [], list(table.columns)
+    if table.identity:
+        if dialect == "duckdb":
+            statements.append(f"create sequence if not exists {table.name}_id")
+        columns.insert(0, "id " + IDENTITY[dialect].format(table=table.name))
+    body = f"{table.name} ({', '.join(columns)})"
+    if dialect == "mssql":
+        statements.append(
+            f"if object_id(N'{table.name}', N'U') is null create table {body}"
+        )
+    else:
+        statements.append(f"create table if not exists {body}")
+    return statements
+
+
+def create_index(index: Index, dialect: str) -> list[str]:
+    kind = "unique index" if index.unique else "index"
+    target = f"on {index.table} ({', '.join(index.columns)})"
+    if dialect == "mssql":
+        return [
+            "if not exists (select 1 from sys.indexes where name = "
+            f"N'{index.name}') create {kind} {index.name} {target}"
+        ]
+    return [f"create {kind} if not exists {index.name} {target}"]
+
+
+def column_names(cur, table: str, dialect: str) -> list[str]:
+    if dialect == "sqlite":
+        cur.execute("select name from pragma_table_info(?)", (table,))
+    else:
+        cur.execute(
+            "select column_name from information_schema.columns "
+            "where table_name = ?",
+            (table,),
+        )
+    return [row[0] for row in cur.fetchall()]
+
+
+def add_id(cur, table: Table, dialect: str):
+    if dialect == "mssql":
+        cur.execute(
+            f"if col_length(N'{table.name}', N'id') is null "
+            f"alter table {table.name} add id int identity(1, 1) not null"
+        )
+        return
+    if "id" in column_names(cur, table.name, dialect):
+        return
+    if dialect == "duckdb":
+        cur.execute(f"create sequence if not exists {table.name}_id")
+        cur.execute(
+            f"alter table {table.name} add column id integer "
+            f"default nextval('{table.name}_id')"
+        )
+        return
+    # SQLite cannot add a primary key column: copy into a new table instead,
+    # keeping any columns the table has beyond its definition.
+    cur.execute("select name, type from pragma_table_info(?)", (table.name,))
+    existing = cur.fetchall()
+    defined = {column.split()[0] for column in table.columns}
+    rebuilt = Table(
+        f"{table.name}_rebuild",
+        table.columns
+        + [f"{name} {kind}" for name, kind in existing if name not in defined],
+    )
+    columns = ", ".join(name for name, _ in existing)
+    for statement in create_table(rebuilt, dialect):
+        cur.execute(statement)
+    cur.execute(
+        f"insert into {rebuilt.name} ({columns}) "
+        f"select {columns} from {table.name} order by rowid"
+    )
+    cur.execute(f"drop table {table.name}")
+    cur.execute(f"alter table {rebuilt.name} rename to {table.name}")
+
+
+def statements(step, dialect: str) -> list[str]:
+    if isinstance(step, Table):
+        return create_table(step, dialect)
+    return create_index(step, dialect)
+
+
+def apply(cur, step, dialect: str):
+    if isinstance(step, AddId):
+        add_id(cur, step.table, dialect)
+        return
+    for statement in statements(step, dialect):
+        cur.execute(statement)
+
+
+def applied_versions(cur) -> set[int]:
+    cur.execute("select version from schema_version")
+    return {int(row[0]) for row in cur.fetchall()}
+
+
+def migrate(conn, dialect: str, migrations: list[Migration] = MIGRATIONS) -> list[int]:
+    # Applies the migrations this database has not recorded yet, oldest first,
+    # each committed with its schema_version row. Returns the versions applied.
+    if dialect not in DIALECTS:
+        raise ValueError(f"Unknown database dialect {dialect!r}")
+    cur = conn.cursor()
+    for statement in create_table(VERSIONS, dialect):
+        cur.execute(statement)
+    conn.commit()
+    applied = applied_versions(cur)
+    done = []
+    for migration in sorted(migrations):
+        if migration.version in applied:
+            continue
+        for step in migration.steps:
+            apply(cur, step, dialect)
+        try:
+            cur.execute(
+                "insert into schema_version (version, description, applied_at) "
+                "values (?, ?, ?)",
+                (migration.version, migration.description, time.time()),
+            )
+            conn.commit()
+        except Exception:
+            # Another process starting at the same time recorded it first.
+            conn.rollback()
+            if migration.version not in applied_versions(cur):
+                raise
+            continue
+        logger.info(
+            "Applied schema migration %d (%s)",
+            migration.version,
+            migration.description,
+        )
+        done.append(migration.version)
+    return done
@@ -0,0 +1,135 @@
+import functools
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import nullcontext
+
+logger = logging.getLogger(__name__)
+
+_NOOP = nullcontext()
+_enabled = False
+_lock = threading.Lock()
+_process: dict[str, list] = {}
+# Streamlit runs every script rerun of a session on one thread, so a
+# thread-local dict is the current rerun's timings.
+_local = threading.local()
+
+
+def enable(on: bool = True):
+    global _enabled
+    _enabled = on
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def _recording() -> bool:
+    return _enabled or getattr(_local, "rerun", None) is not None
+
+
+def _record(name: str, elapsed: float):
+    rerun = getattr(_local, "rerun", None)
+    if rerun is not None:
+        stat = rerun.setdefault(name, [0, 0.0, 0.0])
+        stat[0] += 1
+        stat[1] += elapsed
+        stat[2] = max(stat[2], elapsed)
+    if not _enabled:
+        return
+    with _lock:
+        stat = _process.setdefault(name, [0, 0.0, 0.0])
+        stat[0] += 1
+        stat[1] += elapsed
+        stat[2] = max(stat[2], elapsed)
+
+
+class _Span:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _record(self.name, time.perf_counter() - self.started)
+        return False
+
+
+def span(name: str):
+    # Disabled spans are two cheap checks and a shared no-op context manager.
+    return _Span(name) if _recording() else _NOOP
+
+
+def timed(name: str):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _recording():
+                return func(*args, **kwargs)
+            with _Span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def begin_rerun(session: bool = False):
+    # `session` records this rerun's spans for its own session even while
+    # recording is off for the process; they stay out of process_stats().
+    _local.rerun = {} if _enabled or session else None
+
+
+def _as_dicts(stats: dict) -> dict:
+    return {
+        name: {"count": count, "total": total, "max": peak}
+        for name, (count, total, peak) in sorted(stats.items())
+    }
+
+
+def rerun_stats() -> dict:
+    return _as_dicts(getattr(_local, "rerun", None) or {})
+
+
+def process_stats() -> dict:
+    with _lock:
+        return _as_dicts({name: list(stat) for name, stat in _process.items()})
+
+
+def prometheus_text() -> str:
+    lines = [
+        "# HELP portfolio_span_seconds Time spent in instrumented code paths.",
+        "# TYPE portfolio_span_seconds summary",
+    ]
+    stats = process_stats()
+    for name, stat in stats.items():
+        lines.append(f'portfolio_span_seconds_count{{span="{name}"}} {stat["count"]}')
+        lines.append(f'portfolio_span_seconds_sum{{span="{name}"}} {stat["total"]:.6f}')
+    lines.append("# HELP portfolio_span_seconds_max Slowest single call per span.")
+    lines.append("# TYPE portfolio_span_seconds_max gauge")
+    for name, stat in stats.items():
+        lines.append(f'portfolio_span_seconds_max{{span="{name}"}} {stat["max"]:.6f}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path: str):
+    # Write-then-rename so a scraper never reads a half-written file.
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile(
+        "w", dir=directory, delete=False, suffix=".tmp"
+    ) as f:
+        f.write(prometheus_text())
+    os.replace(f.name, path)
+
+
+def log_rerun(session: str = ""):
+    stats = rerun_stats()
+    if stats:
+        logger.info(json.dumps({"event": "rerun", "session": session, "spans": stats}))
@@ -0,0 +1,151 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+EVENT_KEY_COLUMNS = ["symbol", "buy_date", "buy_price", "quantity"]
+CURVE_COLUMNS = ["value", "invested", "benchmark"]
+
+
+def events_key(df: pd.DataFrame) -> int:
+    if df.empty:
+        return 0
+    hashed = pd.util.hash_pandas_object(df[EVENT_KEY_COLUMNS], index=False)
+    return int(hashed.sum())
+
+
+def _event_rows(dates: pd.DatetimeIndex, event_dates) -> np.ndarray:
+    # Row of the first trading day on or after each event; events before the
+    # grid land on row 0 so a grid that starts mid-history carries them in.
+    return dates.searchsorted(pd.DatetimeIndex(event_dates))
+
+
+def value_curve(
+    events: pd.DataFrame, closes: pd.DataFrame, benchmark: pd.Series
+) -> pd.DataFrame:
+    # closes is a date x symbol matrix. Quantities, cost and benchmark units
+    # are built as per-day deltas and cumulated down the date axis, so the
+    # whole curve is a handful of array operations however many events.
+    closes = closes.sort_index().ffill()
+    dates = closes.index
+    if len(dates) == 0 or events.empty:
+        return pd.DataFrame(columns=CURVE_COLUMNS, index=dates, dtype="float64")
+
+    buy_dates = pd.to_datetime(events["buy_date"])
+    rows = _event_rows(dates, buy_dates)
+    in_grid = rows < len(dates)
+    cols = closes.columns.get_indexer(events["symbol"])
+    quantity = events["quantity"].to_numpy(dtype="float64")
+    cost = quantity * events["buy_price"].to_numpy(dtype="float64")
+
+    priced = in_grid & (cols >= 0)
+    held = np.zeros(closes.shape)
+    np.add.at(held, (rows[priced], cols[priced]), quantity[priced])
+    held = held.cumsum(axis=0)
+
+    invested = np.zeros(len(dates))
+    np.add.at(invested, rows[in_grid], cost[in_grid])
+
+    # Benchmark: the same cash flows used to buy index units on the buy date.
+    benchmark = benchmark.sort_index().ffill()
+    at_buy = benchmark.reindex(buy_dates, method="ffill").to_numpy(dtype="float64")
+    units = np.zeros(len(dates))
+    np.add.at(units, rows[in_grid], np.nan_to_num(cost / at_buy)[in_grid])
+    bench_close = benchmark.reindex(dates, method="ffill").to_numpy(dtype="float64")
+
+    return pd.DataFrame(
+        {
+            "value": np.nansum(held * closes.to_numpy(dtype="float64"), axis=1),
+            "invested": invested.cumsum(),
+            "benchmark": units.cumsum() * bench_close,
+        },
+        index=dates,
+    )
+
+
+def xirr(amounts, dates, guess: float = 0.1, iterations: int = 100) -> float:
+    amounts = np.asarray(amounts, dtype="float64")
+    days = pd.DatetimeIndex(pd.to_datetime(dates)).to_numpy(dtype="datetime64[D]")
+    if len(amounts) < 2 or not (amounts.min() < 0 < amounts.max()):
+        return float("nan")
+    years = (days - days.min()).astype("float64") / 365.0
+    rate = guess
+    for _ in range(iterations):
+        discount = (1 + rate) ** -years
+        npv = np.sum(amounts * discount)
+        slope = np.sum(-years * amounts * discount / (1 + rate))
+        if slope == 0:
+            break
+        step = npv / slope
+        rate = max(rate - step, -0.9999)
+        if abs(step) < 1e-9:
+            return float(rate)
+    return float("nan")
+
+
+def _flows(events: pd.DataFrame):
+    # Buys are cash out, sells (negative quantity) cash in.
+    amounts = -(
+        events["quantity"].to_numpy(dtype="float64")
+        * events["buy_price"].to_numpy(dtype="float64")
+    )
+    return amounts, pd.to_datetime(events["buy_date"])
+
+
+def holding_xirr(
+    events: pd.DataFrame, current_value: pd.Series, as_of: date = None
+) -> pd.Series:
+    as_of = pd.Timestamp(as_of or date.today())
+    amounts, dates = _flows(events)
+    rates = {}
+    for symbol, rows in events.groupby("symbol").indices.items():
+        value = current_value.get(symbol, np.nan)
+        if np.isnan(value):
+            rates[symbol] = np.nan
+            continue
+        rates[symbol] = (
+            xirr(
+                np.append(amounts[rows], value),
+                list(dates.iloc[rows]) + [as_of],
+            )
+            * 100
+        )
+    return pd.Series(rates, dtype="float64")
+
+
+def portfolio_xirr(
+    events: pd.DataFrame, current_value: float, as_of: date = None
+) -> float:
+    if events.empty:
+        return float("nan")
+    as_of = pd.Timestamp(as_of or date.today())
+    amounts, dates = _flows(events)
+    return xirr(np.append(amounts, current_value), list(dates) + [as_of]) * 100
+
+
+class PerformanceCache:
+    # Keeps the last computed curve for one set of buy/sell events; a later call
+    # with the same events only computes the trading days after the cached end.
+    def __init__(self):
+        self.key = None
+        self.curve = pd.DataFrame(columns=CURVE_COLUMNS, dtype="float64")
+
+    def curve_for(self, events: pd.DataFrame, store, benchmark_symbol: str):
+        key = events_key(events)
+        if events.empty:
+            return self.curve.iloc[0:0]
+        base = self.curve if key == self.key else self.curve.iloc[0:0]
+        if len(base):
+            # A week of overlap is enough to forward-fill the first new day.
+            start = base.index[-1].date() - timedelta(days=7)
+        else:
+            start = pd.to_datetime(events["buy_date"]).min().date()
+        closes = store.closes(dict.fromkeys(events["symbol"]), start=start)
+        benchmark = store.read(benchmark_symbol)["close"]
+        new = value_curve(events, closes, benchmark)
+        if len(base):
+            new = new[new.index > base.index[-1]]
+            new = pd.concat([base, new]) if len(new) else base
+        self.curve = new
+        self.key = key
+        return self.curve
@@ -0,0 +1,159 @@
+import logging
+import threading
+import time
+from types import MappingProxyType
+from typing import Callable, Iterable, Mapping, NamedTuple
+
+import pandas as pd
+
+from portfolio.market import is_market_open
+from portfolio.quotes import Quote, QuoteEngine, to_quote_table
+
+logger = logging.getLogger(__name__)
+
+
+class Snapshot(NamedTuple):
+    quotes: Mapping[str, Quote]
+    ts: float
+
+    def table(self, symbols: Iterable[str] = None) -> pd.DataFrame:
+        if symbols is None:
+            return to_quote_table(dict(self.quotes))
+        return to_quote_table({s: self.quotes[s] for s in symbols if s in self.quotes})
+
+
+EMPTY_SNAPSHOT = Snapshot(MappingProxyType({}), 0.0)
+
+
+class MarketDataPoller:
+    # One per process. Sessions register the symbols they hold; a daemon thread
+    # refreshes the union (plus any extra symbols) and swaps in a new immutable
+    # Snapshot, so readers never touch the network or take a lock.
+    def __init__(
+        self,
+        engine: QuoteEngine,
+        interval: float = 60,
+        session_ttl: float = 900,
+        extra_symbols: Iterable[str] = (),
+        market_open: Callable[[], bool] = is_market_open,
+        initial: Snapshot = EMPTY_SNAPSHOT,
+    ):
+        self.engine = engine
+        self.interval = interval
+        self.session_ttl = session_ttl
+        self.extra_symbols = frozenset(extra_symbols)
+        self.market_open = market_open
+        self.snapshot = initial
+        self._sessions: dict[str, tuple[frozenset, float]] = {}
+        self._pinned: dict[str, frozenset] = {}
+        self._subscribers: list[Callable[[Snapshot, dict], None]] = []
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._was_open = False
+
+    def register(self, session_id: str, symbols: Iterable[str]):
+        with self._lock:
+            self._sessions[session_id] = (frozenset(symbols), time.monotonic())
+
+    def unregister(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def pin(self, owner: str, symbols: Iterable[str]):
+        # Symbols watched for a server-side consumer (alerts) rather than a
+        # session, so they never expire.
+        with self._lock:
+            self._pinned[owner] = frozenset(symbols)
+
+    def subscribe(self, callback: Callable[[Snapshot, dict], None]):
+        # callback(snapshot, fetched) runs on the refreshing thread after each
+        # swap, with only the quotes that arrived in that refresh.
+        self._subscribers.append(callback)
+
+    def _publish(self, snapshot: Snapshot, fetched: dict):
+        for callback in self._subscribers:
+            try:
+                callback(snapshot, fetched)
+            except Exception:
+                logger.exception("Snapshot subscriber failed")
+
+    def watched(self) -> frozenset:
+        cutoff = time.monotonic() - self.session_ttl
+        with self._lock:
+            for session_id, (_, seen) in list(self._sessions.items()):
+                if seen < cutoff:
+                    del self._sessions[session_id]
+            symbols = set(self.extra_symbols)
+            for held, _ in self._sessions.values():
+                symbols |= held
+            for pinned in self._pinned.values():
+                symbols |= pinned
+        return frozenset(symbols)
+
+    def refresh(self, symbols: Iterable[str] = None) -> Snapshot:
+        symbols = self.watched() if symbols is None else list(symbols)
+        if not symbols:
+            return self.snapshot
+        # The network fetch runs unlocked, so a session fetching a few new
+        # symbols never waits behind a background refresh of the whole union.
+        fetched = self.engine.fetch(symbols, fallback=False)
+        with self._refresh_lock:
+            # The snapshot keeps its previous quotes for anything not fetched,
+            # and its timestamp only moves when something fresh arrived. A
+            # fetch that finishes after a newer one does not undo it.
+            if fetched:
+                quotes = dict(self.snapshot.quotes)
+                for symbol, quote in fetched.items():
+                    if symbol not in quotes or quote.ts >= quotes[symbol].ts:
+                        quotes[symbol] = quote
+                self.snapshot = Snapshot(MappingProxyType(quotes), time.time())
+            snapshot = self.snapshot
+        if fetched:
+            self._publish(snapshot, fetched)
+        return snapshot
+
+    def ensure(self, symbols: Iterable[str]) -> Snapshot:
+        # Only symbols never seen before cost a fetch.
+        snapshot = self.snapshot
+        missing = [s for s in symbols if s not in snapshot.quotes]
+        if missing:
+            snapshot = self.refresh(missing)
+        return snapshot
+
+    def _should_refresh(self) -> bool:
+        is_open = self.market_open()
+        # One more pass right after the close picks up the closing prices.
+        should = is_open or self._was_open
+        self._was_open = is_open
+        return should
+
+    def _run(self):
+        # A snapshot loaded from disk is served as is and revalidated once,
+        # whatever the market hours, so a restart never shows stale prices
+        # for longer than one fetch.
+        if self.snapshot.quotes:
+            try:
+                self.refresh(list(self.snapshot.quotes))
+            except Exception:
+                logger.exception("Initial market data refresh failed")
+        while not self._stop.is_set():
+            try:
+                if self._should_refresh():
+                    self.refresh()
+            except Exception:
+                logger.exception("Market data refresh failed")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="market-data-poller", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
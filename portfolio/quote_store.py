@@ -0,0 +1,64 @@
+import os
+import sqlite3
+import threading
+import time
+from types import MappingProxyType
+from typing import Mapping
+
+from portfolio.poller import EMPTY_SNAPSHOT, Snapshot
+from portfolio.quotes import Quote
+
+SCHEMA = """
+create table if not exists quotes (
+    symbol text primary key,
+    price real not null,
+    prev_close real not null,
+    ts real not null,
+    saved_at real not null
+);
+"""
+
+
+class QuoteStore:
+    # Last known quote per symbol in a local SQLite file. Every successful
+    # fetch is upserted; a restarted process loads it to paint immediately
+    # and to keep serving (read-only) while Yahoo is unreachable.
+    def __init__(self, path: str):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("pragma journal_mode=wal")
+        self._conn.executescript(SCHEMA)
+
+    def save(self, quotes: Mapping[str, Quote], saved_at: float = None):
+        if not quotes:
+            return
+        saved_at = saved_at or time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "insert into quotes (symbol, price, prev_close, ts, saved_at) "
+                "values (?, ?, ?, ?, ?) on conflict(symbol) do update set "
+                "price = excluded.price, prev_close = excluded.prev_close, "
+                "ts = excluded.ts, saved_at = excluded.saved_at",
+                [
+                    (symbol, quote.price, quote.prev_close, quote.ts, saved_at)
+                    for symbol, quote in quotes.items()
+                ],
+            )
+
+    def load(self) -> Snapshot:
+        with self._lock:
+            rows = self._conn.execute(
+                "select symbol, price, prev_close, ts, saved_at from quotes"
+            ).fetchall()
+        if not rows:
+            return EMPTY_SNAPSHOT
+        quotes = {symbol: Quote(price, prev, ts) for symbol, price, prev, ts, _ in rows}
+        # Stamped like a poller snapshot: the time of the last refresh.
+        return Snapshot(MappingProxyType(quotes), max(row[4] for row in rows))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
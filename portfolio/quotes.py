@@ -0,0 +1,270 @@
+import json
+import logging
+import time
+import urllib.parse
+import urllib.request
+from typing import Iterable, NamedTuple, Optional, Protocol
+
+import pandas as pd
+
+from portfolio.fetch import YAHOO_HOST, Fetcher, RetryableError
+
+logger = logging.getLogger(__name__)
+
+QUOTE_COLUMNS = ["price", "prev_close", "ts"]
+
+
+class Quote(NamedTuple):
+    price: float
+    prev_close: float
+    ts: float
+
+
+class QuoteProvider(Protocol):
+    def fetch(self, symbols: list[str]) -> dict[str, Quote]: ...
+
+
+class YahooQuoteProvider:
+    # One yf.download call per chunk returns the last few daily bars for every
+    # symbol. yfinance sends one request per symbol on its own threads and
+    # logs, rather than raises, the ones that fail. Daily bars only approximate
+    # a quote: price is the last bar's close (live during the session), ts is
+    # that bar's date rather than the trade time, and prev_close is the bar
+    # before it, which before the open is two sessions back.
+    def __init__(self, period: str = "5d", timeout: int = 10):
+        self.period = period
+        self.timeout = timeout
+
+    def fetch(self, symbols: list[str]) -> dict[str, Quote]:
+        import yfinance as yf
+        from yfinance.exceptions import YFRateLimitError
+
+        try:
+            data = self._download(yf, symbols)
+        except YFRateLimitError as e:
+            raise RetryableError(str(e)) from e
+        if data is None or data.empty:
+            # Nothing at all came back: Yahoo is down or refusing us, not
+            # short of a few symbols.
+            raise RetryableError(f"no quotes returned for {len(symbols)} symbol(s)")
+
+        closes = data["Close"]
+        quotes = {}
+        for symbol in closes.columns:
+            series = closes[symbol].dropna()
+            if series.empty:
+                continue
+            price = float(series.iloc[-1])
+            prev_close = float(series.iloc[-2]) if len(series) > 1 else price
+            quotes[symbol] = Quote(price, prev_close, series.index[-1].timestamp())
+        if not quotes:
+            raise RetryableError(f"no quotes returned for {len(symbols)} symbol(s)")
+        missing = set(symbols) - set(quotes)
+        if missing:
+            logger.warning("No quotes for %s", ", ".join(sorted(missing)))
+        return quotes
+
+    def _download(self, yf, symbols: list[str]):
+        return yf.download(
+            symbols,
+            period=self.period,
+            interval="1d",
+            group_by="column",
+            auto_adjust=False,
+            progress=False,
+            threads=True,
+            timeout=self.timeout,
+            multi_level_index=True,
+        )
+
+
+def _meta_quote(meta: dict) -> Optional[Quote]:
+    # The last traded price, its trade time and the previous session's close,
+    # as Yahoo's quote page shows them.
+    price = meta.get("regularMarketPrice")
+    if price is None:
+        return None
+    # Over a one-day range both are the last close before today's session.
+    prev_close = meta.get("previousClose") or meta.get("chartPreviousClose")
+    return Quote(
+        float(price),
+        float(prev_close or price),
+        float(meta.get("regularMarketTime") or time.time()),
+    )
+
+
+def _get_json(url: str, timeout: int) -> dict:
+    request = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.load(response)
+
+
+class YahooSparkProvider:
+    # Plain HTTP against Yahoo's v7 spark endpoint, which answers up to 20
+    # symbols per request with the same metadata as the chart endpoint, so a
+    # portfolio is priced in a few batched requests. base_url can point at a
+    # local fake server.
+    chunk_size = 20
+    batched = True
+
+    def __init__(self, base_url: str = f"https://{YAHOO_HOST}", timeout: int = 10):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def fetch(self, symbols: list[str]) -> dict[str, Quote]:
+        url = "%s/v7/finance/spark?symbols=%s&range=1d&interval=1d" % (
+            self.base_url,
+            urllib.parse.quote(",".join(symbols), safe=","),
+        )
+        spark = _get_json(url, self.timeout)["spark"]
+        quotes = {}
+        for result in spark.get("result") or []:
+            response = result.get("response") or []
+            quote = _meta_quote(response[0].get("meta", {})) if response else None
+            if quote:
+                quotes[result["symbol"]] = quote
+        missing = set(symbols) - set(quotes)
+        if missing:
+            logger.warning("No quotes for %s", ", ".join(sorted(missing)))
+        return quotes
+
+
+class YahooChartProvider:
+    # Plain HTTP against Yahoo's v8 chart endpoint, one symbol per request, so
+    # it can run on the Fetcher's pool and be pointed at a local fake server.
+    chunk_size = 1
+
+    def __init__(self, base_url: str = f"https://{YAHOO_HOST}", timeout: int = 10):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def fetch_one(self, symbol: str) -> Optional[Quote]:
+        url = "%s/v8/finance/chart/%s?range=1d&interval=1d" % (
+            self.base_url,
+            urllib.parse.quote(symbol),
+        )
+        chart = _get_json(url, self.timeout)["chart"]
+        if not chart.get("result"):
+            return None
+        return _meta_quote(chart["result"][0]["meta"])
+
+    def fetch(self, symbols: list[str]) -> dict[str, Quote]:
+        quotes = {}
+        for symbol in symbols:
+            quote = self.fetch_one(symbol)
+            if quote:
+                quotes[symbol] = quote
+        return quotes
+
+
+class StaticQuoteProvider:
+    # Local stand-in for Yahoo: serves fixed quotes and counts requests.
+    def __init__(self, quotes: dict[str, tuple[float, float]]):
+        self.quotes = dict(quotes)
+        self.calls = 0
+
+    def fetch(self, symbols: list[str]) -> dict[str, Quote]:
+        self.calls += 1
+        now = time.time()
+        return {
+            symbol: Quote(*self.quotes[symbol], now)
+            for symbol in symbols
+            if symbol in self.quotes
+        }
+
+
+def empty_quote_table() -> pd.DataFrame:
+    table = pd.DataFrame(columns=QUOTE_COLUMNS, dtype="float64")
+    table.index.name = "symbol"
+    return table
+
+
+def to_quote_table(quotes: dict[str, Quote]) -> pd.DataFrame:
+    if not quotes:
+        return empty_quote_table()
+    table = pd.DataFrame.from_dict(quotes, orient="index", columns=QUOTE_COLUMNS)
+    table.index.name = "symbol"
+    return table.astype("float64")
+
+
+class QuoteEngine:
+    # With a Fetcher, chunks are fetched concurrently under its rate limit,
+    # retries and circuit breaker; a chunk that still fails is answered from
+    # the last quotes this engine saw for those symbols. A store (see
+    # portfolio.quote_store) persists every fresh quote. With a shared cache
+    # (see portfolio.cache), quotes another process fetched less than
+    # cache_ttl seconds ago are used instead of asking Yahoo again.
+    def __init__(
+        self,
+        provider: QuoteProvider,
+        chunk_size: int = 200,
+        fetcher: Fetcher = None,
+        host: str = YAHOO_HOST,
+        store=None,
+        cache=None,
+        cache_ttl: float = 60,
+    ):
+        self.provider = provider
+        self.chunk_size = getattr(provider, "chunk_size", chunk_size)
+        self.fetcher = fetcher
+        self.host = host
+        self.store = store
+        self.cache = cache
+        self.cache_ttl = cache_ttl
+        self.last_known: dict[str, Quote] = {}
+
+    def _fetch_chunk(self, chunk: tuple) -> dict[str, Quote]:
+        return self.provider.fetch(list(chunk))
+
+    def fetch(
+        self, symbols: Iterable[str], fallback: bool = True, cached: bool = True
+    ) -> dict[str, Quote]:
+        # cached=False skips reading the shared cache for a caller that keeps
+        # its own, shorter-lived entry; fresh quotes are still written to it.
+        unique = list(dict.fromkeys(s for s in symbols if s))
+        hits = {}
+        if self.cache is not None and cached:
+            hits = {
+                key[len("quote:") :]: quote
+                for key, quote in self.cache.get_many(
+                    f"quote:{symbol}" for symbol in unique
+                ).items()
+            }
+        missing = [symbol for symbol in unique if symbol not in hits]
+        chunks = [
+            tuple(missing[start : start + self.chunk_size])
+            for start in range(0, len(missing), self.chunk_size)
+        ]
+        quotes = {}
+        if self.fetcher is None:
+            for chunk in chunks:
+                quotes.update(self._fetch_chunk(chunk))
+        else:
+            # A batched provider makes one request per chunk, the others one
+            # per symbol in it.
+            batched = getattr(self.provider, "batched", False)
+            for fetched in self.fetcher.map(
+                self.host, self._fetch_chunk, chunks, cost=None if batched else len
+            ).values():
+                quotes.update(fetched)
+        if self.cache is not None:
+            self.cache.set_many(
+                {f"quote:{symbol}": quote for symbol, quote in quotes.items()},
+                self.cache_ttl,
+            )
+        if self.store is not None:
+            try:
+                self.store.save(quotes)
+            except Exception:
+                logger.exception("Could not persist quotes")
+        quotes.update(hits)
+        self.last_known.update(quotes)
+        if not fallback:
+            return quotes
+        for symbol in unique:
+            if symbol not in quotes and symbol in self.last_known:
+                quotes[symbol] = self.last_known[symbol]
+        return quotes
+
+    def get_quotes(self, symbols: Iterable[str]) -> pd.DataFrame:
+        return to_quote_table(self.fetch(symbols))
@@ -0,0 +1,222 @@
+from contextlib import contextmanager
+from datetime import date
+from itertools import islice
+from typing import Iterable, NamedTuple, Optional
+
+import pandas as pd
+
+from portfolio.lots import LOT_COLUMNS, SELL_COLUMNS, empty_sells
+from portfolio.summary import fetch_summary, refresh_summary
+
+INSERT_LOT = (
+    "insert into stocks "
+    "(user_id, symbol, stock_name, buy_date, buy_price, quantity) "
+    "values (?, ?, ?, ?, ?, ?);"
+)
+
+
+class User(NamedTuple):
+    id: int
+    name: str
+    user_id: str
+    user_pass: str
+
+
+class AlertRow(NamedTuple):
+    id: int
+    kind: str
+    threshold: float
+
+
+def _dates(frame: pd.DataFrame, column: str) -> pd.DataFrame:
+    if len(frame):
+        frame[column] = pd.to_datetime(frame[column], yearfirst=True).dt.date
+    return frame
+
+
+class Repository:
+    # Typed reads and writes for users, lots, sells and alerts on a
+    # ConnectionPool. The SQL is plain enough for SQL Server, SQLite and
+    # DuckDB alike; every write that changes a holding rebuilds its
+    # stock_summary row in the same transaction.
+    def __init__(self, pool):
+        self.pool = pool
+
+    def _rows(self, sql: str, params: tuple) -> list[tuple]:
+        with self.pool.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(sql, params)
+            return [tuple(row) for row in cur.fetchall()]
+
+    def _frame(self, sql: str, params: tuple, columns: list[str]) -> pd.DataFrame:
+        return pd.DataFrame.from_records(self._rows(sql, params), columns=columns)
+
+    @contextmanager
+    def _transaction(self, user_id=None, symbol: str = None):
+        with self.pool.connection() as conn:
+            cur = conn.cursor()
+            yield cur
+            if symbol is not None:
+                refresh_summary(conn, user_id, [symbol])
+            conn.commit()
+
+    def find_user(self, login: str) -> Optional[User]:
+        rows = self._rows(
+            "select id, name, user_id, user_pass from users where user_id = ?;",
+            (login,),
+        )
+        return User(*rows[0]) if rows else None
+
+    def add_user(self, name: str, login: str, password: str):
+        with self._transaction() as cur:
+            cur.execute(
+                "insert into users (name, user_id, user_pass) values (?, ?, ?);",
+                (name, login, password),
+            )
+
+    def lots(self, user_id, symbol: str = None) -> pd.DataFrame:
+        sql = f"select {', '.join(LOT_COLUMNS)} from stocks where user_id = ?"
+        params = (user_id,)
+        if symbol:
+            sql += " and symbol = ?"
+            params += (symbol,)
+        return _dates(self._frame(sql + ";", params, LOT_COLUMNS), "buy_date")
+
+    def sells(self, user_id) -> pd.DataFrame:
+        frame = self._frame(
+            f"select {', '.join(SELL_COLUMNS)} from stock_sells where user_id = ?;",
+            (user_id,),
+            SELL_COLUMNS,
+        )
+        return _dates(frame, "sell_date") if len(frame) else empty_sells()
+
+    def lot_totals(self, user_id) -> tuple:
+        # (number of lots, total quantity): cheap enough to check every rerun.
+        return self._rows(
+            "select count(*), sum(quantity) from stocks where user_id = ?;",
+            (user_id,),
+        )[0]
+
+    def summary(self, user_id) -> pd.DataFrame:
+        with self.pool.connection() as conn:
+            return fetch_summary(conn, user_id)
+
+    def add_lot(
+        self,
+        user_id,
+        symbol: str,
+        stock_name: str,
+        buy_date: date,
+        buy_price: float,
+        quantity: int,
+    ):
+        with self._transaction(user_id, symbol) as cur:
+            cur.execute(
+                INSERT_LOT,
+                (user_id, symbol, stock_name, buy_date, buy_price, quantity),
+            )
+
+    def add_lots(
+        self,
+        user_id,
+        lots: Iterable[tuple[str, str, date, float, int]],
+        batch_size: int = 500,
+    ) -> int:
+        # (symbol, stock_name, buy_date, buy_price, quantity) rows, inserted
+        # in batches within one transaction with their summary rows, so a
+        # failure leaves none of them behind. Returns the number inserted.
+        lots = iter(lots)
+        inserted, symbols = 0, set()
+        with self.pool.connection() as conn:
+            cur = conn.cursor()
+            if hasattr(cur, "fast_executemany"):
+                cur.fast_executemany = True
+            while batch := list(islice(lots, batch_size)):
+                cur.executemany(INSERT_LOT, [(user_id, *lot) for lot in batch])
+                inserted += len(batch)
+                symbols.update(lot[0] for lot in batch)
+            if symbols:
+                refresh_summary(conn, user_id, sorted(symbols))
+            conn.commit()
+        return inserted
+
+    def update_lot(
+        self,
+        user_id,
+        lot_id: int,
+        symbol: str,
+        buy_date: date,
+        buy_price: float,
+        quantity: int,
+    ):
+        with self._transaction(user_id, symbol) as cur:
+            cur.execute(
+                "update stocks set buy_date = ?, buy_price = ?, quantity = ? "
+                "where id = ? and user_id = ?;",
+                # Ids read back through pandas are numpy ints, which the
+                # database drivers cannot bind.
+                (buy_date, buy_price, quantity, int(lot_id), user_id),
+            )
+
+    def delete_lot(self, user_id, lot_id: int, symbol: str):
+        with self._transaction(user_id, symbol) as cur:
+            cur.execute(
+                "delete from stocks where id = ? and user_id = ?;",
+                (int(lot_id), user_id),
+            )
+
+    def add_sell(
+        self,
+        user_id,
+        symbol: str,
+        sell_date: date,
+        sell_price: float,
+        quantity: int,
+    ):
+        with self._transaction(user_id, symbol) as cur:
+            cur.execute(
+                "insert into stock_sells "
+                "(user_id, symbol, sell_date, sell_price, quantity) "
+                "values (?, ?, ?, ?, ?);",
+                (user_id, symbol, sell_date, sell_price, quantity),
+            )
+
+    def active_alerts(self, user_id, symbol: str) -> list[AlertRow]:
+        rows = self._rows(
+            "select id, kind, threshold from stock_alerts "
+            "where user_id = ? and symbol = ? and active = 1;",
+            (user_id, symbol),
+        )
+        return [AlertRow(*row) for row in rows]
+
+    def add_alert(self, user_id, symbol: str, kind: str, threshold: float, ts: float):
+        with self._transaction() as cur:
+            cur.execute(
+                "insert into stock_alerts "
+                "(user_id, symbol, kind, threshold, active, created_at) "
+                "values (?, ?, ?, ?, 1, ?);",
+                (user_id, symbol, kind, threshold, ts),
+            )
+
+    def delete_alert(self, user_id, alert_id: int):
+        with self._transaction() as cur:
+            cur.execute(
+                "delete from stock_alerts where id = ? and user_id = ?;",
+                (alert_id, user_id),
+            )
+
+    def undelivered_alerts(self, user_id) -> list[tuple]:
+        # (alert_id, message) pairs fired by any worker and not yet shown.
+        return self._rows(
+            "select alert_id, message from alert_outbox "
+            "where user_id = ? and delivered = 0 order by fired_at;",
+            (user_id,),
+        )
+
+    def mark_alerts_delivered(self, user_id, alert_ids: list[int]):
+        with self._transaction() as cur:
+            cur.executemany(
+                "update alert_outbox set delivered = 1 "
+                "where user_id = ? and alert_id = ?;",
+                [(user_id, int(alert_id)) for alert_id in alert_ids],
+            )
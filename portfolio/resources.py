@@ -0,0 +1,207 @@
+import logging
+import time
+from functools import partial
+
+import streamlit as st
+
+from portfolio.alerts import AlertEngine
+from portfolio.cache import SharedCache, cache_backend
+from portfolio.db import ConnectionPool, duckdb_connect, mssql_connect, sqlite_connect
+from portfolio.fetch import YAHOO_HOST, Fetcher
+from portfolio.history import HistoryStore, yahoo_history
+from portfolio.index_strip import DEFAULT_INDICES, IndexStrip
+from portfolio.metadata import MetadataStore, yahoo_metadata
+from portfolio.migrations import migrate
+from portfolio.perf import timed
+from portfolio.poller import MarketDataPoller
+from portfolio.quote_store import QuoteStore
+from portfolio.quotes import (
+    QuoteEngine,
+    YahooChartProvider,
+    YahooQuoteProvider,
+    YahooSparkProvider,
+)
+from portfolio.repository import Repository
+from portfolio.settings import section
+from portfolio.symbol_master import SymbolMaster
+
+logger = logging.getLogger(__name__)
+
+
+@timed("init_connection")
+@st.cache_resource(show_spinner="Initialising...Please wait!!!")
+def init_connection():
+    database = section("database")
+    if database.get("backend") == "sqlite":
+        connect = partial(
+            sqlite_connect, database.get("sqlite_path", "data/portfolio.db")
+        )
+    elif database.get("backend") == "duckdb":
+        connect = partial(
+            duckdb_connect, database.get("duckdb_path", "data/portfolio.duckdb")
+        )
+    else:
+        connect = partial(
+            mssql_connect,
+            st.secrets["DB_SERVER"],
+            st.secrets["DB"],
+            st.secrets["DB_USER"],
+            st.secrets["DB_PASSWORD"],
+            timeout=database.get("connect_timeout", 60),
+        )
+    return ConnectionPool(
+        connect,
+        size=database.get("pool_size", 5),
+        timeout=database.get("pool_timeout", 30),
+        ping_interval=database.get("ping_interval", 30),
+    )
+
+
+@st.cache_resource
+def init_repository():
+    database = section("database")
+    pool = init_connection()
+    if database.get("migrate", True):
+        with pool.connection() as conn:
+            migrate(conn, database.get("backend", "mssql"))
+    return Repository(pool)
+
+
+@st.cache_resource
+def init_cache():
+    cache = section("cache")
+    return SharedCache(cache_backend(cache), lease_ttl=cache.get("lease_ttl", 10))
+
+
+@st.cache_resource
+def init_fetcher():
+    fetch = section("fetch")
+    return Fetcher(
+        max_workers=fetch.get("max_workers", 8),
+        rate=fetch.get("rate", 5),
+        burst=fetch.get("burst", 10),
+        retries=fetch.get("retries", 3),
+        failure_threshold=fetch.get("failure_threshold", 5),
+        reset_after=fetch.get("reset_after", 30),
+    )
+
+
+@st.cache_resource
+def init_quote_store():
+    return QuoteStore(section("market").get("snapshot_path", "data/quotes.db"))
+
+
+@st.cache_resource
+def init_quote_engine():
+    fetch = section("fetch")
+    base_url = fetch.get("base_url", f"https://{YAHOO_HOST}")
+    if fetch.get("provider") == "download":
+        provider = YahooQuoteProvider(timeout=fetch.get("timeout", 10))
+    elif fetch.get("provider") == "chart":
+        provider = YahooChartProvider(base_url, timeout=fetch.get("timeout", 10))
+    else:
+        provider = YahooSparkProvider(base_url, timeout=fetch.get("timeout", 10))
+    engine = QuoteEngine(
+        provider,
+        fetcher=init_fetcher(),
+        store=init_quote_store(),
+        cache=init_cache(),
+        # Just under the poll interval, so each poll still sees fresh prices.
+        cache_ttl=0.9 * section("market").get("poll_interval", 60),
+    )
+    engine.last_known.update(init_quote_store().load().quotes)
+    return engine
+
+
+@st.cache_resource
+def init_poller():
+    market = section("market")
+    return MarketDataPoller(
+        init_quote_engine(),
+        interval=market.get("poll_interval", 60),
+        session_ttl=market.get("session_ttl", 900),
+        initial=init_quote_store().load(),
+    ).start()
+
+
+def market_indices():
+    return section("market").get("indices", DEFAULT_INDICES)
+
+
+@st.cache_resource
+def init_index_strip():
+    engine = init_quote_engine()
+    symbols = [index["symbol"] for index in market_indices()]
+    saved = init_quote_store().load().quotes
+    ttl = section("market").get("index_ttl", 30)
+    # The index: entry's ttl alone decides how stale the strip gets, so its
+    # loader does not read the longer-lived quote: entries.
+    strip = IndexStrip(
+        lambda symbol: init_cache().get_or_load(
+            f"index:{symbol}",
+            lambda: engine.fetch([symbol], cached=False).get(symbol),
+            ttl=ttl,
+        ),
+        symbols,
+        ttl=ttl,
+        initial={symbol: saved[symbol] for symbol in symbols if symbol in saved},
+    )
+    strip.revalidate()
+    return strip
+
+
+@st.cache_resource
+def init_alert_engine():
+    return AlertEngine(init_repository().pool).load().attach(init_poller())
+
+
+@st.cache_resource
+def init_history_store():
+    return HistoryStore(
+        section("history").get("path", "data/history"),
+        download=partial(init_fetcher().call, YAHOO_HOST, yahoo_history),
+        refresh_after=section("history").get("refresh_after", 3600),
+    )
+
+
+@st.cache_resource
+def init_metadata_store():
+    metadata = section("metadata")
+    return MetadataStore(
+        metadata.get("path", "data/metadata.db"),
+        fetch_one=partial(init_fetcher().call, YAHOO_HOST, yahoo_metadata),
+        ttl=metadata.get("ttl_days", 7) * 24 * 3600,
+    )
+
+
+@st.cache_resource
+def init_symbol_master():
+    return SymbolMaster.from_file(
+        section("search").get("symbol_master", "data/symbols.csv")
+    )
+
+
+def warm_up() -> dict[str, float]:
+    # Builds the process-wide resources before the server takes its first
+    # session (see serve.py), so no page view pays for them. A step that fails
+    # is logged and left to be built on first use, as without a warm-up.
+    startup = section("startup")
+    steps = {
+        "database": lambda: init_repository().pool.prefill(
+            startup.get("prefill_connections", 2)
+        ),
+        "symbol_master": init_symbol_master,
+        "index_quotes": lambda: init_index_strip().wait(
+            startup.get("index_timeout", 15)
+        ),
+        "poller": init_poller,
+    }
+    timings = {}
+    for name, step in steps.items():
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.exception("Warm-up step %s failed", name)
+        timings[name] = time.perf_counter() - started
+    return timings
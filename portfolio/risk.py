@@ -0,0 +1,180 @@
+import warnings
+from datetime import date, timedelta
+from statistics import NormalDist
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+RISK_COLUMNS = [
+    "weight",
+    "volatility",
+    "beta",
+    "max_drawdown",
+    "var_historical",
+    "var_parametric",
+]
+
+
+class RiskReport(NamedTuple):
+    holdings: pd.DataFrame
+    portfolio: dict
+    correlation: pd.DataFrame
+
+
+def daily_returns(closes: pd.DataFrame) -> pd.DataFrame:
+    # Simple returns on the union of trading days. A close is carried over
+    # gaps inside a symbol's history, never before its first or after its
+    # last close, so those days stay NaN.
+    closes = closes.sort_index()
+    return closes.ffill().where(closes.bfill().notna()).pct_change(fill_method=None)
+
+
+def _masked(returns: np.ndarray):
+    mask = ~np.isnan(returns)
+    return np.where(mask, returns, 0.0), mask.astype("float64")
+
+
+def volatility(returns: np.ndarray) -> np.ndarray:
+    # A symbol without history yet is an all-NaN column; its stats are NaN.
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanstd(returns, axis=0, ddof=1) * np.sqrt(TRADING_DAYS)
+
+
+def beta(returns: np.ndarray, benchmark: np.ndarray) -> np.ndarray:
+    # Per column over the days both the column and the benchmark traded.
+    both = ~np.isnan(returns) & ~np.isnan(benchmark)[:, None]
+    x = np.where(both, returns, 0.0)
+    b = np.where(both, benchmark[:, None], 0.0)
+    n = both.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_x, mean_b = x.sum(axis=0) / n, b.sum(axis=0) / n
+        covariance = (x * b).sum(axis=0) / n - mean_x * mean_b
+        variance = (b * b).sum(axis=0) / n - mean_b**2
+        return np.where(n > 2, covariance / variance, np.nan)
+
+
+def max_drawdown(returns: np.ndarray) -> np.ndarray:
+    wealth = np.cumprod(1 + np.nan_to_num(returns), axis=0)
+    peak = np.maximum.accumulate(wealth, axis=0)
+    return (wealth / peak - 1).min(axis=0, initial=0.0)
+
+
+def correlation(returns: np.ndarray) -> np.ndarray:
+    # Pairwise-complete correlation from four matrix products: counts, sums,
+    # sums of squares and cross products over the days both symbols traded.
+    x, m = _masked(returns)
+    n = m.T @ m
+    sums = x.T @ m
+    squares = (x * x).T @ m
+    cross = x.T @ x
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_i, mean_j = sums / n, sums.T / n
+        covariance = cross / n - mean_i * mean_j
+        var_i = squares / n - mean_i**2
+        var_j = squares.T / n - mean_j**2
+        corr = covariance / np.sqrt(var_i * var_j)
+    corr[n < 3] = np.nan
+    np.fill_diagonal(corr, 1.0)
+    return np.clip(corr, -1.0, 1.0)
+
+
+def value_at_risk(returns: np.ndarray, confidence: float):
+    # One-day loss (as a positive fraction) not exceeded with `confidence`.
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        historical = -np.nanquantile(returns, 1 - confidence, axis=0)
+        z = NormalDist().inv_cdf(1 - confidence)
+        parametric = -(
+            np.nanmean(returns, axis=0) + z * np.nanstd(returns, axis=0, ddof=1)
+        )
+    return historical, parametric
+
+
+def risk_report(
+    closes: pd.DataFrame,
+    benchmark: pd.Series,
+    current_value: pd.Series,
+    confidence: float = 0.95,
+) -> RiskReport:
+    # current_value (per symbol) weights the holdings as they are today; the
+    # portfolio series is today's weights applied to each past day's returns.
+    returns = daily_returns(closes).iloc[1:]
+    symbols = list(returns.columns)
+    value = current_value.reindex(symbols).fillna(0).to_numpy(dtype="float64")
+    total = value.sum()
+    weights = value / total if total else np.zeros_like(value)
+    r = returns.to_numpy(dtype="float64")
+    b = daily_returns(benchmark.to_frame()).iloc[:, 0].reindex(returns.index)
+    b = b.to_numpy(dtype="float64")
+    portfolio = np.nan_to_num(r) @ weights
+
+    var_historical, var_parametric = value_at_risk(r, confidence)
+    holdings = pd.DataFrame(
+        {
+            "weight": weights * 100,
+            "volatility": volatility(r) * 100,
+            "beta": beta(r, b),
+            "max_drawdown": max_drawdown(r) * 100,
+            "var_historical": var_historical * value,
+            "var_parametric": var_parametric * value,
+        },
+        index=pd.Index(symbols, name="symbol"),
+    )
+    p = portfolio[:, None]
+    p_historical, p_parametric = value_at_risk(p, confidence)
+    summary = {
+        "value": total,
+        "volatility": float(volatility(p)[0]) * 100 if len(p) > 1 else np.nan,
+        "beta": float(beta(p, b)[0]) if len(p) else np.nan,
+        "max_drawdown": float(max_drawdown(p)[0]) * 100 if len(p) else 0.0,
+        "var_historical": float(p_historical[0]) * total if len(p) else np.nan,
+        "var_parametric": float(p_parametric[0]) * total if len(p) else np.nan,
+        "days": len(p),
+    }
+    return RiskReport(
+        holdings,
+        summary,
+        pd.DataFrame(correlation(r), index=symbols, columns=symbols),
+    )
+
+
+class RiskCache:
+    # Reports are keyed by (holdings version, as-of date). The closes behind
+    # them only depend on the symbols, so a revaluation (new version, same
+    # symbols) reuses them and only redoes the weighted part.
+    def __init__(self):
+        self.key = None
+        self.report = None
+        self._closes_key = None
+        self._closes = None
+
+    def report_for(
+        self,
+        version,
+        current_value: pd.Series,
+        store,
+        benchmark_symbol: str,
+        lookback_years: int = 5,
+        confidence: float = 0.95,
+        as_of: date = None,
+    ) -> RiskReport:
+        as_of = as_of or date.today()
+        key = (version, as_of, benchmark_symbol, lookback_years, confidence)
+        if key == self.key:
+            return self.report
+        symbols = tuple(sorted(current_value.index))
+        closes_key = (symbols, as_of, benchmark_symbol, lookback_years)
+        if closes_key != self._closes_key:
+            start = as_of - timedelta(days=int(365.25 * lookback_years))
+            self._closes = (
+                store.closes(symbols, start=start, end=as_of),
+                store.read(benchmark_symbol, start=start, end=as_of)["close"],
+            )
+            self._closes_key = closes_key
+        closes, benchmark = self._closes
+        self.report = risk_report(closes, benchmark, current_value, confidence)
+        self.key = key
+        return self.report
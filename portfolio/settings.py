@@ -0,0 +1,26 @@
+import tomllib
+from functools import cache
+from pathlib import Path
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / "config.toml"
+
+# Values set in-process (benchmarks, tests) on top of config.toml.
+_overrides: dict[str, dict] = {}
+
+
+@cache
+def load_settings(path: Path = CONFIG_PATH) -> dict:
+    try:
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def override(name: str, **values):
+    _overrides.setdefault(name, {}).update(values)
+
+
+def section(name: str) -> dict:
+    # A copy, so a caller cannot change the cached settings for everyone.
+    return {**load_settings().get(name, {}), **_overrides.get(name, {})}
@@ -0,0 +1,93 @@
+import pandas as pd
+
+from portfolio.lots import HOLDING_COLUMNS, LOT_COLUMNS, SELL_COLUMNS, aggregate
+
+# stock_summary (see portfolio/migrations.py) has one row per (user, symbol):
+# the same open quantity, FIFO average cost, first open buy date, lot count and
+# realized P&L the holdings table shows, kept in step with stocks/stock_sells
+# inside the transaction that changes them.
+
+
+def _frame(cur, sql: str, params: tuple, columns: list[str]) -> pd.DataFrame:
+    cur.execute(sql, params)
+    return pd.DataFrame.from_records(
+        [tuple(row) for row in cur.fetchall()], columns=columns
+    )
+
+
+def _in(symbols: list[str]) -> str:
+    return ", ".join("?" for _ in symbols)
+
+
+def refresh_summary(conn, user_id, symbols: list[str] = None):
+    # Rebuilds the summary rows of `symbols` (all of the user's when None)
+    # from their lots and sells. Runs on the caller's connection and does not
+    # commit, so it lands in the same transaction as the change itself.
+    cur = conn.cursor()
+    where, params = "user_id = ?", (user_id,)
+    if symbols is not None:
+        symbols = list(dict.fromkeys(symbols))
+        if not symbols:
+            return
+        where += f" and symbol in ({_in(symbols)})"
+        params += tuple(symbols)
+    lots = _frame(
+        cur,
+        f"select {', '.join(LOT_COLUMNS)} from stocks where {where};",
+        params,
+        LOT_COLUMNS,
+    )
+    sells = _frame(
+        cur,
+        f"select {', '.join(SELL_COLUMNS)} from stock_sells where {where};",
+        params,
+        SELL_COLUMNS,
+    )
+    if len(lots):
+        lots["buy_date"] = pd.to_datetime(lots["buy_date"], yearfirst=True).dt.date
+    holdings = aggregate(lots, sells)
+    cur.execute(f"delete from stock_summary where {where};", params)
+    if len(holdings):
+        cur.executemany(
+            f"insert into stock_summary (user_id, {', '.join(HOLDING_COLUMNS)}) "
+            f"values (?, {_in(HOLDING_COLUMNS)});",
+            [
+                (
+                    user_id,
+                    row.symbol,
+                    row.stock_name,
+                    row.buy_date,
+                    float(row.buy_price),
+                    float(row.quantity),
+                    int(row.lots),
+                    float(row.realized),
+                )
+                for row in holdings.itertuples(index=False)
+            ],
+        )
+
+
+def fetch_summary(conn, user_id) -> pd.DataFrame:
+    # A summary whose lot count disagrees with the stocks table (first use, or
+    # rows written by something that does not maintain it) is rebuilt first.
+    cur = conn.cursor()
+    cur.execute(
+        "select (select count(*) from stocks where user_id = ?), "
+        "(select coalesce(sum(lots), 0) from stock_summary where user_id = ?);",
+        (user_id, user_id),
+    )
+    lots, summarized = cur.fetchone()
+    if int(lots or 0) != int(summarized or 0):
+        refresh_summary(conn, user_id)
+        conn.commit()
+    summary = _frame(
+        cur,
+        f"select {', '.join(HOLDING_COLUMNS)} from stock_summary where user_id = ?;",
+        (user_id,),
+        HOLDING_COLUMNS,
+    )
+    if len(summary):
+        summary["buy_date"] = pd.to_datetime(
+            summary["buy_date"], yearfirst=True
+        ).dt.date
+    return summary
@@ -0,0 +1,105 @@
+import re
+from collections import defaultdict
+from pathlib import Path
+
+import pandas as pd
+
+MASTER_COLUMNS = ["symbol", "short_name", "exchange"]
+PREFIX_LENGTH = 6
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    return " ".join(_TOKEN.findall(text.lower()))
+
+
+def _tokens(text: str) -> list[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def load_master(path) -> pd.DataFrame:
+    path = Path(path)
+    if path.suffix == ".parquet":
+        df = pd.read_parquet(path, columns=MASTER_COLUMNS)
+    else:
+        df = pd.read_csv(path, usecols=MASTER_COLUMNS, dtype=str)
+    return df.dropna(subset=["symbol"]).fillna("").drop_duplicates("symbol")
+
+
+class SymbolMaster:
+    # Postings are keyed by the first PREFIX_LENGTH characters of every token of
+    # the ticker (without its exchange suffix) and of the short name, so any
+    # query prefix resolves with one dict lookup per query token.
+    def __init__(self, df: pd.DataFrame):
+        self.symbols = df["symbol"].tolist()
+        self.names = df["short_name"].tolist()
+        self.exchanges = df["exchange"].tolist()
+        self._bases = [s.split(".")[0].lower() for s in self.symbols]
+        self._name_tokens = [_tokens(n) for n in self.names]
+        self._tokens = [
+            set(_tokens(base)) | set(tokens)
+            for base, tokens in zip(self._bases, self._name_tokens)
+        ]
+        self._postings = defaultdict(set)
+        for i, tokens in enumerate(self._tokens):
+            for token in tokens:
+                for n in range(1, min(len(token), PREFIX_LENGTH) + 1):
+                    self._postings[token[:n]].add(i)
+
+    @classmethod
+    def from_file(cls, path):
+        return cls(load_master(path))
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def _rank(self, i: int, query: str, terms: list[str]):
+        base = self._bases[i]
+        name = " ".join(self._name_tokens[i])
+        if base == query.replace(" ", ""):
+            score = 0
+        elif base.startswith(terms[0]):
+            score = 1
+        elif name.startswith(query):
+            score = 2
+        else:
+            score = 3
+        return score, self.exchanges[i] != "NSI", len(self.names[i]), self.symbols[i]
+
+    def search(self, query: str, limit: int = 10) -> list[str]:
+        query = normalize(query)
+        terms = query.split()
+        if not terms:
+            return []
+        candidates = None
+        for term in terms:
+            posting = self._postings.get(term[:PREFIX_LENGTH], set())
+            candidates = posting if candidates is None else candidates & posting
+            if not candidates:
+                return []
+        matches = [
+            i
+            for i in candidates
+            if all(
+                any(token.startswith(term) for token in self._tokens[i])
+                for term in terms
+            )
+        ]
+        matches.sort(key=lambda i: self._rank(i, query, terms))
+        return [
+            f"{self.names[i]}:::{self.exchanges[i]}:::{self.symbols[i]}"
+            for i in matches[:limit]
+        ]
+
+
+def merge_results(local: list[str], remote, limit: int = 10) -> list[str]:
+    # Local matches first, then remote ones for symbols not already listed.
+    seen = {match.rsplit(":::", 1)[-1] for match in local}
+    merged = list(local)
+    for match in remote:
+        symbol = match.rsplit(":::", 1)[-1]
+        if symbol not in seen:
+            seen.add(symbol)
+            merged.append(match)
+    return merged[:limit]
@@ -0,0 +1,79 @@
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+PROFIT_COLUMNS = [
+    "profit",
+    "profit_percentage",
+    "profit_today",
+    "profit_percentage_today",
+    "realized",
+]
+SEARCH_COLUMNS = ["symbol", "stock_name"]
+
+
+def profit_colors(frame: pd.DataFrame) -> pd.DataFrame:
+    # Same rule as the old per-cell Styler callback (NaN counts as a loss), but
+    # one comparison per column.
+    columns = [column for column in PROFIT_COLUMNS if column in frame.columns]
+    return pd.DataFrame(
+        {
+            column: np.where(
+                frame[column].to_numpy(dtype="float64", na_value=np.nan) >= 0,
+                "color: green",
+                "color: red",
+            )
+            for column in columns
+        },
+        index=frame.index,
+    )
+
+
+class TableView(NamedTuple):
+    styled: object
+    positions: np.ndarray
+    rows: int
+    pages: int
+
+
+class HoldingsTable:
+    # Built once per valuation. view() filters, sorts and pages on the server
+    # and styles only the visible slice with the precomputed colors; positions
+    # maps a row of the slice back to its row in the full frame.
+    def __init__(self, frame: pd.DataFrame):
+        self.frame = frame
+        self.colors = profit_colors(frame)
+        self._search = (
+            frame[SEARCH_COLUMNS].astype(str).agg(" ".join, axis=1).str.casefold()
+            if len(frame)
+            else pd.Series([], dtype=str)
+        )
+
+    def view(
+        self,
+        query: str = "",
+        sort_by: str = None,
+        ascending: bool = True,
+        page: int = 0,
+        page_size: int = None,
+    ) -> TableView:
+        positions = np.arange(len(self.frame))
+        if query:
+            matches = self._search.str.contains(query.casefold(), regex=False)
+            positions = positions[matches.to_numpy()]
+        if sort_by:
+            keys = pd.Series(self.frame[sort_by].to_numpy()[positions], index=positions)
+            positions = keys.sort_values(
+                ascending=ascending, kind="stable", na_position="last"
+            ).index.to_numpy()
+        rows = len(positions)
+        pages = max(1, -(-rows // page_size)) if page_size else 1
+        if page_size:
+            page = min(max(page, 0), pages - 1)
+            positions = positions[page * page_size : (page + 1) * page_size]
+        colors = self.colors.iloc[positions]
+        styled = self.frame.iloc[positions].style.apply(
+            lambda _: colors, axis=None, subset=list(colors.columns)
+        )
+        return TableView(styled, positions, rows, pages)
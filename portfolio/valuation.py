@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+VALUE_COLUMNS = [
+    "price",
+    "investment",
+    "current_value",
+    "profit",
+    "profit_percentage",
+    "profit_today",
+    "profit_percentage_today",
+    "link",
+]
+
+TOTAL_KEYS = [
+    "investment",
+    "current_value",
+    "profit",
+    "profit_percentage",
+    "profit_today",
+    "profit_percentage_today",
+]
+
+
+def _ratio(numerator, denominator):
+    numerator = np.asarray(numerator, dtype="float64")
+    denominator = np.asarray(denominator, dtype="float64")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator != 0, numerator * 100 / denominator, np.nan)
+
+
+def empty_totals() -> dict[str, float]:
+    return {key: float(0) for key in TOTAL_KEYS}
+
+
+def value_holdings(df: pd.DataFrame, quotes: pd.DataFrame):
+    df = df.drop(columns=VALUE_COLUMNS, errors="ignore")
+    joined = quotes.reindex(df["symbol"])
+    # Missing, zero or negative prices are treated as "not priced": the row keeps
+    # NaN values and is left out of every total so the header stays consistent.
+    price = joined["price"].to_numpy(dtype="float64", na_value=np.nan)
+    prev_close = joined["prev_close"].to_numpy(dtype="float64", na_value=np.nan)
+    price = np.where(price > 0, price, np.nan)
+    prev_close = np.where(prev_close > 0, prev_close, np.nan)
+
+    buy_price = df["buy_price"].to_numpy(dtype="float64", na_value=np.nan)
+    quantity = df["quantity"].to_numpy(dtype="float64", na_value=np.nan)
+
+    investment = buy_price * quantity
+    current_value = price * quantity
+    previous_value = prev_close * quantity
+    profit = current_value - investment
+    profit_today = current_value - previous_value
+
+    df = df.assign(
+        price=price,
+        investment=investment,
+        current_value=current_value,
+        profit=profit,
+        profit_percentage=_ratio(profit, investment),
+        profit_today=profit_today,
+        profit_percentage_today=_ratio(profit_today, previous_value),
+        link="https://finance.yahoo.com/chart/" + df["symbol"].astype(str) + "/",
+    )
+
+    return df, summarize(df)
+
+
+def summarize(df: pd.DataFrame) -> dict[str, float]:
+    if df.empty:
+        return empty_totals()
+    current_value = df["current_value"].to_numpy(dtype="float64", na_value=np.nan)
+    profit_today = df["profit_today"].to_numpy(dtype="float64", na_value=np.nan)
+    priced = ~np.isnan(current_value)
+    priced_today = ~np.isnan(profit_today)
+    investment = df["investment"].to_numpy(dtype="float64", na_value=np.nan)
+    total_investment = np.nansum(investment[priced])
+    profit = df["profit"].to_numpy(dtype="float64", na_value=np.nan)
+    total_profit = np.nansum(profit[priced])
+    total_profit_today = np.nansum(profit_today[priced_today])
+    previous_value = np.nansum(current_value[priced_today] - profit_today[priced_today])
+    return {
+        "investment": float(total_investment),
+        "current_value": float(np.nansum(current_value[priced])),
+        "profit": float(total_profit),
+        "profit_percentage": float(
+            np.nan_to_num(_ratio(total_profit, total_investment))
+        ),
+        "profit_today": float(total_profit_today),
+        "profit_percentage_today": float(
+            np.nan_to_num(_ratio(total_profit_today, previous_value))
+        ),
+    }
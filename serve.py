@@ -0,0 +1,40 @@
+"""Start the app with its shared resources already built.
+
+`streamlit run app.py` builds the connection pool, symbol master, index quotes
+and quote poller inside the first session's rerun. This builds them first and
+then starts the same server in this process, so they are ready before it
+accepts a connection. Arguments are passed on to `streamlit run`:
+
+    python serve.py --server.port 8501
+"""
+
+import logging
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    sys.path.insert(0, str(ROOT))
+    from streamlit.runtime.scriptrunner_utils import script_run_context
+
+    from portfolio.resources import warm_up
+
+    # The resources are built outside any session, which Streamlit warns about.
+    logging.getLogger(script_run_context.__name__).setLevel(logging.ERROR)
+
+    timings = warm_up()
+    logging.info(
+        "Warm-up done in %.2fs (%s)",
+        sum(timings.values()),
+        ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items()),
+    )
+    from streamlit.web import cli
+
+    cli.main(["run", str(ROOT / "app.py"), *sys.argv[1:]], prog_name="streamlit")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+from functools import partial
+
+import pytest
+
+from portfolio.db import ConnectionPool, sqlite_connect
+from portfolio.migrations import migrate
+from portfolio.repository import Repository
+
+
+@pytest.fixture
+def sqlite_path(tmp_path):
+    return str(tmp_path / "portfolio.db")
+
+
+@pytest.fixture
+def pool(sqlite_path):
+    pool = ConnectionPool(partial(sqlite_connect, sqlite_path), size=2)
+    with pool.connection() as conn:
+        migrate(conn, "sqlite")
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def repository(pool):
+    return Repository(pool)
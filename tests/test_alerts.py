@@ -0,0 +1,108 @@
+from functools import partial
+
+import pytest
+
+from portfolio.alerts import Alert, AlertEngine, ThresholdIndex
+from portfolio.db import ConnectionPool, duckdb_connect
+from portfolio.migrations import migrate
+from portfolio.quotes import Quote
+from portfolio.repository import Repository
+
+QUOTES = {"AAA.NS": Quote(110.0, 100.0, 0.0)}
+
+
+def add_alerts(repository):
+    repository.add_alert(1, "AAA.NS", "price_above", 105.0, 0.0)
+    repository.add_alert(1, "AAA.NS", "price_above", 200.0, 0.0)
+
+
+def outbox(pool):
+    with pool.connection() as conn:
+        cur = conn.cursor()
+        cur.execute("select alert_id, delivered from alert_outbox order by alert_id;")
+        return [tuple(row) for row in cur.fetchall()]
+
+
+def outbox_message(pool, alert_id):
+    with pool.connection() as conn:
+        cur = conn.cursor()
+        cur.execute("select message from alert_outbox where alert_id = ?;", (alert_id,))
+        return cur.fetchone()[0]
+
+
+def test_index_fires_crossed_thresholds_with_their_levels():
+    index = ThresholdIndex()
+    index.add(Alert(1, 1, "AAA", "price_above", 10.0), 10.0)
+    index.add(Alert(2, 1, "AAA", "price_below", 5.0), 5.0)
+    index.add(Alert(3, 1, "AAA", "price_above", 20.0), 20.0)
+    assert [(a.id, level) for a, level in index.fire("AAA", "price", 15.0)] == [
+        (1, 10.0)
+    ]
+    assert len(index) == 2
+
+
+def test_each_crossing_fires_once_across_worker_processes(pool, repository):
+    add_alerts(repository)
+    workers = [AlertEngine(pool).load(), AlertEngine(pool).load()]
+    for engine in workers:
+        engine.on_snapshot(None, QUOTES)
+    assert outbox(pool) == [(1, 0)]
+    assert len(repository.undelivered_alerts(1)) == 1
+    assert repository.active_alerts(1, "AAA.NS")[0].id == 2
+
+
+def test_toasts_reach_a_session_on_another_worker(pool, repository):
+    # The user's session runs on the first worker; only the second one gets
+    # the quote that fires the alert.
+    add_alerts(repository)
+    session_worker, firing_worker = AlertEngine(pool).load(), AlertEngine(pool).load()
+    firing_worker.on_snapshot(None, QUOTES)
+    assert session_worker.index.alerts()
+    shown = repository.undelivered_alerts(1)
+    assert shown == [(1, outbox_message(pool, 1))]
+    repository.mark_alerts_delivered(1, [alert_id for alert_id, _ in shown])
+    assert repository.undelivered_alerts(1) == []
+
+
+def test_only_shown_alerts_are_marked_delivered(pool, repository):
+    add_alerts(repository)
+    AlertEngine(pool).load().on_snapshot(None, {"AAA.NS": Quote(300.0, 100.0, 0.0)})
+    repository.mark_alerts_delivered(1, [1])
+    assert outbox(pool) == [(1, 1), (2, 0)]
+    assert repository.undelivered_alerts(1) == [(2, outbox_message(pool, 2))]
+
+
+def test_reload_does_not_bring_back_an_alert_being_fired(pool, repository):
+    add_alerts(repository)
+    engine = AlertEngine(pool).load()
+    fired = engine.evaluate(QUOTES)
+    # A session reloads the user's alerts before the firing is recorded.
+    engine.load(1)
+    assert [a.id for a in engine.index.alerts()] == [2]
+    engine._deliver(fired)
+    assert repository.undelivered_alerts(1) == [(1, fired[0].message)]
+
+
+def test_alert_fires_again_when_it_could_not_be_recorded(pool, repository):
+    add_alerts(repository)
+    engine = AlertEngine(pool).load()
+    with pool.connection() as conn:
+        conn.cursor().execute("drop table alert_outbox;")
+        conn.commit()
+    engine.on_snapshot(None, QUOTES)
+    assert sorted(a.id for a in engine.index.alerts()) == [1, 2]
+    assert repository.active_alerts(1, "AAA.NS")[0].id == 1
+
+
+def test_firing_is_claimed_once_on_duckdb(tmp_path):
+    pytest.importorskip("duckdb")
+    pool = ConnectionPool(partial(duckdb_connect, str(tmp_path / "p.duckdb")), size=1)
+    with pool.connection() as conn:
+        migrate(conn, "duckdb")
+    repository = Repository(pool)
+    add_alerts(repository)
+    workers = [AlertEngine(pool).load(), AlertEngine(pool).load()]
+    for engine in workers:
+        engine.on_snapshot(None, QUOTES)
+    assert outbox(pool) == [(1, 0)]
+    pool.close()
@@ -0,0 +1,78 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+import streamlit as st
+from streamlit.runtime.forward_msg_queue import ForwardMsgQueue
+
+from benchmarks.bench_rerun import new_session
+from benchmarks.fakes import install_fake_yfinance, seed_database
+from portfolio import market, settings
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "app.db")
+
+
+@pytest.fixture
+def app(db, tmp_path, monkeypatch):
+    seed_database(db, {1: 5})
+    fake = install_fake_yfinance()
+    monkeypatch.setitem(sys.modules, "yfinance", fake)
+    monkeypatch.setitem(sys.modules, "yfinance.exceptions", fake.exceptions)
+    monkeypatch.setattr(settings, "_overrides", {})
+    settings.override("fetch", provider="download")
+    settings.override("database", backend="sqlite", sqlite_path=db)
+    settings.override("market", snapshot_path=str(tmp_path / "quotes.db"))
+    settings.override("history", path=str(tmp_path / "history"))
+    settings.override("metadata", path=str(tmp_path / "metadata.db"))
+    settings.override("cache", path=str(tmp_path / "cache.db"))
+    monkeypatch.chdir(ROOT)
+    st.cache_resource.clear()
+    st.cache_data.clear()
+    yield new_session(1)
+    st.cache_resource.clear()
+    st.cache_data.clear()
+
+
+def test_holdings_refresh_in_place_while_the_market_is_open(app, monkeypatch):
+    monkeypatch.setattr(market, "is_market_open", lambda now=None: True)
+    # Fragments asked to rerun on a timer, and the fragment each kind of
+    # element was drawn in.
+    auto_rerun, drawn_in = set(), {}
+    enqueue = ForwardMsgQueue.enqueue
+
+    def capture(self, msg):
+        if msg.HasField("auto_rerun"):
+            auto_rerun.add(msg.auto_rerun.fragment_id)
+        elif msg.HasField("delta") and msg.delta.HasField("new_element"):
+            kind = msg.delta.new_element.WhichOneof("type")
+            drawn_in.setdefault(kind, set()).add(msg.delta.fragment_id)
+        return enqueue(self, msg)
+
+    monkeypatch.setattr(ForwardMsgQueue, "enqueue", capture)
+    app.run()
+    assert not app.exception
+    assert len(app.dataframe) == 1
+    # The holdings table and its header metrics are redrawn by the ticks.
+    assert auto_rerun
+    assert drawn_in["dataframe"] <= auto_rerun
+    assert drawn_in["metric"] <= auto_rerun
+
+
+def test_toasts_alerts_another_worker_fired(app, db, monkeypatch):
+    monkeypatch.setattr(market, "is_market_open", lambda now=None: False)
+    with sqlite3.connect(db) as conn:
+        conn.execute(
+            "insert into alert_outbox (user_id, alert_id, symbol, message, fired_at) "
+            "values (1, 7, 'SYM00001.NS', 'SYM00001.NS: fired elsewhere', 1.0);"
+        )
+    app.run()
+    assert not app.exception
+    assert [toast.value for toast in app.toast] == ["SYM00001.NS: fired elsewhere"]
+    with sqlite3.connect(db) as conn:
+        assert conn.execute("select delivered from alert_outbox;").fetchall() == [(1,)]
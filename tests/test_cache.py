@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pytest
+
+from benchmarks.fakes import FakeRedis
+from portfolio.cache import MemoryBackend, RedisBackend, SharedCache, SQLiteBackend
+from portfolio.quotes import QuoteEngine, StaticQuoteProvider
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def backend(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteBackend(str(tmp_path / "cache.db"))
+    if request.param == "redis":
+        return RedisBackend(FakeRedis())
+    return MemoryBackend()
+
+
+def test_values_expire(backend):
+    cache = SharedCache(backend)
+    cache.set("a", {"x": 1}, ttl=0.05)
+    assert cache.get("a") == {"x": 1}
+    time.sleep(0.1)
+    assert cache.get("a") is None
+
+
+def test_concurrent_misses_load_once(backend):
+    cache = SharedCache(backend)
+    loads = []
+
+    def loader():
+        loads.append(1)
+        time.sleep(0.1)
+        return 42
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_load("k", loader)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [42] * 5
+    assert len(loads) == 1
+
+
+def test_processes_share_loads_through_the_backend(backend):
+    first, second = SharedCache(backend), SharedCache(backend)
+    first.get_or_load("k", lambda: "loaded")
+    assert second.get_or_load("k", lambda: "again") == "loaded"
+
+
+def test_none_is_not_cached():
+    cache = SharedCache(MemoryBackend())
+    assert cache.get_or_load("k", lambda: None) is None
+    assert cache.get_or_load("k", lambda: 1) == 1
+
+
+def test_uncached_fetch_skips_shared_quotes_but_refreshes_them():
+    cache = SharedCache(MemoryBackend())
+    provider = StaticQuoteProvider({"^NSEI": (100.0, 99.0)})
+    engine = QuoteEngine(provider, cache=cache, cache_ttl=60)
+    engine.fetch(["^NSEI"])
+    engine.fetch(["^NSEI"])
+    assert provider.calls == 1
+    provider.quotes["^NSEI"] = (101.0, 99.0)
+    assert engine.fetch(["^NSEI"], cached=False)["^NSEI"].price == 101.0
+    assert provider.calls == 2
+    assert cache.get("quote:^NSEI").price == 101.0
@@ -0,0 +1,113 @@
+import time
+import urllib.error
+
+import pytest
+
+from benchmarks.fakes import FakeChartServer, fake_price
+from portfolio.fetch import CircuitOpen, Fetcher
+from portfolio.quotes import QuoteEngine, YahooChartProvider, YahooSparkProvider
+
+
+@pytest.fixture
+def server():
+    servers = []
+
+    def start(**kwargs):
+        servers.append(FakeChartServer(**kwargs).start())
+        return servers[-1]
+
+    yield start
+    for running in servers:
+        running.shutdown()
+        running.server_close()
+
+
+def fetch_one(fetcher: Fetcher, server: FakeChartServer, symbol: str = "AAA.NS"):
+    provider = YahooChartProvider(server.url, timeout=5)
+    return fetcher.call("yahoo", provider.fetch_one, symbol)
+
+
+def test_rate_limited_request_is_retried(server):
+    chart = server(failures=[429, 429])
+    fetcher = Fetcher(retries=3, backoff_base=0, burst=10)
+    quote = fetch_one(fetcher, chart)
+    assert quote.price == pytest.approx(fake_price("AAA.NS")[0])
+    assert chart.requests == 3
+    assert fetcher.breaker("yahoo").state == "closed"
+
+
+def test_retry_after_is_honoured(server):
+    chart = server(failures=[503], retry_after=1)
+    fetcher = Fetcher(retries=1, backoff_base=0, burst=10)
+    started = time.monotonic()
+    assert fetch_one(fetcher, chart) is not None
+    assert time.monotonic() - started >= 1
+    assert chart.requests == 2
+
+
+def test_retries_give_up_with_the_last_error(server):
+    chart = server(failures=[429] * 3, retry_after=0)
+    fetcher = Fetcher(retries=2, backoff_base=0, burst=10)
+    with pytest.raises(urllib.error.HTTPError) as error:
+        fetch_one(fetcher, chart)
+    assert error.value.code == 429
+    assert chart.requests == 3
+
+
+def test_breaker_stops_calling_a_failing_host_and_recovers(server):
+    chart = server(failures=[500, 500])
+    fetcher = Fetcher(retries=0, failure_threshold=2, reset_after=0.2, burst=10)
+    for _ in range(2):
+        with pytest.raises(urllib.error.HTTPError):
+            fetch_one(fetcher, chart)
+    with pytest.raises(CircuitOpen):
+        fetch_one(fetcher, chart)
+    assert chart.requests == 2
+
+    time.sleep(0.2)
+    assert fetch_one(fetcher, chart) is not None
+    assert fetcher.breaker("yahoo").state == "closed"
+
+
+def test_client_errors_do_not_open_the_breaker(server):
+    chart = server(failures=[404, 404])
+    fetcher = Fetcher(retries=3, failure_threshold=1, burst=10)
+    for _ in range(2):
+        with pytest.raises(urllib.error.HTTPError):
+            fetch_one(fetcher, chart)
+    assert chart.requests == 2
+    assert fetcher.breaker("yahoo").state == "closed"
+
+
+def test_engine_serves_last_known_quotes_while_the_circuit_is_open(server):
+    chart = server()
+    fetcher = Fetcher(retries=0, failure_threshold=1, reset_after=30, burst=10)
+    engine = QuoteEngine(
+        YahooChartProvider(chart.url, timeout=5), fetcher=fetcher, host="yahoo"
+    )
+    symbols = ["AAA.NS", "BBB.NS"]
+    first = engine.fetch(symbols)
+    assert set(first) == set(symbols)
+
+    chart.failures = [500] * 10
+    assert engine.fetch(symbols) == first
+    assert fetcher.breaker("yahoo").state == "open"
+    requests = chart.requests
+    assert engine.fetch(symbols) == first
+    assert chart.requests == requests
+
+
+def test_spark_prices_a_portfolio_in_batched_requests(server):
+    chart = server()
+    fetcher = Fetcher()
+    engine = QuoteEngine(YahooSparkProvider(chart.url, timeout=5), fetcher=fetcher)
+    symbols = [f"SYM{i:03d}.NS" for i in range(150)]
+    started = time.monotonic()
+    quotes = engine.fetch(symbols)
+    # Eight requests of up to 20 symbols, each charged one token: within the
+    # default burst, so no rate-limit wait at all.
+    assert time.monotonic() - started < 1
+    assert chart.requests == 8
+    assert set(quotes) == set(symbols)
+    price, prev_close = fake_price("SYM007.NS")
+    assert quotes["SYM007.NS"][:2] == pytest.approx((price, prev_close))
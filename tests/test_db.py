@@ -0,0 +1,158 @@
+import sqlite3
+import threading
+import time
+from functools import partial
+
+import pytest
+
+from portfolio.db import ConnectionPool, PoolTimeout, sqlite_connect
+
+
+class Dropped(Exception):
+    pass
+
+
+def scalar(conn, sql: str):
+    cur = conn.cursor()
+    cur.execute(sql)
+    return cur.fetchall()[0][0]
+
+
+def test_connections_are_reused(sqlite_path):
+    pool = ConnectionPool(partial(sqlite_connect, sqlite_path), size=2)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second is first
+    stats = pool.stats()
+    assert stats["checkouts"] == 2
+    assert stats["open"] == 1
+    assert stats["in_use"] == 0
+
+
+def test_exhausted_pool_times_out(sqlite_path):
+    pool = ConnectionPool(partial(sqlite_connect, sqlite_path), size=1, timeout=0.1)
+    with pool.connection():
+        with pytest.raises(PoolTimeout):
+            with pool.connection():
+                pass
+    stats = pool.stats()
+    assert stats["exhausted"] == 1
+    assert stats["timeouts"] == 1
+
+
+def test_waiter_gets_the_connection_given_back(sqlite_path):
+    pool = ConnectionPool(partial(sqlite_connect, sqlite_path), size=1, timeout=5)
+    held = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with pool.connection():
+            held.set()
+            release.wait()
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    held.wait()
+    threading.Timer(0.05, release.set).start()
+    with pool.connection() as conn:
+        assert scalar(conn, "select 1") == 1
+    thread.join()
+    assert pool.stats()["open"] == 1
+
+
+def test_failed_work_is_rolled_back(sqlite_path):
+    pool = ConnectionPool(partial(sqlite_connect, sqlite_path), size=1)
+    with pool.connection() as conn:
+        conn.cursor().execute("create table t (x integer)")
+        conn.commit()
+    with pytest.raises(ZeroDivisionError):
+        with pool.connection() as conn:
+            conn.cursor().execute("insert into t values (1)")
+            1 / 0
+    with pool.connection() as conn:
+        assert scalar(conn, "select count(*) from t") == 0
+
+
+def test_dead_connections_are_replaced(sqlite_path):
+    opened = []
+
+    def connect():
+        opened.append(sqlite_connect(sqlite_path))
+        return opened[-1]
+
+    pool = ConnectionPool(connect, size=1, ping_interval=0)
+    with pool.connection():
+        pass
+    opened[0].close()
+    with pool.connection() as conn:
+        assert conn is opened[1]
+        assert scalar(conn, "select 1") == 1
+    assert pool.stats()["reconnects"] == 1
+    assert pool.stats()["open"] == 1
+
+
+def test_connection_broken_in_use_is_discarded(sqlite_path):
+    pool = ConnectionPool(partial(sqlite_connect, sqlite_path), size=1)
+    with pytest.raises(sqlite3.ProgrammingError):
+        with pool.connection() as conn:
+            conn.close()
+            conn.cursor()
+    assert pool.stats()["open"] == 0
+    with pool.connection() as fresh:
+        assert fresh is not conn
+
+
+def test_waiter_opens_a_new_connection_when_one_is_discarded(sqlite_path):
+    pool = ConnectionPool(partial(sqlite_connect, sqlite_path), size=1, timeout=5)
+    held = threading.Event()
+    waiting = threading.Event()
+    failed = []
+
+    def break_in_use():
+        try:
+            with pool.connection() as conn:
+                held.set()
+                waiting.wait(5)
+                conn.close()
+                conn.cursor()
+        except sqlite3.ProgrammingError as e:
+            failed.append(e)
+
+    thread = threading.Thread(target=break_in_use)
+    thread.start()
+    held.wait()
+    threading.Timer(0.05, waiting.set).start()
+    started = time.monotonic()
+    with pool.connection() as conn:
+        assert scalar(conn, "select 1") == 1
+    thread.join()
+    assert failed
+    assert time.monotonic() - started < 2
+    assert pool.stats()["open"] == 1
+
+
+def test_failed_connect_frees_its_slot(sqlite_path):
+    attempts = []
+
+    def connect():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise Dropped()
+        return sqlite_connect(sqlite_path)
+
+    pool = ConnectionPool(connect, size=1, timeout=0.1)
+    with pytest.raises(Dropped):
+        with pool.connection():
+            pass
+    with pool.connection() as conn:
+        assert scalar(conn, "select 1") == 1
+
+
+def test_prefill_opens_up_to_size(sqlite_path):
+    pool = ConnectionPool(partial(sqlite_connect, sqlite_path), size=3)
+    assert pool.prefill(2) == 2
+    assert pool.prefill() == 1
+    assert pool.stats()["open"] == 3
+    pool.close()
+    assert pool.stats()["open"] == 0
@@ -0,0 +1,50 @@
+import time
+
+import pytest
+
+from portfolio.fetch import CircuitBreaker, CircuitOpen, Fetcher, RetryableError
+
+
+def open_breaker(fetcher: Fetcher, host: str) -> CircuitBreaker:
+    breaker = fetcher.breaker(host)
+    for _ in range(breaker.threshold):
+        breaker.record_failure()
+    breaker.opened_at = time.monotonic() - breaker.reset_after
+    assert breaker.state == "half-open"
+    return breaker
+
+
+def test_half_open_trial_released_when_rate_limit_wait_times_out():
+    fetcher = Fetcher(rate=1, burst=1, retries=0, acquire_timeout=0)
+    breaker = open_breaker(fetcher, "host")
+    fetcher.bucket._tokens = 0
+    with pytest.raises(RetryableError):
+        fetcher.call("host", lambda: "ok")
+    assert breaker.state == "half-open"
+
+    fetcher.bucket._tokens = 1
+    assert fetcher.call("host", lambda: "ok") == "ok"
+    assert breaker.state == "closed"
+
+
+def test_half_open_lets_one_trial_through():
+    breaker = CircuitBreaker(threshold=1, reset_after=0)
+    breaker.record_failure()
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.failures == 2
+
+
+def test_failed_trial_reopens_circuit():
+    fetcher = Fetcher(retries=0, reset_after=30)
+    breaker = open_breaker(fetcher, "host")
+
+    def down():
+        raise ConnectionError("down")
+
+    with pytest.raises(ConnectionError):
+        fetcher.call("host", down)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpen):
+        fetcher.call("host", lambda: "ok")
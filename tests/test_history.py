@@ -0,0 +1,87 @@
+import threading
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from portfolio import history
+from portfolio.history import OHLCV_DTYPE, HistoryStore
+
+
+@pytest.fixture(autouse=True)
+def market_closed(monkeypatch):
+    monkeypatch.setattr(history, "is_market_open", lambda: False)
+
+
+def bars(start: str, days: int) -> pd.DataFrame:
+    index = pd.date_range(start, periods=days, freq="D")
+    values = np.arange(days, dtype="float64") + 1
+    return pd.DataFrame(
+        {c: values for c in ["open", "high", "low", "close", "volume"]}, index=index
+    )
+
+
+class Download:
+    def __init__(self, frame: pd.DataFrame, delay: float = 0):
+        self.frame = frame
+        self.delay = delay
+        self.calls = []
+
+    def __call__(self, symbol, start):
+        self.calls.append(start)
+        time.sleep(self.delay)
+        if start is None:
+            return self.frame
+        return self.frame[self.frame.index >= pd.Timestamp(start)]
+
+
+def test_first_update_downloads_even_right_after_boot(tmp_path, monkeypatch):
+    monkeypatch.setattr(history.time, "monotonic", lambda: 5.0)
+    download = Download(bars("2024-01-01", 3))
+    store = HistoryStore(tmp_path, download, refresh_after=3600)
+    assert store.update("AAA.NS") == 3
+    assert store.update("AAA.NS") == 0
+    assert download.calls == [None]
+
+
+def test_read_ignores_and_update_drops_a_partial_record(tmp_path):
+    download = Download(bars("2024-01-01", 3))
+    store = HistoryStore(tmp_path, download, refresh_after=0)
+    store.update("AAA.NS")
+    path = store._path("AAA.NS")
+    with open(path, "ab") as f:
+        f.write(b"\0" * (OHLCV_DTYPE.itemsize // 2))
+    assert len(store.read("AAA.NS", update=False)) == 3
+
+    download.frame = bars("2024-01-01", 5)
+    assert store.update("AAA.NS", force=True) == 2
+    assert path.stat().st_size == 5 * OHLCV_DTYPE.itemsize
+    assert list(store.read("AAA.NS", update=False)["close"]) == [1, 2, 3, 4, 5]
+
+
+def test_duplicate_days_are_repaired(tmp_path):
+    download = Download(bars("2024-01-01", 3))
+    store = HistoryStore(tmp_path, download, refresh_after=0)
+    store.update("AAA.NS")
+    path = store._path("AAA.NS")
+    path.write_bytes(path.read_bytes() * 2)
+    download.frame = bars("2024-01-01", 5)
+    store.update("AAA.NS", force=True)
+    assert list(store.read("AAA.NS", update=False)["close"]) == [1, 2, 3, 4, 5]
+    window = store.read("AAA.NS", date(2024, 1, 2), date(2024, 1, 3), update=False)
+    assert list(window["close"]) == [2, 3]
+
+
+def test_stores_in_different_workers_append_each_day_once(tmp_path):
+    frame = bars("2024-01-01", 10)
+    stores = [HistoryStore(tmp_path, Download(frame, delay=0.1)) for _ in range(2)]
+    threads = [
+        threading.Thread(target=store.update, args=("AAA.NS",)) for store in stores
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert stores[0]._path("AAA.NS").stat().st_size == 10 * OHLCV_DTYPE.itemsize
@@ -0,0 +1,54 @@
+import io
+from datetime import date
+
+import pytest
+
+from portfolio.importer import import_holdings
+
+CSV = """symbol,stock_name,buy_date,buy_price,quantity
+aaa.ns,Aaa,2024-01-01,10.5,3
+BBB.NS,,2024-02-01,20,2
+,Empty,2024-01-01,1,1
+CCC.NS,Ccc,01/02/2024,5,1
+AAA.NS,Aaa,2024-03-01,12,1.5
+"""
+
+
+def test_valid_rows_are_added_with_their_summary(repository):
+    result = import_holdings(repository, 1, io.StringIO(CSV), batch_size=2)
+    assert result.inserted == 2
+    assert list(result.errors["line"]) == [4, 5, 6]
+    lots = repository.lots(1).sort_values("symbol")
+    assert list(lots["symbol"]) == ["AAA.NS", "BBB.NS"]
+    assert list(lots["stock_name"]) == ["Aaa", "BBB.NS"]
+    assert lots["buy_date"].iloc[0] == date(2024, 1, 1)
+    summary = repository.summary(1).set_index("symbol")
+    assert summary.loc["AAA.NS", "quantity"] == 3
+    assert summary.loc["BBB.NS", "buy_price"] == 20
+
+
+def test_header_only_file_imports_nothing(repository):
+    result = import_holdings(
+        repository, 1, io.StringIO("symbol,stock_name,buy_date,buy_price,quantity\n")
+    )
+    assert result.inserted == 0
+    assert repository.lot_totals(1) == (0, None)
+
+
+def test_missing_columns_are_reported(repository):
+    with pytest.raises(ValueError, match="buy_price"):
+        import_holdings(repository, 1, io.StringIO("symbol,quantity\nAAA.NS,1\n"))
+
+
+def test_a_failed_batch_rolls_back_the_whole_import(repository, pool):
+    with pool.connection() as conn:
+        conn.cursor().execute(
+            "create trigger no_ccc before insert on stocks when new.symbol = 'CCC.NS' "
+            "begin select raise(abort, 'rejected'); end;"
+        )
+        conn.commit()
+    csv = CSV + "CCC.NS,Ccc,2024-01-01,5,1\n"
+    with pytest.raises(Exception, match="rejected"):
+        import_holdings(repository, 1, io.StringIO(csv), batch_size=2)
+    assert repository.lot_totals(1) == (0, None)
+    assert repository.summary(1).empty
@@ -0,0 +1,51 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from portfolio.lots import LOT_COLUMNS, SELL_COLUMNS, aggregate, match_fifo
+
+
+def lots(*rows):
+    return pd.DataFrame(list(rows), columns=LOT_COLUMNS)
+
+
+def sells(*rows):
+    return pd.DataFrame(list(rows), columns=SELL_COLUMNS)
+
+
+LOTS = lots(
+    (2, "AAA", "Aaa", date(2024, 2, 1), 20.0, 10),
+    (1, "AAA", "Aaa", date(2024, 1, 1), 10.0, 10),
+    (3, "BBB", "Bbb", date(2024, 1, 1), 5.0, 4),
+)
+
+
+def test_sells_consume_oldest_lots_first():
+    matched, realized = match_fifo(LOTS, sells(("AAA", date(2024, 3, 1), 30.0, 15)))
+    remaining = dict(zip(matched["id"], matched["remaining"]))
+    assert remaining == {1: 0, 2: 5, 3: 4}
+    # 10 @ 10 and 5 @ 20 sold at 30.
+    assert realized["AAA"] == pytest.approx(15 * 30 - (10 * 10 + 5 * 20))
+    assert realized["BBB"] == 0
+
+
+def test_aggregate_averages_the_open_lots():
+    holdings = aggregate(LOTS, sells(("AAA", date(2024, 3, 1), 30.0, 15))).set_index(
+        "symbol"
+    )
+    assert holdings.loc["AAA", "quantity"] == 5
+    assert holdings.loc["AAA", "buy_price"] == pytest.approx(20.0)
+    assert holdings.loc["AAA", "buy_date"] == date(2024, 2, 1)
+    assert holdings.loc["AAA", "lots"] == 2
+    assert holdings.loc["BBB", "buy_price"] == pytest.approx(5.0)
+
+
+def test_fully_sold_holding_keeps_first_buy_date_and_zero_cost():
+    holdings = aggregate(LOTS, sells(("BBB", date(2024, 3, 1), 6.0, 4))).set_index(
+        "symbol"
+    )
+    assert holdings.loc["BBB", "quantity"] == 0
+    assert holdings.loc["BBB", "buy_price"] == 0
+    assert holdings.loc["BBB", "buy_date"] == date(2024, 1, 1)
+    assert holdings.loc["BBB", "realized"] == pytest.approx(4.0)
@@ -0,0 +1,105 @@
+import sqlite3
+from datetime import date
+
+import pytest
+
+from portfolio import migrations
+from portfolio.db import ConnectionPool, duckdb_connect, sqlite_connect
+from portfolio.migrations import MIGRATIONS, STOCKS, add_id, migrate
+from portfolio.repository import Repository
+
+LATEST = max(migration.version for migration in MIGRATIONS)
+
+# The schema the app ran on before the migrations existed.
+PRE_SERIES = [
+    "create table users (id integer, name varchar(255), user_id varchar(64), "
+    "user_pass varchar(512))",
+    "create table stocks (user_id integer, symbol varchar(32), "
+    "stock_name varchar(255), buy_date date, buy_price float, quantity integer)",
+    "insert into users values (1, 'Old', 'old', 'secret')",
+    "insert into stocks values (1, 'AAA.NS', 'Aaa', '2020-01-01', 10.0, 5)",
+    "insert into stocks values (1, 'BBB.NS', 'Bbb', '2020-01-02', 20.0, 3)",
+]
+
+
+def connect(dialect, tmp_path):
+    if dialect == "sqlite":
+        return sqlite_connect(str(tmp_path / "portfolio.db"))
+    pytest.importorskip("duckdb")
+    return duckdb_connect(str(tmp_path / "portfolio.duckdb"))
+
+
+@pytest.fixture(params=["sqlite", "duckdb"])
+def dialect(request):
+    return request.param
+
+
+def test_migrate_is_applied_once(dialect, tmp_path):
+    conn = connect(dialect, tmp_path)
+    assert migrate(conn, dialect) == list(range(1, LATEST + 1))
+    assert migrate(conn, dialect) == []
+    conn.close()
+
+
+def test_pre_series_database_is_brought_up_to_date(dialect, tmp_path):
+    conn = connect(dialect, tmp_path)
+    cur = conn.cursor()
+    for statement in PRE_SERIES:
+        cur.execute(statement)
+    conn.commit()
+    migrate(conn, dialect)
+    conn.close()
+
+    pool = ConnectionPool(lambda: connect(dialect, tmp_path), size=1)
+    repository = Repository(pool)
+    assert repository.find_user("old").name == "Old"
+    lots = repository.lots(1)
+    assert list(lots["id"]) == [1, 2]
+    repository.add_lot(1, "CCC.NS", "Ccc", date(2024, 1, 1), 1.0, 1)
+    repository.delete_lot(1, lots["id"].iloc[0], "AAA.NS")
+    assert sorted(repository.lots(1)["symbol"]) == ["BBB.NS", "CCC.NS"]
+    assert repository.sells(1).empty
+    pool.close()
+
+
+def test_concurrent_start_tolerates_version_recorded_first(tmp_path, monkeypatch):
+    path = str(tmp_path / "portfolio.db")
+    migrate(sqlite_connect(path), "sqlite")
+    # This process read the versions before another one recorded them.
+    real, calls = migrations.applied_versions, []
+
+    def applied_versions(cur):
+        calls.append(cur)
+        return set() if len(calls) == 1 else real(cur)
+
+    monkeypatch.setattr(migrations, "applied_versions", applied_versions)
+    assert migrate(sqlite_connect(path), "sqlite") == []
+
+
+class RecordingCursor:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, sql, params=()):
+        self.statements.append(sql)
+
+
+def test_mssql_adds_identity_only_when_missing():
+    cur = RecordingCursor()
+    add_id(cur, STOCKS, "mssql")
+    assert cur.statements == [
+        "if col_length(N'stocks', N'id') is null "
+        "alter table stocks add id int identity(1, 1) not null"
+    ]
+
+
+def test_sqlite_rebuild_keeps_rows_and_extra_columns(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "legacy.db"))
+    conn.execute(
+        "create table stocks (user_id integer, symbol varchar(32), notes text)"
+    )
+    conn.execute("insert into stocks values (7, 'AAA.NS', 'x')")
+    add_id(conn.cursor(), STOCKS, "sqlite")
+    assert conn.execute("select id, user_id, symbol, notes from stocks").fetchall() == [
+        (1, 7, "AAA.NS", "x")
+    ]
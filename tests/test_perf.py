@@ -0,0 +1,43 @@
+import threading
+
+import pytest
+
+from portfolio import perf
+
+
+@pytest.fixture(autouse=True)
+def fresh(monkeypatch):
+    monkeypatch.setattr(perf, "_enabled", False)
+    monkeypatch.setattr(perf, "_process", {})
+    monkeypatch.setattr(perf, "_local", threading.local())
+
+
+def test_session_timing_stays_with_its_session():
+    perf.begin_rerun(session=True)
+    with perf.span("valuation"):
+        pass
+    assert perf.rerun_stats()["valuation"]["count"] == 1
+    assert perf.process_stats() == {}
+    assert not perf.is_enabled()
+
+    other = []
+    thread = threading.Thread(
+        target=lambda: (perf.begin_rerun(), other.append(perf.span("valuation")))
+    )
+    thread.start()
+    thread.join()
+    assert other == [perf._NOOP]
+
+
+def test_enabled_records_for_the_process():
+    perf.enable()
+    perf.begin_rerun()
+
+    @perf.timed("load")
+    def load():
+        return 1
+
+    assert load() == 1
+    assert perf.rerun_stats()["load"]["count"] == 1
+    assert perf.process_stats()["load"]["count"] == 1
+    assert 'portfolio_span_seconds_count{span="load"} 1' in perf.prometheus_text()
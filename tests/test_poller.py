@@ -0,0 +1,50 @@
+import threading
+
+from portfolio.poller import MarketDataPoller
+from portfolio.quotes import Quote
+
+
+class BlockingEngine:
+    # Fetches of `slow` symbols wait until released; the rest return at once.
+    def __init__(self, slow: set):
+        self.slow = slow
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.ts = {}
+
+    def fetch(self, symbols, fallback=True):
+        quotes = {s: Quote(1.0, 1.0, self.ts.get(s, 1.0)) for s in symbols}
+        if self.slow & set(symbols):
+            self.started.set()
+            self.release.wait(5)
+        return quotes
+
+
+def test_new_symbols_do_not_wait_for_a_background_refresh():
+    engine = BlockingEngine({"SLOW.NS"})
+    poller = MarketDataPoller(engine, extra_symbols=["SLOW.NS"])
+    background = threading.Thread(target=poller.refresh)
+    background.start()
+    assert engine.started.wait(5)
+    session = threading.Thread(target=poller.ensure, args=(["NEW.NS"],))
+    session.start()
+    session.join(2)
+    finished = not session.is_alive()
+    engine.release.set()
+    background.join()
+    session.join()
+    assert finished
+    assert set(poller.snapshot.quotes) == {"SLOW.NS", "NEW.NS"}
+
+
+def test_a_late_fetch_does_not_overwrite_newer_quotes():
+    engine = BlockingEngine({"SLOW.NS"})
+    poller = MarketDataPoller(engine)
+    background = threading.Thread(target=poller.refresh, args=(["SLOW.NS", "AAA.NS"],))
+    background.start()
+    assert engine.started.wait(5)
+    engine.ts["AAA.NS"] = 2.0
+    poller.refresh(["AAA.NS"])
+    engine.release.set()
+    background.join()
+    assert poller.snapshot.quotes["AAA.NS"].ts == 2.0
@@ -0,0 +1,119 @@
+import io
+import json
+import urllib.request
+
+import pandas as pd
+import pytest
+
+from portfolio.fetch import Fetcher, RetryableError
+from portfolio.quotes import (
+    QuoteEngine,
+    StaticQuoteProvider,
+    YahooChartProvider,
+    YahooQuoteProvider,
+    YahooSparkProvider,
+)
+
+
+class FakeDownload(YahooQuoteProvider):
+    def __init__(self, closes: dict[str, list[float]]):
+        super().__init__()
+        self.closes = closes
+
+    def _download(self, yf, symbols):
+        if not self.closes:
+            return pd.DataFrame()
+        index = pd.to_datetime(["2024-01-01", "2024-01-02"])
+        closes = pd.DataFrame(self.closes, index=index)
+        return pd.concat({"Close": closes}, axis=1)
+
+
+def test_download_returns_symbols_that_came_back():
+    provider = FakeDownload({"AAA.NS": [10.0, 11.0], "BBB.NS": [float("nan")] * 2})
+    quotes = provider.fetch(["AAA.NS", "BBB.NS"])
+    assert list(quotes) == ["AAA.NS"]
+    assert quotes["AAA.NS"].price == 11.0
+    assert quotes["AAA.NS"].prev_close == 10.0
+
+
+@pytest.mark.parametrize("closes", [{}, {"AAA.NS": [float("nan")] * 2}])
+def test_download_with_no_quotes_is_retryable(closes):
+    with pytest.raises(RetryableError):
+        FakeDownload(closes).fetch(["AAA.NS"])
+
+
+def test_empty_download_counts_against_the_breaker():
+    fetcher = Fetcher(retries=0, failure_threshold=1, burst=100)
+    engine = QuoteEngine(FakeDownload({}), fetcher=fetcher, host="yahoo")
+    engine.last_known["AAA.NS"] = ("stale",)
+    assert engine.fetch(["AAA.NS"]) == {"AAA.NS": ("stale",)}
+    assert fetcher.breaker("yahoo").state == "open"
+
+
+def test_engine_charges_one_token_per_symbol():
+    fetcher = Fetcher(rate=1, burst=50)
+    provider = StaticQuoteProvider({f"S{i}": (1.0, 1.0) for i in range(30)})
+    engine = QuoteEngine(provider, chunk_size=20, fetcher=fetcher)
+    assert len(engine.fetch(provider.quotes)) == 30
+    assert provider.calls == 2
+    assert fetcher.bucket._tokens == pytest.approx(20, abs=0.5)
+
+
+def test_call_larger_than_burst_is_charged_a_full_bucket():
+    fetcher = Fetcher(rate=1, burst=5, acquire_timeout=0)
+    assert fetcher.call("host", lambda: "ok", cost=8) == "ok"
+    assert fetcher.bucket._tokens == pytest.approx(0, abs=0.5)
+    with pytest.raises(RetryableError):
+        fetcher.call("host", lambda: "ok")
+
+
+def test_chunks_larger_than_burst_are_all_fetched():
+    # Five 200-symbol chunks against a bucket of 10: none may wait past the
+    # acquire timeout behind the ones before it.
+    fetcher = Fetcher(rate=50, burst=10, acquire_timeout=1)
+    provider = StaticQuoteProvider({f"S{i}": (1.0, 1.0) for i in range(1000)})
+    engine = QuoteEngine(provider, chunk_size=200, fetcher=fetcher)
+    assert len(engine.fetch(provider.quotes)) == 1000
+    assert provider.calls == 5
+
+
+def test_chart_quote_uses_trade_time_and_previous_session_close(monkeypatch):
+    meta = {
+        "regularMarketPrice": 105.0,
+        "regularMarketTime": 1700000123,
+        "chartPreviousClose": 90.0,
+        "previousClose": 100.0,
+    }
+    urls = []
+
+    def urlopen(request, timeout):
+        urls.append(request.full_url)
+        return io.BytesIO(json.dumps({"chart": {"result": [{"meta": meta}]}}).encode())
+
+    monkeypatch.setattr(urllib.request, "urlopen", urlopen)
+    quote = YahooChartProvider("http://fake").fetch_one("AAA.NS")
+    assert quote == (105.0, 100.0, 1700000123.0)
+    assert "range=1d" in urls[0]
+
+
+def test_spark_reads_every_symbol_from_one_request(monkeypatch):
+    meta = {
+        "regularMarketPrice": 105.0,
+        "regularMarketTime": 1700000123,
+        "previousClose": 100.0,
+    }
+    result = [
+        {"symbol": "AAA.NS", "response": [{"meta": meta}]},
+        {"symbol": "GONE.NS", "response": []},
+    ]
+    urls = []
+
+    def urlopen(request, timeout):
+        urls.append(request.full_url)
+        return io.BytesIO(json.dumps({"spark": {"result": result}}).encode())
+
+    monkeypatch.setattr(urllib.request, "urlopen", urlopen)
+    quotes = YahooSparkProvider("http://fake").fetch(["AAA.NS", "GONE.NS"])
+    assert quotes == {"AAA.NS": (105.0, 100.0, 1700000123.0)}
+    assert len(urls) == 1
+    assert "symbols=AAA.NS,GONE.NS" in urls[0]
@@ -0,0 +1,60 @@
+import sqlite3
+from datetime import date
+
+import pytest
+
+from portfolio.migrations import migrate
+
+
+def test_edit_and_delete_take_ids_read_back_through_pandas(repository):
+    repository.add_lot(1, "AAA", "Aaa", date(2024, 1, 1), 10.0, 5)
+    repository.add_lot(1, "AAA", "Aaa", date(2024, 2, 1), 12.0, 5)
+    lot_id = repository.lots(1)["id"].iloc[0]
+    assert type(lot_id).__module__ == "numpy"
+
+    repository.update_lot(1, lot_id, "AAA", date(2024, 1, 1), 11.0, 7)
+    assert repository.lots(1).set_index("id").loc[lot_id, "quantity"] == 7
+    repository.delete_lot(1, lot_id, "AAA")
+    assert lot_id not in set(repository.lots(1)["id"])
+    assert repository.lot_totals(1) == (1, 5)
+
+
+def test_sells_update_the_summary(repository):
+    repository.add_lot(1, "AAA", "Aaa", date(2024, 1, 1), 10.0, 10)
+    repository.add_sell(1, "AAA", date(2024, 3, 1), 15.0, 4)
+    assert list(repository.sells(1)["quantity"]) == [4]
+    summary = repository.summary(1).set_index("symbol")
+    assert summary.loc["AAA", "quantity"] == 6
+    assert summary.loc["AAA", "realized"] == pytest.approx(20.0)
+
+
+def test_lots_are_per_user(repository):
+    repository.add_lot(1, "AAA", "Aaa", date(2024, 1, 1), 10.0, 10)
+    repository.add_lot(2, "AAA", "Aaa", date(2024, 1, 1), 10.0, 10)
+    lot_id = repository.lots(2)["id"].iloc[0]
+    repository.delete_lot(1, lot_id, "AAA")
+    assert len(repository.lots(2)) == 1
+
+
+def test_stocks_table_without_ids_gets_them(sqlite_path):
+    # The table as it was before lots had ids.
+    conn = sqlite3.connect(sqlite_path)
+    conn.execute(
+        "create table stocks (user_id integer, symbol varchar(32), "
+        "stock_name varchar(255), buy_date date, buy_price float, quantity integer)"
+    )
+    conn.executemany(
+        "insert into stocks values (?, ?, ?, ?, ?, ?)",
+        [
+            (1, "AAA", "Aaa", "2024-01-01", 10.0, 5),
+            (1, "BBB", "Bbb", "2024-01-02", 1, 2),
+        ],
+    )
+    conn.commit()
+    migrate(conn, "sqlite")
+    rows = conn.execute("select id, symbol from stocks order by id").fetchall()
+    assert rows == [(1, "AAA"), (2, "BBB")]
+    conn.execute("insert into stocks (user_id, symbol, quantity) values (1, 'CCC', 1)")
+    assert conn.execute("select max(id) from stocks").fetchone() == (3,)
+    indexes = {row[1] for row in conn.execute("pragma index_list(stocks)")}
+    assert "ix_stocks_user_id_symbol" in indexes
@@ -0,0 +1,17 @@
+from portfolio import settings
+
+
+def test_section_is_a_copy(monkeypatch):
+    monkeypatch.setattr(settings, "_overrides", {})
+    settings.section("market")["poll_interval"] = -1
+    assert settings.section("market").get("poll_interval") != -1
+
+
+def test_override_wins_over_config(monkeypatch):
+    monkeypatch.setattr(settings, "_overrides", {})
+    settings.override("database", backend="sqlite", sqlite_path="x.db")
+    assert settings.section("database")["backend"] == "sqlite"
+    assert settings.section("database")["sqlite_path"] == "x.db"
+    assert "database" not in settings.load_settings() or (
+        settings.load_settings()["database"].get("sqlite_path") != "x.db"
+    )
@@ -0,0 +1,36 @@
+import pandas as pd
+
+from portfolio.symbol_master import SymbolMaster, merge_results
+
+MASTER = SymbolMaster(
+    pd.DataFrame(
+        [
+            ("TATAMOTORS.NS", "TATA MOTORS LTD", "NSI"),
+            ("TATASTEEL.NS", "TATA STEEL LIMITED", "NSI"),
+            ("TATASTEEL.BO", "TATA STEEL LIMITED", "BSE"),
+            ("TCS.NS", "TATA CONSULTANCY SERV LT", "NSI"),
+        ],
+        columns=["symbol", "short_name", "exchange"],
+    )
+)
+
+
+def test_search_matches_prefixes_of_ticker_and_name():
+    assert MASTER.search("tata st") == [
+        "TATA STEEL LIMITED:::NSI:::TATASTEEL.NS",
+        "TATA STEEL LIMITED:::BSE:::TATASTEEL.BO",
+    ]
+    assert MASTER.search("tcs")[0].endswith(":::TCS.NS")
+    assert MASTER.search("infy") == []
+
+
+def test_remote_results_top_up_local_ones_without_duplicates():
+    local = MASTER.search("tata")
+    remote = [
+        "TATA STEEL LIMITED:::NSI:::TATASTEEL.NS",
+        "TATA POWER CO LTD:::NSI:::TATAPOWER.NS",
+    ]
+    merged = merge_results(local, remote)
+    assert merged[: len(local)] == local
+    assert merged[len(local) :] == ["TATA POWER CO LTD:::NSI:::TATAPOWER.NS"]
+    assert len(merge_results(local, remote, limit=2)) == 2
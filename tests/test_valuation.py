@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from portfolio.valuation import empty_totals, summarize, value_holdings
+
+HOLDINGS = pd.DataFrame(
+    {
+        "symbol": ["AAA", "BBB", "CCC"],
+        "buy_price": [10.0, 20.0, 5.0],
+        "quantity": [10, 5, 4],
+    }
+)
+
+
+def quotes(**prices):
+    return pd.DataFrame(
+        [(symbol, price, prev) for symbol, (price, prev) in prices.items()],
+        columns=["symbol", "price", "prev_close"],
+    ).set_index("symbol")
+
+
+def test_values_every_holding():
+    df, totals = value_holdings(
+        HOLDINGS, quotes(AAA=(12.0, 11.0), BBB=(18.0, 20.0), CCC=(5.0, 4.0))
+    )
+    row = df.set_index("symbol").loc["AAA"]
+    assert row["investment"] == 100
+    assert row["current_value"] == 120
+    assert row["profit"] == 20
+    assert row["profit_percentage"] == pytest.approx(20)
+    assert row["profit_today"] == 10
+    assert row["profit_percentage_today"] == pytest.approx(100 / 11)
+    assert row["link"] == "https://finance.yahoo.com/chart/AAA/"
+    assert totals["investment"] == 220
+    assert totals["current_value"] == 230
+    assert totals["profit"] == 10
+    assert totals["profit_percentage"] == pytest.approx(10 * 100 / 220)
+    assert totals["profit_today"] == pytest.approx(10 - 10 + 4)
+    assert totals["profit_percentage_today"] == pytest.approx(4 * 100 / 226)
+
+
+def test_unpriced_holdings_are_left_out_of_the_totals():
+    # BBB has no quote at all, CCC a zero price.
+    df, totals = value_holdings(HOLDINGS, quotes(AAA=(12.0, 11.0), CCC=(0.0, 4.0)))
+    values = df.set_index("symbol")["current_value"]
+    assert values["AAA"] == 120
+    assert np.isnan(values["BBB"]) and np.isnan(values["CCC"])
+    assert totals["investment"] == 100
+    assert totals["current_value"] == 120
+    assert totals["profit"] == 20
+
+
+def test_missing_previous_close_only_affects_todays_profit():
+    df, totals = value_holdings(
+        HOLDINGS.iloc[:2], quotes(AAA=(12.0, np.nan), BBB=(18.0, 20.0))
+    )
+    assert np.isnan(df.set_index("symbol").loc["AAA", "profit_today"])
+    assert totals["current_value"] == 210
+    assert totals["profit_today"] == -10
+    assert totals["profit_percentage_today"] == pytest.approx(-10)
+
+
+def test_revaluing_replaces_the_previous_values():
+    first, _ = value_holdings(HOLDINGS, quotes(AAA=(12.0, 11.0)))
+    again, _ = value_holdings(first, quotes(AAA=(15.0, 11.0)))
+    assert list(again.columns) == list(first.columns)
+    assert again.set_index("symbol").loc["AAA", "current_value"] == 150
+
+
+def test_empty_portfolio():
+    assert summarize(HOLDINGS.iloc[:0]) == empty_totals()
+    _, totals = value_holdings(HOLDINGS.iloc[:0], quotes())
+    assert totals == empty_totals()